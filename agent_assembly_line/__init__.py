@@ -1,5 +1,23 @@
-from .agent import Agent
-from .chat_agent import ChatAgent
+import importlib
+
 from .config import Config
 from .exceptions import DataLoadError, EmptyDataError
-from .agent_manager import AgentManager
\ No newline at end of file
+
+# The agents pull in langchain and friends, they are imported on first access.
+_LAZY_EXPORTS = {
+    "Agent": ".agent",
+    "ChatAgent": ".chat_agent",
+    "AgentManager": ".agent_manager",
+}
+
+__all__ = ["Agent", "ChatAgent", "Config", "DataLoadError", "EmptyDataError", "AgentManager"]
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
@@ -2,29 +2,50 @@
 Agent-Assembly-Line
 """
 
+import asyncio
+import copy
 import datetime
+import hashlib
 import os
-from typing import AsyncGenerator
+import threading
+from contextlib import contextmanager
+from typing import TYPE_CHECKING, AsyncGenerator, Optional
 
 # disable ChromaDB telemetry to prevent spamming the console
 os.environ['ANONYMIZED_TELEMETRY'] = 'False'
-import logging, chromadb
+import logging
 logging.getLogger('chromadb.telemetry.product.posthog').setLevel(logging.CRITICAL)
 
 from langchain_core.prompts import ChatPromptTemplate
-from langchain_core.runnables import RunnablePassthrough
+from langchain_core.runnables import Runnable
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.language_models import BaseLLM
-from langchain_text_splitters import RecursiveCharacterTextSplitter
-from langchain_chroma import Chroma
 
 from agent_assembly_line.config import Config
-from agent_assembly_line.data_loaders.diff_loader import GitDiffLoader
 from agent_assembly_line.memory_assistant import MemoryAssistant, MemoryStrategy, NoMemory
 from agent_assembly_line.data_loaders.data_loader_factory import DataLoaderFactory
 from agent_assembly_line.exceptions import DataLoadError, EmptyDataError
 from agent_assembly_line.utils.inspectable_runnable import InspectableRunnable
+from agent_assembly_line.utils.lru_cache import LRUCache
+from agent_assembly_line.utils.text_splitter import TextSplitter
 from agent_assembly_line.llm_factory import LLMFactory
+from agent_assembly_line.knowledge_index import KnowledgeIndex
+from agent_assembly_line.retrieval.context_packer import ContextPacker
+from agent_assembly_line.retrieval.bm25 import BM25Index
+from agent_assembly_line.retrieval.fusion import reciprocal_rank_fusion
+from agent_assembly_line.retrieval.diversity import RetrievalDiversifier
+from agent_assembly_line.response_cache import ResponseCache, CachedAnswer
+from agent_assembly_line.audit_log import AuditLog
+from agent_assembly_line import tracing
+from agent_assembly_line.tracing import Tracer, SpanCallbackHandler
+from agent_assembly_line.metrics import LLM_CALL_TRACKER, STREAM_CANCELLATIONS
+
+from agent_assembly_line.vectorstores.vector_store_factory import VectorStoreFactory
+
+# The vector store backends take long to import, they are imported when
+# an agent first uses a vector store.
+if TYPE_CHECKING:
+    from langchain_core.vectorstores import VectorStore
 
 class Agent:
     """
@@ -39,21 +60,67 @@ class Agent:
        in full length, limited by the LLM's maximum input length.
 
     Files and URLs specified in the configuration are added to the agent's vector store.
+    The vector store backend is selected with `vector-store` in the configuration,
+    "chroma" (default) for large corpora or the in-memory "numpy" store.
     Methods:
     - add_file(): Adds files to the user vector store.
     - add_url(): Adds URLs to the user vector store.
     - add_inline_text(): Adds text directly to the context without using a vector store.
     - add_diff(): Adds a git diff to the inline context.
+    - session(): Returns a session of the agent for one user, with its own user
+      vector store, inline context and history over the shared agent vector store.
     """
 
     config: Config = None
-    model: BaseLLM = None
+
+    # Models and vector stores are created on first use, see the properties below.
+    # Agents whose template doesn't use a store never create it.
+    _model: BaseLLM = None
+    _embeddings = None
+    _acquired_clients: tuple = ()
+    _agent_vectorstore: "VectorStore" = None
+    _user_vectorstore: "VectorStore" = None
+    user_collection: str = "uploaded-data"
+
+    # Set on sessions of an agent, see session()
+    session_id: Optional[str] = None
+    session_of: Optional["Agent"] = None
 
     user_uploaded_files = []
     user_added_urls = []
     memory_assistant: MemoryStrategy = NoMemory()
     inline_context = ""
 
+    # Maintained document counts of the vector stores, so the size of a
+    # store never requires fetching the whole collection.
+    agent_store_size: int = 0
+    user_store_size: int = 0
+
+    # Splitter settings for all ingested data, from the chunking config, see TextSplitter
+    chunk_size: int = 1000
+    chunk_overlap: int = 100
+    chunk_unit: str = "chars"
+    chunk_boundaries: list = []
+
+    # Chunks embedded and added to a vector store at a time
+    ingest_batch_size: int = 256
+
+    # Recent query embeddings, for repeated or retried prompts
+    query_embedding_cache_size: int = 128
+
+    # Default number of parallel LLM calls of run_many() and abatch()
+    batch_concurrency: int = 4
+
+    # BM25 indexes of the stores, only with hybrid-search configured, see _fuse_lexical()
+    agent_lexical_index: BM25Index = None
+    user_lexical_index: BM25Index = None
+
+    # Optional de-duplication and MMR reranking of retrieved chunks, see RetrievalDiversifier
+    diversifier: RetrievalDiversifier = None
+
+    # Optional cache of answers, see ResponseCache
+    response_cache: ResponseCache = None
+
     # These attributes are used for routing and managing
     # allocated agents by external decorators.
     _router = None
@@ -62,6 +129,11 @@ class Agent:
     RAG_TEMPLATE = ""
     name    : str = ""
 
+    # The chain is built once, see _get_chain()
+    _chain = None
+    _chain_template = None
+    _chain_model = None
+
     def __init__(self, name = None, debug = False, audit_prompts = False, config = None):
         if name:
             self.name = name
@@ -72,7 +144,9 @@ class Agent:
         if not name:
             self.name = self.config.name
         self.debug_mode = debug
-        self.audit_prompts = audit_prompts
+        # Prompts are audited with audit_prompts or an audit-log config, see AuditLog
+        self.audit_log = AuditLog.from_config(self.config.audit_log or audit_prompts, self.name)
+        self.audit_prompts = self.audit_log is not None
         self.audit_counter = 0
         if self.config.prompt_template:
             with open(self.config.prompt_template, "r") as rag_template_file:
@@ -80,14 +154,18 @@ class Agent:
         if self.config.inline_rag_templates:
             self.RAG_TEMPLATE = self.config.inline_rag_templates
 
-        self.model, self.embeddings = LLMFactory.create_llm_and_embeddings(self.config)
+        splitter = TextSplitter.from_config(self.config.chunking)
+        self.chunk_size, self.chunk_overlap = splitter.chunk_size, splitter.chunk_overlap
+        self.chunk_unit, self.chunk_boundaries = splitter.unit, splitter.boundaries
 
-        chroma_client_settings = chromadb.config.Settings(
-            anonymized_telemetry=False,
-        )
+        self.query_embeddings = LRUCache(max_size=self.query_embedding_cache_size)
+        self.context_packer = ContextPacker.from_config(self.config.context_budget)
+        self.diversifier = RetrievalDiversifier.from_config(self.config.diversity)
+        self.response_cache = ResponseCache.from_config(self.config.response_cache)
+        self.tracer = Tracer.from_config(self.config.tracing)
 
-        self.agent_vectorstore = self.load_data(self.config, chroma_client_settings)
-        self.user_vectorstore = Chroma("uploaded-data", self.embeddings, client_settings=chroma_client_settings)
+        self.agent_store_size = 0
+        self.user_store_size = 0
         if self.config.use_memory:
             self.memory_strategy = MemoryStrategy.SUMMARY
             self.memory_assistant = MemoryAssistant(strategy=self.memory_strategy, model=self.model, config=self.config)
@@ -96,6 +174,142 @@ class Agent:
             self.memory_strategy = MemoryStrategy.NO_MEMORY
             self.memory_assistant = NoMemory(config=self.config)
         self.stats = {}
+        # guards loading the agent's data, shared with its sessions
+        self._shared_lock = threading.RLock()
+
+    @property
+    def model(self) -> BaseLLM:
+        if self._model is None:
+            self._acquire_models()
+        return self._model
+
+    @model.setter
+    def model(self, model: BaseLLM):
+        self._model = model
+
+    @property
+    def embeddings(self):
+        if self._embeddings is None:
+            self._acquire_models()
+        return self._embeddings
+
+    @embeddings.setter
+    def embeddings(self, embeddings):
+        self._embeddings = embeddings
+
+    @property
+    def agent_vectorstore(self) -> "VectorStore":
+        """
+        The agent's data, loaded on first use. Async callers use _aagent_vectorstore().
+        """
+        if self._agent_vectorstore is None:
+            with self._shared_lock:
+                if self._agent_vectorstore is None:
+                    self._agent_vectorstore = self.load_data(self.config)
+        return self._agent_vectorstore
+
+    @agent_vectorstore.setter
+    def agent_vectorstore(self, vectorstore: "VectorStore"):
+        self._agent_vectorstore = vectorstore
+
+    async def _aagent_vectorstore(self) -> "VectorStore":
+        """
+        The agent's data, loaded in a worker thread on first use, loading fetches
+        and embeds all sources and would block the event loop.
+        """
+        if self._agent_vectorstore is None:
+            return await asyncio.to_thread(lambda: self.agent_vectorstore)
+        return self._agent_vectorstore
+
+    @property
+    def user_vectorstore(self) -> "VectorStore":
+        if self._user_vectorstore is None:
+            self._user_vectorstore = VectorStoreFactory.create(self.config.vector_store, self.user_collection, self.embeddings)
+        return self._user_vectorstore
+
+    @user_vectorstore.setter
+    def user_vectorstore(self, vectorstore: "VectorStore"):
+        self._user_vectorstore = vectorstore
+
+    def warm_up(self):
+        """
+        Acquires the model and the embeddings and loads the agent's data if the
+        template uses it, which is otherwise done by the first question.
+        """
+        with self._shared_lock:
+            if self._model is None or self._embeddings is None:
+                self._acquire_models()
+            if self.uses_store("global_store"):
+                self.agent_vectorstore
+
+    def session(self, session_id: str) -> "Agent":
+        """
+        Returns a session of the agent for one user of a shared agent, e.g. of the REST server.
+        A session is a shallow copy of the agent sharing its models, agent vector store,
+        BM25 index and caches. Its user vector store, inline context, uploaded files,
+        added URLs and history are its own, the history is not saved.
+        Sessions are cheap, the user vector store is only created on the first upload.
+        """
+        # loaded once by the agent, not by each session
+        self.warm_up()
+        session = copy.copy(self)
+        session.session_id = session_id
+        session.session_of = self
+        # the models are released by the agent only
+        session._acquired_clients = ()
+        # ephemeral collections are shared by name within the process
+        session.user_collection = f"{self.user_collection}-{hashlib.sha256(session_id.encode()).hexdigest()[:16]}"
+        session._user_vectorstore = None
+        session.user_lexical_index = None
+        session.user_store_size = 0
+        session.user_uploaded_files = []
+        session.user_added_urls = []
+        session.inline_context = ""
+        session.stats = {}
+        # the chain reports its stats to the object that built it
+        session._chain = None
+        if self.response_cache is not None and self.response_cache.semantic:
+            # similar questions of other sessions were answered from other context
+            session.response_cache = None
+        if self.config.use_memory:
+            session.memory_assistant = MemoryAssistant(strategy=self.memory_strategy, model=self.model, config=self.config)
+            session.memory_assistant.auto_save_path = None
+        else:
+            session.memory_assistant = NoMemory(config=self.config)
+        return session
+
+    def close_session(self):
+        """
+        Deletes the user vector store of a session.
+        """
+        if self.session_of is None:
+            raise ValueError("Only sessions of an agent can be closed.")
+        store, self._user_vectorstore = self._user_vectorstore, None
+        if store is not None and hasattr(store, "delete_collection"):
+            try:
+                store.delete_collection()
+            except Exception as e:
+                print(f"Error deleting the user vector store of session {self.session_id}: {e}")
+
+    def _acquire_models(self):
+        """
+        Gets the model and the embeddings from the LLMFactory, only the ones not set yet are used.
+        """
+        model, embeddings = LLMFactory.create_llm_and_embeddings(self.config)
+        self._acquired_clients = (model, embeddings)
+        if self._model is None:
+            self._model = model
+        if self._embeddings is None:
+            self._embeddings = embeddings
+
+    def uses_store(self, placeholder: str) -> bool:
+        """
+        Whether the template has a placeholder for the store, "global_store" or "session_store".
+        """
+        return "{" + placeholder + "}" in self.RAG_TEMPLATE
+
+    def _needs_retrieval(self) -> bool:
+        return self.uses_store("global_store") or self.uses_store("session_store")
 
     def cleanup(self):
         self.memory_assistant.cleanup()
@@ -112,23 +326,29 @@ class Agent:
             if model._client._client._state not in [httpx._client.ClientState.UNOPENED, httpx._client.ClientState.CLOSED]:
                 print("model client", model._client._client._state)
 
+    def _release_models(self) -> list:
+        """
+        Gives the shared model and embeddings clients back to the LLMFactory.
+        Returns the clients no other agent uses, only these are closed.
+        Nothing is released if the models were never used.
+        """
+        clients, self._acquired_clients = self._acquired_clients, ()
+        return [client for client in clients if LLMFactory.release(client)]
+
     def closeModels(self):
         try:
-            self.model._client._client.close()
-            self.embeddings._client._client.close()
-            Agent._check_opened_clients(self.model)
-            Agent._check_opened_clients(self.embeddings)
+            for client in self._release_models():
+                client._client._client.close()
+                Agent._check_opened_clients(client)
         except Exception as e:
             print(f"Error closing model client: {e}")
 
     async def aCloseModels(self):
         try:
-            self.model._client._client.close()
-            self.embeddings._client._client.close()
-            await self.model._async_client._client.aclose()
-            await self.embeddings._async_client._client.aclose()
-            Agent._check_opened_clients(self.model)
-            Agent._check_opened_clients(self.embeddings)
+            for client in self._release_models():
+                client._client._client.close()
+                await client._async_client._client.aclose()
+                Agent._check_opened_clients(client)
         except Exception as e:
             print(f"Error closing model client: {e}")
 
@@ -139,25 +359,115 @@ class Agent:
     async def stopMemoryAssistant(self):
         await self.memory_assistant.stopSaving()
 
-    def load_data(self, config, chroma_client_settings=None) -> Chroma:
+    def _text_splitter(self) -> TextSplitter:
+        return TextSplitter(self.chunk_size, self.chunk_overlap, self.chunk_unit, self.chunk_boundaries)
+
+    def _add_chunks(self, vectorstore, chunks, lexical_index=None) -> tuple[int, int]:
+        """
+        Adds streamed chunks to the vector store, and the BM25 index if given, in
+        batches of ingest_batch_size, so all chunks are never held at once.
+        Returns the number of chunks and their total length in characters.
+        """
+        count, length = 0, 0
+        batch = []
+        for chunk in chunks:
+            batch.append(chunk)
+            if len(batch) >= self.ingest_batch_size:
+                vectorstore.add_documents(batch)
+                if lexical_index is not None:
+                    lexical_index.add_documents(batch)
+                count += len(batch)
+                length += sum(len(doc.page_content) for doc in batch)
+                batch = []
+        if batch:
+            vectorstore.add_documents(batch)
+            if lexical_index is not None:
+                lexical_index.add_documents(batch)
+            count += len(batch)
+            length += sum(len(doc.page_content) for doc in batch)
+        return count, length
+
+    def load_data(self, config) -> "VectorStore":
         source_type, source_path = DataLoaderFactory.guess_source_type(config)
         if source_type and source_path:
+            if config.persist_index:
+                return self._load_persistent_index(config, source_type, source_path)
             loader = DataLoaderFactory.get_loader(source_type)
             data = loader.load_data(source_path)
             if data:
-                text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-                all_splits = text_splitter.split_documents(data)
-
-                self.agent_vectorstore = Chroma.from_documents(
-                    documents=all_splits,
-                    embedding=self.embeddings,
-                    client_settings=chroma_client_settings
-                )
+                # "langchain" is the default collection of langchain vector stores
+                self.agent_vectorstore = VectorStoreFactory.create(config.vector_store, "langchain", self.embeddings)
+                if config.hybrid_search:
+                    self.agent_lexical_index = BM25Index()
+                chunks = self._text_splitter().iter_documents(data)
+                self.agent_store_size, _ = self._add_chunks(self.agent_vectorstore, chunks, self.agent_lexical_index)
             else:
-                self.agent_vectorstore = Chroma("context", self.embeddings, client_settings=chroma_client_settings)
+                self.agent_vectorstore = VectorStoreFactory.create(config.vector_store, "context", self.embeddings)
             return self.agent_vectorstore
         else:
-            return Chroma("context", self.embeddings, client_settings=chroma_client_settings)
+            return VectorStoreFactory.create(config.vector_store, "context", self.embeddings)
+
+    def _load_persistent_index(self, config, source_type, source_path) -> "VectorStore":
+        """
+        Loads the agent's data from the on-disk knowledge index. The source is only
+        split again if its content or the index settings changed, and after a content
+        change only the new chunks are embedded.
+        """
+        index = KnowledgeIndex(
+            config.index_path,
+            self.embeddings,
+            LLMFactory.embeddings_model_name(config),
+            self.chunk_size,
+            self.chunk_overlap,
+            config.vector_store,
+            chunking={"unit": self.chunk_unit, "boundaries": self.chunk_boundaries},
+        )
+        loader = DataLoaderFactory.get_loader(source_type)
+        data = None
+        if config.doc:
+            key = index.key_for_file(source_path)
+        else:
+            data = loader.load_data(source_path)
+            key = index.key_for_documents(data or [])
+
+        def split():
+            nonlocal data
+            if data is None:
+                data = loader.load_data(source_path)
+            return self._text_splitter().split_documents(data) if data else []
+
+        all_splits = None
+        vectorstore = index.load(key)
+        if vectorstore is None:
+            all_splits = split()
+            vectorstore, counts = index.update(key, all_splits, source=source_path)
+            self.stats["index_update"] = counts
+            if self.debug_mode:
+                print(f"Knowledge index updated: {counts['added']} chunks added, {counts['removed']} removed, "
+                      f"{counts['unchanged']} unchanged, {index.path}")
+        elif self.debug_mode:
+            print(f"Knowledge index reused: {index.path}")
+        # The BM25 index is rebuilt from all chunks on changes, this needs no embeddings
+        if config.hybrid_search:
+            self.agent_lexical_index = index.load_lexical(key) if all_splits is None else None
+            if self.agent_lexical_index is None:
+                self.agent_lexical_index = BM25Index(all_splits if all_splits is not None else split())
+                index.save_lexical(key, self.agent_lexical_index)
+        self.agent_store_size = index.size
+        self.agent_vectorstore = vectorstore
+        return vectorstore
+
+    def _add_user_documents(self, data) -> int:
+        """
+        Chunks documents into the user vector store and, for hybrid search, its BM25 index.
+        Returns the total length of the chunks in characters.
+        """
+        if self.config.hybrid_search and self.user_lexical_index is None:
+            self.user_lexical_index = BM25Index()
+        chunks = self._text_splitter().iter_documents(data)
+        count, length = self._add_chunks(self.user_vectorstore, chunks, self.user_lexical_index)
+        self.user_store_size += count
+        return length
 
     def add_file(self, upload_directory, filename):
         """
@@ -169,10 +479,8 @@ class Agent:
             loader = DataLoaderFactory.get_loader(source_type)
             data = loader.load_data(filepath)
             if data:
-                text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-                all_splits = text_splitter.split_documents(data)
-                self.user_vectorstore.add_documents(all_splits)
-                total_text_length = sum(len(doc.page_content) for doc in all_splits)
+                total_text_length = self._add_user_documents(data)
+                self._data_changed()
                 return total_text_length
             else:
                 raise EmptyDataError(filename)
@@ -202,12 +510,11 @@ class Agent:
                     f.write(loader.header_text_pairs)
 
             if data:
+                self._data_changed()
                 if use_inline_context:
                     self.inline_context += data[0].page_content + "\n"
                 else:
-                    text_splitter = RecursiveCharacterTextSplitter(chunk_size=1000, chunk_overlap=100)
-                    all_splits = text_splitter.split_documents(data)
-                    self.user_vectorstore.add_documents(all_splits)
+                    self._add_user_documents(data)
             else:
                 raise EmptyDataError(url)
         except Exception as e:
@@ -221,13 +528,83 @@ class Agent:
             print(f"URL added: {url}, {size} characters")
             return summary, size
 
+    def vectorstore_sizes(self) -> dict:
+        """
+        Returns the number of documents in the agent and the user vector store.
+        The counts are maintained while adding data, this is O(1).
+        A store that wasn't used yet has no documents.
+        """
+        return {"agent": self.agent_store_size, "user": self.user_store_size}
+
+    @staticmethod
+    def _search_k(store_size, max_docs=10):
+        """
+        Number of documents to retrieve from a store of the given size, between 1 and max_docs.
+        """
+        return max(1, min(store_size, max_docs))
+
+    def embed_query(self, prompt: str) -> list[float]:
+        """
+        Embeds the prompt once, the vector is reused for searching all vector stores.
+        Recent query embeddings are cached.
+        """
+        with tracing.span("query_embedding") as span:
+            embedding = self.query_embeddings.get(prompt)
+            span.set_attribute("cached", embedding is not None)
+            if embedding is None:
+                embedding = self.embeddings.embed_query(prompt)
+                self.query_embeddings.put(prompt, embedding)
+        return embedding
+
+    async def aembed_query(self, prompt: str) -> list[float]:
+        """
+        Async variant of embed_query.
+        """
+        with tracing.span("query_embedding") as span:
+            embedding = self.query_embeddings.get(prompt)
+            span.set_attribute("cached", embedding is not None)
+            if embedding is None:
+                embedding = await self.embeddings.aembed_query(prompt)
+                self.query_embeddings.put(prompt, embedding)
+        return embedding
+
+    def embed_queries(self, prompts: list[str]) -> list[list[float]]:
+        """
+        Embeds many prompts, the ones not in the query embedding cache are embedded in one batched call.
+        """
+        embeddings = [self.query_embeddings.get(prompt) for prompt in prompts]
+        missing = list(dict.fromkeys(prompt for prompt, embedding in zip(prompts, embeddings) if embedding is None))
+        if missing:
+            with tracing.span("query_embedding", prompts=len(missing)):
+                new_embeddings = dict(zip(missing, self.embeddings.embed_documents(missing)))
+            for prompt, embedding in new_embeddings.items():
+                self.query_embeddings.put(prompt, embedding)
+            embeddings = [embedding if embedding is not None else new_embeddings[prompt] for prompt, embedding in zip(prompts, embeddings)]
+        return embeddings
+
+    async def aembed_queries(self, prompts: list[str]) -> list[list[float]]:
+        """
+        Async variant of embed_queries.
+        """
+        embeddings = [self.query_embeddings.get(prompt) for prompt in prompts]
+        missing = list(dict.fromkeys(prompt for prompt, embedding in zip(prompts, embeddings) if embedding is None))
+        if missing:
+            with tracing.span("query_embedding", prompts=len(missing)):
+                new_embeddings = dict(zip(missing, await self.embeddings.aembed_documents(missing)))
+            for prompt, embedding in new_embeddings.items():
+                self.query_embeddings.put(prompt, embedding)
+            embeddings = [embedding if embedding is not None else new_embeddings[prompt] for prompt, embedding in zip(prompts, embeddings)]
+        return embeddings
+
     def add_diff(self, diff_text):
         """
         Adds a git diff to the inline context
         """
+        from agent_assembly_line.data_loaders.diff_loader import GitDiffLoader
         loader = GitDiffLoader('.')
         documents = loader.load_data(diff_text)
         if documents:
+            self._data_changed()
             try:
                 for doc in documents:
                     self.inline_context += doc.page_content + "\n"
@@ -240,6 +617,7 @@ class Agent:
         Adds inline text to the inline context.
         Use this to add text directly to the context, doesn't use a vector store.
         """
+        self._data_changed()
         self.inline_context += text + "\n"
 
     def replace_inline_text(self, text):
@@ -247,28 +625,66 @@ class Agent:
         Replaces inline text to the inline context.
         Use this to add text directly to the context, doesn't use a vector store.
         """
+        self._data_changed()
         self.inline_context = text + "\n"
 
+    def _data_changed(self):
+        """
+        Called whenever the data of the agent changes. Exact keys contain the retrieved
+        chunks and the inline context, the answers cached for other sessions stay valid.
+        The semantic cache answers before retrieval and is cleared, sessions don't have one.
+        """
+        if self.response_cache is not None and self.response_cache.semantic:
+            self.response_cache.invalidate()
+
     def format_docs(docs):
         return "\n\n".join(doc.page_content for doc in docs)
 
-    timestamp = datetime.datetime.now()
-    def _log_time(self, named=""):
-        now = datetime.datetime.now()
-        timediff = (now - self.timestamp).total_seconds() * 1000
-        if self.debug_mode:
-            print(f"Time taken: {timediff:.2f} ms, {named}")
-        self.timestamp = now
+    @contextmanager
+    def _trace(self, name, in_context=True):
+        """
+        Traces an agent call, see Tracer. When the call ends, its spans are
+        attached to the stats and printed in debug mode.
+        """
+        trace = None
+        try:
+            with self.tracer.trace(name, in_context, agent=self.name) as trace:
+                yield trace
+        finally:
+            # calls nested into a running trace leave it to the outermost call
+            if trace is not None and trace.ended:
+                self.stats["spans"] = trace.summary()
+                if self.debug_mode:
+                    for span in trace.spans:
+                        print(f"Time taken: {span.duration_ms:.2f} ms, {span.name}")
+
+    @staticmethod
+    def _chain_config(max_concurrency: Optional[int] = None) -> tuple[dict, Optional[SpanCallbackHandler]]:
+        """
+        Config of a chain call counting its LLM calls in flight and recording
+        its steps as spans of the current span.
+        """
+        config = {"callbacks": [LLM_CALL_TRACKER]}
+        if max_concurrency is not None:
+            config["max_concurrency"] = max_concurrency
+        parent = tracing.current_span()
+        if parent is None:
+            return config, None
+        handler = SpanCallbackHandler(parent)
+        config["callbacks"].append(handler)
+        return config, handler
 
     def run(self, prompt: str = "", skip_rag: bool = False) -> str:
         if not isinstance(prompt, str):
             raise TypeError("The prompt must be a string.")
         if not prompt: # Don't invoke the model if prompt is empty
             return ""
-        rag_prompt, runnable = self.do_chain(prompt, skip_rag)
-        text = runnable.invoke(rag_prompt)
+        with self._trace("run"):
+            rag_prompt, runnable = self.do_chain(prompt, skip_rag)
+            config, _ = Agent._chain_config()
+            text = runnable.invoke(rag_prompt, config=config)
 
-        self._log_time("chain invoked")
+            self._cache_response(prompt, rag_prompt, runnable, text)
         return text
 
     async def arun(self, prompt: str, skip_rag: bool = False) -> str:
@@ -276,57 +692,176 @@ class Agent:
             raise TypeError("The prompt must be a string.")
         if not prompt: # Don't invoke the model if prompt is empty
             return ""
-        rag_prompt, runnable = self.do_chain(prompt, skip_rag)
-        text = await runnable.ainvoke(rag_prompt)
+        with self._trace("arun"):
+            rag_prompt, runnable = await self.ado_chain(prompt, skip_rag)
+            config, _ = Agent._chain_config()
+            text = await runnable.ainvoke(rag_prompt, config=config)
 
-        self._log_time("chain invoked")
-        await self.memory_assistant.add_message(prompt, text)
-        self._log_time("Memory handling, done")
+            self._cache_response(prompt, rag_prompt, runnable, text)
+            with tracing.span("memory_update"):
+                await self.memory_assistant.add_message(prompt, text)
         return text
 
     async def stream(self, prompt: str, skip_rag: bool = False) -> AsyncGenerator[str, None]:
+        """
+        Streams the answer. Cancelling the task iterating the stream, or closing the
+        stream, aborts the model request. The aborted turn is not added to the memory,
+        stats["cancelled"] is set.
+        """
         if not isinstance(prompt, str):
             raise TypeError("The prompt must be a string.")
         if not prompt: # Don't invoke the model if prompt is empty
             yield ""
             return
-        collected_responses = ""
-        rag_prompt, runnable = self.do_chain(prompt, skip_rag)
-        async for response in runnable.astream(rag_prompt):
-            if response:
-                collected_responses += str(response)
-            yield response
+        self.stats["cancelled"] = False
+        # the trace isn't kept set across the yields, each step runs in its span
+        with self._trace("stream", in_context=False) as trace:
+            span = tracing.current_span() or trace.root
+            collected_responses = ""
+            try:
+                with tracing.use_span(span):
+                    rag_prompt, runnable = await self.ado_chain(prompt, skip_rag)
+                    config, handler = Agent._chain_config()
+                responses = tracing.in_span(span, runnable.astream(rag_prompt, config=config))
+                try:
+                    async for response in responses:
+                        if handler is not None:
+                            handler.first_token()
+                        if response:
+                            collected_responses += str(response)
+                        yield response
+                finally:
+                    # closes the model request right away, not when garbage collected
+                    await responses.aclose()
+            except (asyncio.CancelledError, GeneratorExit):
+                self.stats["cancelled"] = True
+                trace.root.set_attribute("cancelled", True)
+                STREAM_CANCELLATIONS.inc(agent=self.name)
+                raise
 
-        self._log_time("chain invoked")
-        await self.memory_assistant.add_message(prompt, collected_responses)
-        self._log_time("Memory handling, done")
+            self._cache_response(prompt, rag_prompt, runnable, collected_responses)
+            with tracing.use_span(span), tracing.span("memory_update"):
+                await self.memory_assistant.add_message(prompt, collected_responses)
 
-    def _stats_callback(self, stats):
-        # logging full prompts
-        if 'prompt_content' in stats and self.audit_prompts:
-            prompt_content = stats['prompt_content']
-            self.audit_counter += 1
-            os.makedirs('audit_logs', exist_ok=True)
-            timestamp = datetime.datetime.now().strftime('%Y%m%d_%H%M%S')
-            audit_file = f"audit_logs/audit_{timestamp}_{self.name}_{self.audit_counter:03d}.txt"
+    @staticmethod
+    def _prepare_batch(prompts) -> tuple[list, list]:
+        """
+        Returns the results list, prefilled for invalid and empty prompts, and the indices of the prompts to run.
+        """
+        results = [None] * len(prompts)
+        pending = []
+        for i, prompt in enumerate(prompts):
+            if not isinstance(prompt, str):
+                results[i] = TypeError("The prompt must be a string.")
+            elif not prompt: # Don't invoke the model if prompt is empty
+                results[i] = ""
+            else:
+                pending.append(i)
+        return results, pending
+
+    def run_many(self, prompts: list[str], max_concurrency: Optional[int] = None, skip_rag: bool = False) -> list:
+        """
+        Runs a batch of prompts against the agent, e.g. for offline classification.
+        All prompts are embedded in one batched call, retrieval is done per prompt and
+        up to max_concurrency LLM calls run in parallel.
+        Results are returned in input order. A prompt that fails returns its exception
+        instead of aborting the batch. The memory is not updated.
+        """
+        results, pending = Agent._prepare_batch(prompts)
+        if not pending:
+            return results
+        with self._trace("run_many"):
+            return self._run_many(prompts, results, pending, max_concurrency, skip_rag)
+
+    def _run_many(self, prompts, results, pending, max_concurrency, skip_rag) -> list:
+        inputs = {}
+        if skip_rag:
+            inputs = {i: prompts[i] for i in pending}
+        else:
+            try:
+                if self._needs_retrieval():
+                    query_embeddings = self.embed_queries([prompts[i] for i in pending])
+                else:
+                    query_embeddings = [None] * len(pending)
+            except Exception as e:
+                for i in pending:
+                    results[i] = e
+                return results
+            for i, query_embedding in zip(pending, query_embeddings):
+                try:
+                    agent_docs, user_docs = self._search(query_embedding, prompts[i])
+                    inputs[i] = self._chain_inputs(prompts[i], agent_docs, user_docs)
+                except Exception as e:
+                    results[i] = e
 
+        runnable = self.model if skip_rag else self._get_chain()
+        indices = list(inputs)
+        config, _ = Agent._chain_config(max_concurrency or self.batch_concurrency)
+        outputs = runnable.batch([inputs[i] for i in indices], config=config, return_exceptions=True)
+        for i, output in zip(indices, outputs):
+            results[i] = output
+        return results
+
+    async def abatch(self, prompts: list[str], max_concurrency: Optional[int] = None, skip_rag: bool = False) -> list:
+        """
+        Async variant of run_many, the retrieval for all prompts runs concurrently.
+        """
+        results, pending = Agent._prepare_batch(prompts)
+        if not pending:
+            return results
+        with self._trace("abatch"):
+            return await self._abatch(prompts, results, pending, max_concurrency, skip_rag)
+
+    async def _abatch(self, prompts, results, pending, max_concurrency, skip_rag) -> list:
+        inputs = {}
+        if skip_rag:
+            inputs = {i: prompts[i] for i in pending}
+        else:
             try:
-                with open(audit_file, 'w', encoding='utf-8') as f:
-                    f.write(f"=== PROMPT AUDIT LOG ===\n")
-                    f.write(f"Timestamp: {datetime.datetime.now().isoformat()}\n")
-                    f.write(f"Agent: {self.name}\n")
-                    f.write(f"Model: {self.config.model_name}\n")
-                    f.write(f"Prompt Size: {stats['prompt_size']} characters\n")
-                    f.write(f"Agent Vector Store Size: {len(self.agent_vectorstore.get()['documents']) if self.agent_vectorstore.get() else 0}\n")
-                    f.write(f"User Vector Store Size: {len(self.user_vectorstore.get()['documents']) if self.user_vectorstore.get() else 0}\n")
-                    f.write(f"Inline Context Length: {len(self.inline_context)}\n")
-                    f.write(f"Memory Enabled: {self.config.use_memory}\n")
-                    f.write(f"=== PROMPT CONTENT ===\n")
-                    f.write(prompt_content)
-                    f.write(f"\n=== END PROMPT CONTENT ===\n")
-                print(f"Prompt logged to: {audit_file}")
+                if self._needs_retrieval():
+                    query_embeddings = await self.aembed_queries([prompts[i] for i in pending])
+                else:
+                    query_embeddings = [None] * len(pending)
             except Exception as e:
-                print(f"Failed to save audit log: {e}")
+                for i in pending:
+                    results[i] = e
+                return results
+            searches = await asyncio.gather(
+                *[self._asearch(query_embedding, prompts[i]) for i, query_embedding in zip(pending, query_embeddings)],
+                return_exceptions=True,
+            )
+            for i, search in zip(pending, searches):
+                if isinstance(search, Exception):
+                    results[i] = search
+                else:
+                    inputs[i] = self._chain_inputs(prompts[i], *search)
+
+        runnable = self.model if skip_rag else self._get_chain()
+        indices = list(inputs)
+        config, _ = Agent._chain_config(max_concurrency or self.batch_concurrency)
+        outputs = await runnable.abatch([inputs[i] for i in indices], config=config, return_exceptions=True)
+        for i, output in zip(indices, outputs):
+            results[i] = output
+        return results
+
+    def _stats_callback(self, stats):
+        # logging full prompts
+        # only enqueued, the audit log is written in the background
+        if 'prompt_content' in stats and self.audit_log is not None:
+            self.audit_counter += 1
+            self.audit_log.write({
+                "timestamp": datetime.datetime.now().isoformat(),
+                "agent": self.name,
+                "session": self.session_id,
+                "sequence": self.audit_counter,
+                "model": self.config.model_name,
+                "prompt_size": stats['prompt_size'],
+                "agent_store_size": self.agent_store_size,
+                "user_store_size": self.user_store_size,
+                "inline_context_length": len(self.inline_context),
+                "memory_enabled": self.config.use_memory,
+                "prompt": stats['prompt_content'],
+            })
 
         if self.debug_mode:
             print(f"Prompt size: {stats['prompt_size']} characters")
@@ -335,56 +870,280 @@ class Agent:
 
         self.stats.update(stats)
 
-    def do_chain(self, prompt, skip_rag=False) -> tuple[dict, RunnablePassthrough]:
+    def _get_chain(self):
+        """
+        Returns the chain of the agent. The chain is built once and only rebuilt
+        when the template or the model changes, per request values are passed
+        in the input dict, see _chain_inputs().
+        """
+        if self._chain is None or self._chain_template != self.RAG_TEMPLATE or self._chain_model is not self.model:
+            self._chain = (
+                ChatPromptTemplate.from_template(self.RAG_TEMPLATE)
+                | InspectableRunnable(statsCallback=self._stats_callback)
+                | self.model
+                | StrOutputParser()
+            )
+            self._chain_template = self.RAG_TEMPLATE
+            self._chain_model = self.model
+        return self._chain
 
-        self._log_time("do_chain start")
-        rag_prompt = ChatPromptTemplate.from_template(self.RAG_TEMPLATE)
+    def _chain_inputs(self, prompt, agent_docs, user_docs) -> dict:
         history = "\n".join([message.content for message in self.memory_assistant.messages]) if self.config.use_memory else ""
-
-        if skip_rag:
-            return prompt, self.model
-
         today = datetime.datetime.now().strftime("%A, %B %d, %Y %I:%M %p")
         agent_info = self.config.name + " using " + self.config.model_name
 
-        chain = (
-            RunnablePassthrough.assign(
-                global_store=lambda input: Agent.format_docs(input["global_store"]),
-                session_store=lambda input: Agent.format_docs(input["session_store"]),
-                context=lambda input: self.inline_context,
-                history=lambda input: history,
-                today=lambda input: today,
-                agent=lambda input: agent_info
-            )
-            | rag_prompt
-            | InspectableRunnable(statsCallback=self._stats_callback)
-            | self.model
-            | StrOutputParser()
-        )
+        if self.config.debug:
+            print(f"History: {len(history)}")
+            print(f"Agent info: {agent_info}")
+
+        if self.context_packer:
+            sections, report = self.context_packer.pack(self.RAG_TEMPLATE, prompt, agent_docs, user_docs, self.inline_context, history)
+            self.stats["context_packing"] = report
+            if self.debug_mode:
+                print(f"Context packing: dropped chunks {report['dropped_chunks']}, truncated characters {report['truncated_chars']}")
+        else:
+            sections = {
+                "global_store": Agent.format_docs(agent_docs),
+                "session_store": Agent.format_docs(user_docs),
+                "context": self.inline_context,
+                "history": history,
+            }
+
+        return {
+            "question": prompt,
+            **sections,
+            "today": today,
+            "agent": agent_info,
+        }
+
+    def _retrieve(self, prompt) -> tuple[list, list]:
+        if not self._needs_retrieval():
+            return [], []
+        query_embedding = self.embed_query(prompt)
+        return self._search(query_embedding, prompt)
+
+    async def _aretrieve(self, prompt) -> tuple[list, list]:
+        if not self._needs_retrieval():
+            return [], []
+        query_embedding = await self.aembed_query(prompt)
+        return await self._asearch(query_embedding, prompt)
+
+    def _search(self, query_embedding, prompt="") -> tuple[list, list]:
+        """
+        Searches the stores used by the template, the other ones are not even created.
+        With hybrid search the prompt is also looked up in the BM25 indexes.
+        """
+        agent_docs, user_docs, vectors = [], [], {}
+        if self.uses_store("global_store"):
+            store = self.agent_vectorstore  # loads the data, before the size is known
+            with tracing.span("search.global_store"):
+                k = Agent._search_k(self.agent_store_size)
+                agent_docs = self._fuse_lexical(self._vector_search(store, query_embedding, k, vectors), self.agent_lexical_index, prompt, k)
+        if self.uses_store("session_store"):
+            with tracing.span("search.session_store"):
+                k = Agent._search_k(self.user_store_size)
+                user_docs = self._fuse_lexical(self._vector_search(self.user_vectorstore, query_embedding, k, vectors), self.user_lexical_index, prompt, k)
+        with tracing.span("diversify"):
+            agent_docs, user_docs = self._diversify(query_embedding, agent_docs, user_docs, vectors)
+
+        self._print_retrieval_debug(agent_docs, user_docs)
+        return agent_docs, user_docs
+
+    async def _asearch(self, query_embedding, prompt="") -> tuple[list, list]:
+        vectors = {}
+        if self.uses_store("global_store"):
+            store = await self._aagent_vectorstore()  # loads the data, before the size is known
+            agent_search = Agent._traced("search.global_store", self._avector_search(store, query_embedding, Agent._search_k(self.agent_store_size), vectors))
+        else:
+            agent_search = Agent._no_documents()
+        if self.uses_store("session_store"):
+            user_search = Agent._traced("search.session_store", self._avector_search(self.user_vectorstore, query_embedding, Agent._search_k(self.user_store_size), vectors))
+        else:
+            user_search = Agent._no_documents()
+        agent_docs, user_docs = await asyncio.gather(agent_search, user_search)
+        agent_docs = self._fuse_lexical(agent_docs, self.agent_lexical_index, prompt, Agent._search_k(self.agent_store_size))
+        user_docs = self._fuse_lexical(user_docs, self.user_lexical_index, prompt, Agent._search_k(self.user_store_size))
+        with tracing.span("diversify"):
+            agent_docs, user_docs = await self._adiversify(query_embedding, agent_docs, user_docs, vectors)
 
-        max_docs = len(self.agent_vectorstore.get()['documents']) if self.agent_vectorstore.get() else 10
-        max_docs = 10 if max_docs > 10 else max_docs
-        max_docs = max_docs if max_docs > 0 else 1
-        agent_docs = self.agent_vectorstore.similarity_search(prompt, max_docs)
+        self._print_retrieval_debug(agent_docs, user_docs)
+        return agent_docs, user_docs
 
-        max_docs = len(self.user_vectorstore.get()['documents']) if self.user_vectorstore.get() else 10
-        max_docs = 10 if max_docs > 10 else max_docs
-        max_docs = max_docs if max_docs > 0 else 1
-        user_docs = self.user_vectorstore.similarity_search(prompt, max_docs)
+    def _reranks_by_mmr(self) -> bool:
+        return self.diversifier is not None and self.diversifier.mmr
 
-        self._log_time("search done")
+    def _vector_search(self, store, query_embedding, k, vectors) -> list:
+        """
+        Searches a vector store. For MMR the stored vectors of the found documents are
+        added to vectors by document id, or, if the store doesn't return them, e.g. Chroma,
+        the store reranks by MMR itself. The documents are not embedded again.
+        """
+        if not self._reranks_by_mmr():
+            return store.similarity_search_by_vector(query_embedding, k)
+        if hasattr(store, "similarity_search_with_vectors_by_vector"):
+            results = store.similarity_search_with_vectors_by_vector(query_embedding, k)
+            vectors.update((doc.id, vector) for doc, vector in results)
+            return [doc for doc, _ in results]
+        return store.max_marginal_relevance_search_by_vector(query_embedding, k, lambda_mult=self.diversifier.lambda_mult)
+
+    async def _avector_search(self, store, query_embedding, k, vectors) -> list:
+        """
+        Async variant of _vector_search.
+        """
+        if not self._reranks_by_mmr():
+            return await store.asimilarity_search_by_vector(query_embedding, k)
+        if hasattr(store, "similarity_search_with_vectors_by_vector"):
+            return self._vector_search(store, query_embedding, k, vectors)
+        return await store.amax_marginal_relevance_search_by_vector(query_embedding, k, lambda_mult=self.diversifier.lambda_mult)
+
+    def _fuse_lexical(self, docs, lexical_index, prompt, k) -> list:
+        """
+        Fuses the vector search results with the BM25 results of the prompt by reciprocal rank fusion.
+        """
+        if lexical_index is None or not prompt:
+            return docs
+        lexical_docs = [doc for doc, _ in lexical_index.search(prompt, k)]
+        return reciprocal_rank_fusion([docs, lexical_docs], k, rrf_k=self.config.hybrid_search.get("rrf-k", 60))
+
+    def _diversify(self, query_embedding, agent_docs, user_docs, vectors) -> tuple[list, list]:
+        """
+        Removes duplicate chunks across both stores and, if configured, reranks them by MMR
+        with the vectors returned by the search. Only chunks found by BM25 alone are embedded.
+        """
+        if self.diversifier is None:
+            return agent_docs, user_docs
+        agent_docs, user_docs = self._deduplicate(agent_docs, user_docs)
+        if self.diversifier.mmr and (agent_docs or user_docs):
+            embedding_lists, missing = Agent._mmr_vectors([agent_docs, user_docs], vectors)
+            if missing:
+                Agent._fill_vectors(embedding_lists, missing, self.embeddings.embed_documents([doc.page_content for _, _, doc in missing]))
+            agent_docs, user_docs = self.diversifier.rerank(query_embedding, [agent_docs, user_docs], embedding_lists)
+        return agent_docs, user_docs
+
+    async def _adiversify(self, query_embedding, agent_docs, user_docs, vectors) -> tuple[list, list]:
+        """
+        Async variant of _diversify.
+        """
+        if self.diversifier is None:
+            return agent_docs, user_docs
+        agent_docs, user_docs = self._deduplicate(agent_docs, user_docs)
+        if self.diversifier.mmr and (agent_docs or user_docs):
+            embedding_lists, missing = Agent._mmr_vectors([agent_docs, user_docs], vectors)
+            if missing:
+                Agent._fill_vectors(embedding_lists, missing, await self.embeddings.aembed_documents([doc.page_content for _, _, doc in missing]))
+            agent_docs, user_docs = self.diversifier.rerank(query_embedding, [agent_docs, user_docs], embedding_lists)
+        return agent_docs, user_docs
+
+    @staticmethod
+    def _mmr_vectors(doc_lists, vectors) -> tuple[list, list]:
+        """
+        Returns the stored vectors of each list of documents, None for a list the store
+        reranked itself, and the (list, position, document) of the documents without a vector.
+        """
+        embedding_lists, missing = [], []
+        for i, docs in enumerate(doc_lists):
+            if not any(doc.id in vectors for doc in docs):
+                embedding_lists.append(None)
+                continue
+            embedding_lists.append([vectors.get(doc.id) for doc in docs])
+            missing.extend((i, j, doc) for j, doc in enumerate(docs) if doc.id not in vectors)
+        return embedding_lists, missing
+
+    @staticmethod
+    def _fill_vectors(embedding_lists, missing, embeddings):
+        for (i, j, _), embedding in zip(missing, embeddings):
+            embedding_lists[i][j] = embedding
+
+    def _deduplicate(self, agent_docs, user_docs) -> tuple[list, list]:
+        (agent_docs, user_docs), removed = self.diversifier.deduplicate(agent_docs, user_docs)
+        self.stats["duplicates_removed"] = removed
+        if self.debug_mode and removed:
+            print(f"Removed duplicate chunks: {removed}")
+        return agent_docs, user_docs
+
+    @staticmethod
+    async def _no_documents() -> list:
+        return []
+
+    @staticmethod
+    async def _traced(name, awaitable):
+        with tracing.span(name):
+            return await awaitable
+
+    def _print_retrieval_debug(self, agent_docs, user_docs):
         if self.config.debug:
-            print(f"Agent vector store size: {len(self.agent_vectorstore.get()['documents'])}")
-            print(f"User vector store size: {len(self.user_vectorstore.get()['documents'])}")
+            print(f"Agent vector store size: {self.agent_store_size}")
+            print(f"User vector store size: {self.user_store_size}")
             print(f"Agent docs: {len(agent_docs)}")
             print(f"User docs: {len(user_docs)}")
-            print(f"History: {len(history)}")
-            print(f"Agent info: {agent_info}")
 
-        try:
-            return {"global_store": agent_docs, "session_store": user_docs, "question": prompt}, chain
-        except Exception as e:
-            print(f"Error in do_chain: {e}")
+    def _cached_response(self, prompt, inputs=None, query_embedding=None):
+        """
+        Looks up an answer in the response cache, by query embedding before retrieval
+        (semantic mode) or by the retrieved inputs after retrieval.
+        """
+        if inputs is not None:
+            answer = self.response_cache.get(ResponseCache.key(self.name, prompt, inputs))
+        else:
+            answer = self.response_cache.get_similar(query_embedding)
+        if answer is not None:
+            self.stats["response_cache"] = "hit"
+            if self.debug_mode:
+                print("Response cache hit")
+        return answer
+
+    def _cache_response(self, prompt, rag_prompt, runnable, text):
+        if self.response_cache is None or not isinstance(rag_prompt, dict) or isinstance(runnable, CachedAnswer):
+            return
+        self.stats["response_cache"] = "miss"
+        # not a lookup of the query embedding cache, its hit ratio is unchanged
+        query_embedding = self.query_embeddings.peek(prompt) if self._semantic_cache() else None
+        self.response_cache.put(ResponseCache.key(self.name, prompt, rag_prompt), text, query_embedding)
+
+    def _semantic_cache(self) -> bool:
+        """
+        Whether answers are looked up by query embedding, not with a memory, the
+        answer to a follow-up question depends on the history.
+        """
+        return self.response_cache is not None and self.response_cache.semantic and not self.config.use_memory
+
+    def do_chain(self, prompt, skip_rag=False) -> tuple[dict, Runnable]:
+        if skip_rag:
+            return prompt, self.model
+
+        if self._semantic_cache():
+            answer = self._cached_response(prompt, query_embedding=self.embed_query(prompt))
+            if answer is not None:
+                return {"question": prompt}, CachedAnswer(answer)
+
+        agent_docs, user_docs = self._retrieve(prompt)
+        inputs = self._chain_inputs(prompt, agent_docs, user_docs)
+        if self.response_cache is not None:
+            answer = self._cached_response(prompt, inputs=inputs)
+            if answer is not None:
+                return inputs, CachedAnswer(answer)
+        return inputs, self._get_chain()
+
+    async def ado_chain(self, prompt, skip_rag=False) -> tuple[dict, Runnable]:
+        """
+        Async variant of do_chain, doesn't block the event loop while embedding the
+        prompt and searching. Agent store and user store are searched concurrently.
+        """
+        if skip_rag:
+            return prompt, self.model
+
+        if self._semantic_cache():
+            answer = self._cached_response(prompt, query_embedding=await self.aembed_query(prompt))
+            if answer is not None:
+                return {"question": prompt}, CachedAnswer(answer)
+
+        agent_docs, user_docs = await self._aretrieve(prompt)
+        inputs = self._chain_inputs(prompt, agent_docs, user_docs)
+        if self.response_cache is not None:
+            answer = self._cached_response(prompt, inputs=inputs)
+            if answer is not None:
+                return inputs, CachedAnswer(answer)
+        return inputs, self._get_chain()
 
     def get_summary_memory(self):
         return self.memory_assistant.summary_memory
\ No newline at end of file
@@ -2,24 +2,174 @@
 Agent-Assembly-Line
 """
 
+import asyncio
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
 from agent_assembly_line import ChatAgent
 
 class AgentManager:
     """
-    Does not take ownership of the agent, just manages the selection of the agent.
+    Keeps a pool of agents by name, so selecting an agent again does not reload
+    its config, data, embeddings and memory. The selected agent is the current agent.
+
+    Agents idle for idle_ttl seconds, and the least recently used ones beyond
+    max_agents, are evicted. The current agent is never evicted. Evicted agents
+    are closed by close_evicted(), which stops their memory assistants and
+    closes their model clients. Agents serving a request, see acquire(), are
+    closed by a later close_evicted() after their last release().
+
+    select_agent() loads the agent in the calling thread, it can be run in a worker thread.
     """
-    def __init__(self):
+    def __init__(self, max_agents: int = 4, idle_ttl: Optional[float] = None, agent_class=ChatAgent):
+        if max_agents < 1:
+            raise ValueError("The agent pool needs room for at least one agent.")
+        self.max_agents = max_agents
+        self.idle_ttl = idle_ttl
+        self.agent_class = agent_class
         self.current_agent = None
+        self.agents = OrderedDict()
+        self._last_used = {}
+        self._started = set()
+        self._in_use = {}
+        self._evicted = []
+        self._lock = threading.RLock()
+
+    @classmethod
+    def from_env(cls) -> "AgentManager":
+        idle_ttl = os.getenv('AGENT_IDLE_TTL')
+        return cls(int(os.getenv('AGENT_POOL_SIZE', '4')), float(idle_ttl) if idle_ttl else None)
+
+    @staticmethod
+    def prewarm_names() -> list[str]:
+        """
+        The agents to load at startup, a comma separated list in AGENT_PREWARM.
+        """
+        return [name.strip() for name in os.getenv('AGENT_PREWARM', '').split(",") if name.strip()]
+
+    def load_agent(self, agent_name, debug=False):
+        """
+        Returns the pooled agent, loading it if needed, without selecting it.
+        """
+        with self._lock:
+            agent = self.agents.get(agent_name)
+            if agent is None:
+                agent = self.agent_class(agent_name, debug)
+                self.agents[agent_name] = agent
+            self.agents.move_to_end(agent_name)
+            self._last_used[agent_name] = time.monotonic()
+            self._evict(keep=agent)
+            return agent
 
     def select_agent(self, agent_name, debug=False):
-        if self.current_agent is None or self.current_agent.name != agent_name:
-            self.current_agent = ChatAgent(agent_name, debug)
-        return self.current_agent
+        with self._lock:
+            self.current_agent = self.load_agent(agent_name, debug)
+            self._evict()
+            return self.current_agent
 
     def get_agent(self):
         if self.current_agent is None:
             raise ValueError("No agent selected")
         return self.current_agent
 
+    def acquire(self, agent=None):
+        """
+        Returns the current agent, or the given pooled agent, counted as in use
+        until release(), e.g. while a request of one of its sessions is served.
+        """
+        with self._lock:
+            agent = agent or self.get_agent()
+            self._in_use[agent] = self._in_use.get(agent, 0) + 1
+            return agent
+
+    def release(self, agent):
+        with self._lock:
+            self._in_use[agent] -= 1
+            if self._in_use[agent] == 0:
+                del self._in_use[agent]
+
+    def _evict(self, keep=None):
+        now = time.monotonic()
+        for name in list(self.agents):
+            agent = self.agents[name]
+            if agent is self.current_agent or agent is keep:
+                continue
+            idle = self.idle_ttl is not None and now - self._last_used[name] > self.idle_ttl
+            if idle or len(self.agents) > self.max_agents:
+                self._evicted.append(self.agents.pop(name))
+                del self._last_used[name]
+
+    def evict_idle(self) -> int:
+        """
+        Evicts the agents idle for longer than idle_ttl, returns the number of agents to close.
+        """
+        with self._lock:
+            self._evict()
+            return len(self._evicted)
+
+    async def start_agent(self, agent):
+        """
+        Starts the memory assistant of an agent once, it is stopped when the agent is closed.
+        An agent reloaded after its eviction is a new agent and started again.
+        """
+        if agent in self._started:
+            return
+        self._started.add(agent)
+        try:
+            await agent.startMemoryAssistant()
+        except Exception as e:
+            print(f"Error starting the memory assistant of {agent.name}: {e}")
+
+    async def close_evicted(self):
+        """
+        Closes the evicted agents, except the ones still in use.
+        """
+        with self._lock:
+            evicted = [agent for agent in self._evicted if agent not in self._in_use]
+            self._evicted = [agent for agent in self._evicted if agent in self._in_use]
+        for agent in evicted:
+            if agent in self._started:
+                self._started.discard(agent)
+                await agent.stopMemoryAssistant()
+            await agent.aCloseModels()
+
+    def _warm_agent(self, agent_name, debug=False):
+        agent = self.load_agent(agent_name, debug)
+        agent.warm_up()
+        return agent
+
+    async def prewarm(self, agent_names: list[str], runner=asyncio.to_thread, debug=False):
+        """
+        Loads the agents in the background with runner, without selecting them.
+        Their models, embeddings and data are loaded too, so the first question
+        doesn't wait for them. Agents failing to load are skipped.
+        """
+        for name in agent_names[:self.max_agents]:
+            try:
+                await runner(self._warm_agent, name, debug)
+            except Exception as e:
+                print(f"Prewarming agent {name} failed: {e}")
+        await self.close_evicted()
+
+    async def aclose(self):
+        """
+        Evicts and closes all agents.
+        """
+        with self._lock:
+            self._evicted.extend(self.agents.values())
+            self.agents.clear()
+            self._last_used.clear()
+            self.current_agent = None
+        await self.close_evicted()
+
     def cleanup(self):
-        self.current_agent = None
\ No newline at end of file
+        with self._lock:
+            self.current_agent = None
+            self.agents.clear()
+            self._last_used.clear()
+            self._started.clear()
+            self._in_use.clear()
+            self._evicted = []
@@ -0,0 +1,170 @@
+"""
+Agent-Assembly-Line
+"""
+
+import atexit
+import gzip
+import json
+import os
+import queue
+import shutil
+import threading
+from typing import Optional
+
+class AuditLog:
+    """
+    Buffered writer of audit records, e.g. the full prompts of an agent, to JSONL files.
+
+    write() only enqueues the record, a background thread writes the records
+    to `directory/audit_{name}.jsonl`. The file is rotated when it would exceed
+    `max_bytes`, `backups` rotated files are kept, gzip compressed with `compress`.
+
+    When the queue is full new records are dropped. With the "sample" overflow
+    policy only every `sample_every`-th record is kept once the queue is half full,
+    so a burst is thinned out before records are dropped. `dropped` counts the
+    records not written.
+
+    Logs of the same file are shared, see get().
+    """
+
+    OVERFLOW_POLICIES = ("drop", "sample")
+
+    _logs: dict = {}
+    _logs_lock = threading.Lock()
+
+    def __init__(self, path: str, max_bytes: int = 10 * 1024 * 1024, backups: int = 5, compress: bool = False,
+                 queue_size: int = 1000, overflow: str = "drop", sample_every: int = 10):
+        if overflow not in self.OVERFLOW_POLICIES:
+            raise ValueError(f"Invalid audit log overflow policy: {overflow}. Choose either 'drop' or 'sample'.")
+        if queue_size < 1 or sample_every < 1:
+            raise ValueError("The audit log queue size and sample rate must be at least 1.")
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.compress = compress
+        self.overflow = overflow
+        self.sample_every = sample_every
+        self.dropped = 0
+        self.written = 0
+        self._offered = 0
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._file = None
+        self._worker = threading.Thread(target=self._run, name=f"audit-log-{os.path.basename(path)}", daemon=True)
+        self._worker.start()
+
+    @classmethod
+    def get(cls, path: str, **settings) -> "AuditLog":
+        """
+        Returns the log of the file, created with the settings on first use.
+        """
+        path = os.path.abspath(path)
+        with cls._logs_lock:
+            log = cls._logs.get(path)
+            if log is None:
+                log = cls._logs[path] = cls(path, **settings)
+            return log
+
+    @classmethod
+    def from_config(cls, audit_log: dict, name: str) -> Optional["AuditLog"]:
+        """
+        Returns the log of an agent from the audit-log section of its config, e.g.
+        { "directory": "audit_logs", "max-bytes": 10485760, "backups": 5, "compress": true,
+          "queue-size": 1000, "overflow": "sample", "sample-every": 10 }.
+        True uses the defaults, returns None if the section is missing.
+        """
+        if not audit_log:
+            return None
+        audit_log = audit_log if isinstance(audit_log, dict) else {}
+        return cls.get(
+            os.path.join(audit_log.get("directory", "audit_logs"), f"audit_{name}.jsonl"),
+            max_bytes=audit_log.get("max-bytes", 10 * 1024 * 1024),
+            backups=audit_log.get("backups", 5),
+            compress=audit_log.get("compress", False),
+            queue_size=audit_log.get("queue-size", 1000),
+            overflow=audit_log.get("overflow", "drop"),
+            sample_every=audit_log.get("sample-every", 10),
+        )
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def write(self, record: dict) -> bool:
+        """
+        Enqueues the record without blocking, returns False if it was dropped.
+        """
+        self._offered += 1
+        if self.overflow == "sample" and self._queue.qsize() >= self._queue.maxsize // 2 and self._offered % self.sample_every:
+            self.dropped += 1
+            return False
+        try:
+            self._queue.put_nowait(record)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            return False
+
+    def flush(self):
+        """
+        Blocks until all enqueued records are written.
+        """
+        self._queue.join()
+
+    def _run(self):
+        while True:
+            records = [self._queue.get()]
+            while True:
+                try:
+                    records.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._write(records)
+            except Exception as e:
+                print(f"Failed to write audit log {self.path}: {e}")
+            finally:
+                for _ in records:
+                    self._queue.task_done()
+
+    def _write(self, records: list[dict]):
+        for record in records:
+            line = json.dumps(record, ensure_ascii=False, default=str) + "\n"
+            data = line.encode("utf-8")
+            if self._file is None:
+                os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+                self._file = open(self.path, "ab")
+            if self._file.tell() and self._file.tell() + len(data) > self.max_bytes:
+                self._rotate()
+            self._file.write(data)
+            self.written += 1
+        self._file.flush()
+
+    def _backup_path(self, i: int) -> str:
+        return f"{self.path}.{i}.gz" if self.compress else f"{self.path}.{i}"
+
+    def _rotate(self):
+        self._file.close()
+        self._file = None
+        if self.backups > 0:
+            for i in range(self.backups - 1, 0, -1):
+                if os.path.exists(self._backup_path(i)):
+                    os.replace(self._backup_path(i), self._backup_path(i + 1))
+            if self.compress:
+                with open(self.path, "rb") as source, gzip.open(self._backup_path(1), "wb") as target:
+                    shutil.copyfileobj(source, target)
+                os.remove(self.path)
+            else:
+                os.replace(self.path, self._backup_path(1))
+        else:
+            os.remove(self.path)
+        self._file = open(self.path, "ab")
+
+    @classmethod
+    def flush_all(cls):
+        with cls._logs_lock:
+            logs = list(cls._logs.values())
+        for log in logs:
+            log.flush()
+
+# Records still queued at exit are written, the worker threads are daemons.
+atexit.register(AuditLog.flush_all)
@@ -5,6 +5,7 @@ Agent-Assembly-Line
 import os
 import yaml
 from typing import Optional, Dict, Any
+from agent_assembly_line.utils.string_utils import strtobool
 
 class Config:
     """
@@ -25,11 +26,27 @@ class Config:
     model_name: str = ""
     model_identifier: str = ""
     custom_embeddings: str = ""
+    embedding_cache: bool = False
 
     # memory
     memory_prompt: str = ""
     use_memory: bool = False
 
+    # index
+    persist_index: bool = False
+    vector_store: str = "chroma"
+    chunking: dict = {}
+
+    # retrieval
+    context_budget: dict = {}
+    response_cache: dict = {}
+    hybrid_search: dict = {}
+    diversity: dict = {}
+
+    # auditing
+    audit_log: dict = {}
+    tracing: dict = {}
+
     # misc
     debug: bool = False
     timeout: int = 120
@@ -74,10 +91,21 @@ class Config:
         if "custom-embeddings" in config["llm"].keys():
             self.custom_embeddings = config["llm"]["custom-embeddings"]
         # self.custom_embeddings = config["llm"].get("custom_embeddings", "")
+        self.embedding_cache = config.get("embedding-cache", strtobool(os.getenv('EMBEDDING_CACHE', 'false')))
         self.memory_prompt = config.get("memory-prompt", "Please summarize the conversation.")
         self.use_memory = config.get("use-memory", False)
         self.timeout = config.get("timeout", 120)
         self.ollama_keep_alive = config.get("ollama-keep-alive", False)
+        self.persist_index = config.get("persist-index", False)
+        self.vector_store = config.get("vector-store", "chroma")
+        self.chunking = config.get("chunking", {})
+        self.context_budget = config.get("context-budget", {})
+        self.response_cache = config.get("response-cache", {})
+        hybrid_search = config.get("hybrid-search", {})
+        self.hybrid_search = {"rrf-k": 60} if hybrid_search is True else (hybrid_search or {})
+        self.diversity = config.get("diversity", {})
+        self.audit_log = config.get("audit-log", {})
+        self.tracing = config.get("tracing", {})
 
         self.llm_type, self.model_name = Config.parse_model_identifier(self.model_identifier)
 
@@ -135,6 +163,15 @@ class Config:
                 file.write('[]')
             return user_memory_path
 
+    @property
+    def index_path(self) -> str:
+        """
+        Get the directory of the agent's persistent knowledge index, <name>/index in
+        the USER_INDEX_PATH directory, each agent has its own index.
+        """
+        root = os.getenv('USER_INDEX_PATH', os.path.expanduser("~/.local/share/agent-assembly-line/agents"))
+        return os.path.join(root, self.name, "index")
+
     def cleanup(self):
         self.doc = None
         self.url = None
@@ -2,41 +2,44 @@
 Agent-Assembly-Line
 """
 
-import requests
+import importlib
 from .base_loader import DataLoader
-from .web_loader import WebLoader
-from .rss_feed_loader import RSSFeedLoader
-from .json_loader import JSONLoader
-from .text_loader import TextLoader, InlineTextLoader
-from .pdf_loader import PDFLoader
-from .bluesky_loader import BlueskyLoader
-from .rest_api_loader import RESTAPILoader
-from .ocr_loader import OCRLoader
-# TODO: lazy import loaders
+
+# Loaders by source type, as (module, class). A loader module is imported when
+# the loader is first requested, many of them pull in heavy dependencies like
+# selenium, atproto or pytesseract.
+_LOADERS = {
+    "web": (".web_loader", "WebLoader"),
+    "rss": (".rss_feed_loader", "RSSFeedLoader"),
+    "json": (".json_loader", "JSONLoader"),
+    "text": (".text_loader", "TextLoader"),
+    "pdf": (".pdf_loader", "PDFLoader"),
+    "rest_api": (".rest_api_loader", "RESTAPILoader"),
+    "inline_text": (".text_loader", "InlineTextLoader"),
+    "bluesky": (".bluesky_loader", "BlueskyLoader"),
+    "ocr": (".ocr_loader", "OCRLoader"),
+}
 
 class DataLoaderFactory:
     @staticmethod
-    def get_loader(source_type: str) -> DataLoader:
-        if source_type == "web":
-            return WebLoader()
-        elif source_type == "rss":
-            return RSSFeedLoader()
-        elif source_type == "json":
-            return JSONLoader()
-        elif source_type == "text":
-            return TextLoader()
-        elif source_type == "pdf":
-            return PDFLoader()
-        elif source_type == "rest_api":
-            return RESTAPILoader()
-        elif source_type == "inline_text":
-            return InlineTextLoader()
-        elif source_type == "bluesky":
-            return BlueskyLoader()
-        elif source_type == "ocr":
-            return OCRLoader()
-        else:
+    def register_loader(source_type: str, module: str, class_name: str):
+        """
+        Registers a loader class for a source type, e.g.
+        register_loader("wordpress", "agent_assembly_line.data_loaders.wordpress_loader", "WordPressLoader").
+        The module is imported when the loader is first requested.
+        """
+        _LOADERS[source_type] = (module, class_name)
+
+    @staticmethod
+    def get_loader_class(source_type: str) -> type:
+        if source_type not in _LOADERS:
             raise ValueError(f"Unsupported source type: {source_type}")
+        module, class_name = _LOADERS[source_type]
+        return getattr(importlib.import_module(module, __package__), class_name)
+
+    @staticmethod
+    def get_loader(source_type: str) -> DataLoader:
+        return DataLoaderFactory.get_loader_class(source_type)()
 
     @staticmethod
     def guess_file_type(file_path: str) -> str:
@@ -66,6 +69,7 @@ class DataLoaderFactory:
         elif url.startswith("https://bsky.app/profile/"):
             return 'bluesky'
         else:
+            import requests
             try:
                 response = requests.head(url)
                 content_type = response.headers.get('Content-Type', '').lower()
@@ -2,6 +2,10 @@
 Agent-Assembly-Line
 """
 
+import asyncio
+import contextlib
+
+from agent_assembly_line import tracing
 from agent_assembly_line.micros.choose_agent_agent import ChooseAgentAgent
 
 from agent_assembly_line.agent import Agent
@@ -27,6 +31,12 @@ def _get_agent_or_fallback(self, prompt, white_list):
     return None
 
 
+def _trace(self, name, in_context=True):
+    """
+    Traces the routed call, so the router span and the call share one trace.
+    """
+    return self._trace(name, in_context) if hasattr(self, "tracer") else contextlib.nullcontext()
+
 def agent_router(allowed_agents=None):
     """
     Higher-order decorator to add agent_routing logic to the Agent class.
@@ -46,32 +56,46 @@ def agent_router(allowed_agents=None):
         original_aclose_models = getattr(cls, "aCloseModels", None)
 
         def run_with_agent_router(self, prompt, *args, **kwargs):
-            agent = _get_agent_or_fallback(self, prompt, allowed_agents)
-            if agent:
-                agent_result = agent.run()
-                self.add_inline_text(agent_result)
-            return original_run(self, prompt, *args, **kwargs)
+            with _trace(self, "run"):
+                with tracing.span("router"):
+                    agent = _get_agent_or_fallback(self, prompt, allowed_agents)
+                    if agent:
+                        agent_result = agent.run()
+                        self.add_inline_text(agent_result)
+                return original_run(self, prompt, *args, **kwargs)
 
         async def arun_with_agent_router(self, prompt, *args, **kwargs):
-            agent = _get_agent_or_fallback(self, prompt, allowed_agents)
-            if agent:
-                agent_result = agent.run()
-                self.add_inline_text(agent_result)
-            if original_arun:
-                return await original_arun(self, prompt, *args, **kwargs)
-            else:
-                raise NotImplementedError("arun method is not implemented.")
+            with _trace(self, "arun"):
+                # routing runs blocking micro agents, keep them off the event loop
+                with tracing.span("router"):
+                    agent = await asyncio.to_thread(_get_agent_or_fallback, self, prompt, allowed_agents)
+                    if agent:
+                        agent_result = await asyncio.to_thread(agent.run)
+                        self.add_inline_text(agent_result)
+                if original_arun:
+                    return await original_arun(self, prompt, *args, **kwargs)
+                else:
+                    raise NotImplementedError("arun method is not implemented.")
 
         async def stream_with_agent_router(self, prompt, *args, **kwargs):
-            agent = _get_agent_or_fallback(self, prompt, allowed_agents)
-            if agent:
-                agent_result = agent.run()
-                self.add_inline_text(agent_result)
-            if original_stream:
-                async for item in original_stream(self, prompt, *args, **kwargs):
-                    yield item
-            else:
-                raise NotImplementedError("stream method is not implemented.")
+            # the trace isn't kept set across the yields, each step runs in its span
+            with _trace(self, "stream", in_context=False) as trace:
+                span = tracing.current_span() or getattr(trace, "root", None)
+                # routing runs blocking micro agents, keep them off the event loop
+                with tracing.use_span(span), tracing.span("router"):
+                    agent = await asyncio.to_thread(_get_agent_or_fallback, self, prompt, allowed_agents)
+                    if agent:
+                        agent_result = await asyncio.to_thread(agent.run)
+                        self.add_inline_text(agent_result)
+                if original_stream:
+                    items = tracing.in_span(span, original_stream(self, prompt, *args, **kwargs))
+                    try:
+                        async for item in items:
+                            yield item
+                    finally:
+                        await items.aclose()
+                else:
+                    raise NotImplementedError("stream method is not implemented.")
 
         def cleanup_with_router(self, *args, **kwargs):
             if original_cleanup:
@@ -0,0 +1,212 @@
+"""
+Agent-Assembly-Line
+"""
+
+import asyncio
+import hashlib
+import os
+import sqlite3
+import threading
+import time
+from array import array
+from typing import List, Optional
+
+from langchain_core.embeddings import Embeddings
+
+class EmbeddingCache:
+    """
+    On-disk cache of embeddings in SQLite, keyed by embeddings model and text hash.
+    The cache is shared by all agents in the process, see get_embedding_cache().
+    The least recently used entries are evicted when max_entries is exceeded.
+
+    Lookups don't write, the last use of cache hits is kept in memory and written
+    with the next insert, or when _flush_size hits or _flush_interval seconds
+    have been collected.
+    """
+
+    _batch_size = 500  # SQLite limits the number of variables per statement
+    _flush_size = 1000
+    _flush_interval = 60.0
+
+    def __init__(self, path: str, max_entries: int = 100000):
+        self.path = path
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+        self._touched = {}
+        self._flushed_at = time.monotonic()
+        if path != ":memory:":
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS embeddings ("
+            " key TEXT PRIMARY KEY,"
+            " vector BLOB NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._db.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+        self._db.commit()
+        self._size = self._db.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0]
+
+    @staticmethod
+    def _key(model: str, text: str) -> str:
+        return model + ":" + hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+    def get_many(self, model: str, texts: List[str]) -> List[Optional[List[float]]]:
+        """
+        Batched lookup, returns None for every text that is not cached.
+        """
+        keys = [self._key(model, text) for text in texts]
+        found = {}
+        with self._lock:
+            for start in range(0, len(keys), self._batch_size):
+                batch = list(set(keys[start:start + self._batch_size]))
+                placeholders = ",".join("?" * len(batch))
+                rows = self._db.execute(
+                    f"SELECT key, vector FROM embeddings WHERE key IN ({placeholders})", batch
+                ).fetchall()
+                found.update(rows)
+            now = time.time()
+            for key in found:
+                self._touched[key] = now
+            hits = sum(1 for key in keys if key in found)
+            self.hits += hits
+            self.misses += len(keys) - hits
+            if len(self._touched) >= self._flush_size or time.monotonic() - self._flushed_at > self._flush_interval:
+                self._flush_touched()
+                self._db.commit()
+
+        return [array("d", found[key]).tolist() if key in found else None for key in keys]
+
+    def put_many(self, model: str, texts: List[str], vectors: List[List[float]]):
+        now = time.time()
+        rows = {self._key(model, text): (array("d", vector).tobytes(), now) for text, vector in zip(texts, vectors)}
+        with self._lock:
+            # the eviction needs the last use of the hits
+            self._flush_touched()
+            # the size is counted, not queried, COUNT(*) scans the table
+            keys = list(rows)
+            replaced = 0
+            for start in range(0, len(keys), self._batch_size):
+                batch = keys[start:start + self._batch_size]
+                placeholders = ",".join("?" * len(batch))
+                replaced += self._db.execute(f"SELECT COUNT(*) FROM embeddings WHERE key IN ({placeholders})", batch).fetchone()[0]
+            self._db.executemany("INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                                 [(key, vector, last_used) for key, (vector, last_used) in rows.items()])
+            self._db.commit()
+            self._size += len(keys) - replaced
+            if self._size > self.max_entries:
+                self._evict()
+
+    def _flush_touched(self):
+        """
+        Writes the last use of the cache hits since the last flush, the caller commits.
+        """
+        if self._touched:
+            self._db.executemany(
+                "UPDATE embeddings SET last_used = ? WHERE key = ?",
+                [(last_used, key) for key, last_used in self._touched.items()]
+            )
+            self._touched = {}
+        self._flushed_at = time.monotonic()
+
+    def _evict(self):
+        # evict down to 90% to not evict on every insert
+        target = int(self.max_entries * 0.9)
+        deleted = self._db.execute(
+            "DELETE FROM embeddings WHERE key IN "
+            "(SELECT key FROM embeddings ORDER BY last_used ASC LIMIT ?)",
+            (self._size - target,)
+        ).rowcount
+        self._db.commit()
+        self._size -= deleted
+
+    def __len__(self):
+        return self._size
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits, misses = self.hits, self.misses
+        lookups = hits + misses
+        return {
+            "entries": self._size,
+            "hits": hits,
+            "misses": misses,
+            "hit_rate": hits / lookups if lookups else 0.0,
+        }
+
+    def close(self):
+        with self._lock:
+            self._flush_touched()
+            self._db.commit()
+            self._db.close()
+
+
+class CachedEmbeddings(Embeddings):
+    """
+    Wraps an embeddings object, only texts that are not in the cache are embedded.
+    Attributes not defined here are delegated to the wrapped embeddings.
+    The async methods access the cache in a worker thread, not on the event loop.
+    """
+
+    def __init__(self, embeddings: Embeddings, model: str, cache: EmbeddingCache):
+        self.embeddings = embeddings
+        self.model = model
+        self.cache = cache
+
+    def __getattr__(self, name):
+        return getattr(self.__dict__["embeddings"], name)
+
+    def embed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = self.cache.get_many(self.model, texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            new_vectors = self.embeddings.embed_documents([texts[i] for i in missing])
+            self._fill(texts, vectors, missing, new_vectors)
+        return vectors
+
+    def embed_query(self, text: str) -> List[float]:
+        vector = self.cache.get_many(self.model, [text])[0]
+        if vector is None:
+            vector = self.embeddings.embed_query(text)
+            self.cache.put_many(self.model, [text], [vector])
+        return vector
+
+    async def aembed_documents(self, texts: List[str]) -> List[List[float]]:
+        vectors = await asyncio.to_thread(self.cache.get_many, self.model, texts)
+        missing = [i for i, vector in enumerate(vectors) if vector is None]
+        if missing:
+            new_vectors = await self.embeddings.aembed_documents([texts[i] for i in missing])
+            await asyncio.to_thread(self._fill, texts, vectors, missing, new_vectors)
+        return vectors
+
+    async def aembed_query(self, text: str) -> List[float]:
+        vector = (await asyncio.to_thread(self.cache.get_many, self.model, [text]))[0]
+        if vector is None:
+            vector = await self.embeddings.aembed_query(text)
+            await asyncio.to_thread(self.cache.put_many, self.model, [text], [vector])
+        return vector
+
+    def _fill(self, texts, vectors, missing, new_vectors):
+        for i, vector in zip(missing, new_vectors):
+            vectors[i] = vector
+        self.cache.put_many(self.model, [texts[i] for i in missing], new_vectors)
+
+
+_embedding_cache = None
+_embedding_cache_lock = threading.Lock()
+
+def get_embedding_cache() -> EmbeddingCache:
+    """
+    Returns the process-wide embedding cache.
+    Location and size can be set with EMBEDDING_CACHE_PATH and EMBEDDING_CACHE_MAX_ENTRIES.
+    """
+    global _embedding_cache
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            path = os.getenv('EMBEDDING_CACHE_PATH', os.path.expanduser("~/.local/share/agent-assembly-line/embeddings.sqlite3"))
+            max_entries = int(os.getenv('EMBEDDING_CACHE_MAX_ENTRIES', 100000))
+            _embedding_cache = EmbeddingCache(path, max_entries=max_entries)
+        return _embedding_cache
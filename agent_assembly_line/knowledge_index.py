@@ -0,0 +1,224 @@
+"""
+Agent-Assembly-Line
+"""
+
+import hashlib
+import json
+import os
+from collections import Counter
+from typing import Optional
+
+from langchain_core.vectorstores import VectorStore
+
+from agent_assembly_line.retrieval.bm25 import BM25Index
+from agent_assembly_line.vectorstores.vector_store_factory import VectorStoreFactory
+
+class KnowledgeIndex:
+    """
+    Persistent, content-addressed vector index of the data configured for an agent.
+
+    The index is stored on disk together with a manifest. The manifest holds the key
+    of the index: a hash of the source content, the splitter settings and the
+    embeddings model. As long as the key doesn't change, the stored index is reused
+    across restarts. If only the content changed, update() embeds just the new chunks
+    and deletes the vanished ones: chunks are stored under their content hash, the
+    ids of the stored chunks are kept next to the manifest.
+    The vector store backend is one of VectorStoreFactory's, an index built with
+    another backend is rebuilt. For hybrid search a BM25 index of the same chunks
+    is stored next to it.
+    """
+
+    COLLECTION = "context"
+    MANIFEST = "manifest.json"
+    LEXICAL_INDEX = "bm25.json"
+    CHUNKS = "chunks.json"
+
+    def __init__(self, path: str, embeddings, embeddings_model: str, chunk_size: int, chunk_overlap: int, vector_store: str = "chroma", chunking: Optional[dict] = None):
+        self.path = path
+        self.vector_store = vector_store
+        self.embeddings = embeddings
+        self.embeddings_model = embeddings_model
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        # Further splitter settings, e.g. the unit and the boundaries
+        self.chunking = chunking or {}
+
+    def key_for_file(self, file_path: str) -> str:
+        """
+        Key of the index for a file, hashes the raw file content without parsing it.
+        """
+        content_hash = hashlib.sha256()
+        with open(file_path, "rb") as f:
+            for block in iter(lambda: f.read(1 << 20), b""):
+                content_hash.update(block)
+        return self._key(content_hash.hexdigest())
+
+    def key_for_documents(self, documents) -> str:
+        """
+        Key of the index for already loaded documents, e.g. from a URL.
+        """
+        content_hash = hashlib.sha256()
+        for doc in documents:
+            content_hash.update(doc.page_content.encode("utf-8"))
+            content_hash.update(b"\0")
+        return self._key(content_hash.hexdigest())
+
+    def _settings(self) -> dict:
+        return {
+            "chunk_size": self.chunk_size,
+            "chunk_overlap": self.chunk_overlap,
+            "chunking": self.chunking,
+            "embeddings": self.embeddings_model,
+        }
+
+    def _key(self, content_hash: str) -> str:
+        settings = json.dumps({"content": content_hash, **self._settings()}, sort_keys=True)
+        return hashlib.sha256(settings.encode("utf-8")).hexdigest()
+
+    def settings_key(self) -> str:
+        """
+        Hash of the settings which determine the chunks and their embeddings, without the content.
+        Stored chunks can only be reused under the same settings key.
+        """
+        settings = json.dumps({**self._settings(), "vector_store": self.vector_store}, sort_keys=True)
+        return hashlib.sha256(settings.encode("utf-8")).hexdigest()
+
+    @staticmethod
+    def chunk_ids(documents) -> list[str]:
+        """
+        Content hashes of the chunks and their metadata, repeated chunks are numbered.
+        """
+        ids = []
+        seen = Counter()
+        for doc in documents:
+            content = doc.page_content + "\0" + json.dumps(doc.metadata, sort_keys=True, default=str)
+            digest = hashlib.sha256(content.encode("utf-8")).hexdigest()
+            seen[digest] += 1
+            ids.append(digest if seen[digest] == 1 else f"{digest}-{seen[digest]}")
+        return ids
+
+    def read_manifest(self) -> dict:
+        manifest_path = os.path.join(self.path, self.MANIFEST)
+        if not os.path.exists(manifest_path):
+            return {}
+        try:
+            with open(manifest_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable index manifest {manifest_path}: {e}")
+            return {}
+
+    def _write_json(self, filename: str, data, **kwargs):
+        path = os.path.join(self.path, filename)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f, **kwargs)
+        os.replace(tmp_path, path)
+
+    def _write_manifest(self, manifest: dict):
+        self._write_json(self.MANIFEST, manifest, indent=4, sort_keys=True)
+
+    def _read_chunk_ids(self) -> Optional[list[str]]:
+        chunks_path = os.path.join(self.path, self.CHUNKS)
+        if not os.path.exists(chunks_path):
+            return None
+        try:
+            with open(chunks_path, "r") as f:
+                return json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable chunk list {chunks_path}: {e}")
+            return None
+
+    def _write_index_files(self, key: str, source: str, ids: list[str]):
+        self._write_json(self.CHUNKS, ids)
+        self._write_manifest({
+            "key": key,
+            "settings": self.settings_key(),
+            "source": source,
+            "chunks": len(ids),
+            "chunk_size": self.chunk_size,
+            "chunk_overlap": self.chunk_overlap,
+            "chunking": self.chunking,
+            "embeddings": self.embeddings_model,
+            "vector_store": self.vector_store,
+        })
+
+    @property
+    def size(self) -> int:
+        """
+        Number of chunks in the stored index.
+        """
+        return self.read_manifest().get("chunks", 0)
+
+    def _open_store(self) -> VectorStore:
+        return VectorStoreFactory.create(self.vector_store, self.COLLECTION, self.embeddings, persist_directory=self.path)
+
+    @staticmethod
+    def _save_store(store: VectorStore):
+        """
+        Saves a store which doesn't write its changes right away, e.g. the NumPy store.
+        """
+        if hasattr(store, "save"):
+            store.save()
+
+    def load(self, key: str) -> Optional[VectorStore]:
+        """
+        Opens the stored index if it was built for the given key, returns None otherwise.
+        """
+        manifest = self.read_manifest()
+        if manifest.get("key") != key or manifest.get("vector_store", "chroma") != self.vector_store:
+            return None
+        return self._open_store()
+
+    def build(self, key: str, documents, source: str = "") -> VectorStore:
+        """
+        Replaces the stored index with the given documents.
+        """
+        os.makedirs(self.path, exist_ok=True)
+        ids = self.chunk_ids(documents)
+        store = self._open_store()
+        store.reset_collection()
+        if documents:
+            store.add_documents(documents, ids=ids)
+        self._save_store(store)
+        self._write_index_files(key, source, ids)
+        return store
+
+    def update(self, key: str, documents, source: str = "") -> tuple[VectorStore, dict]:
+        """
+        Brings the stored index to the given documents. If it was built with the same
+        settings, only chunks not stored yet are embedded and vanished chunks are
+        deleted, otherwise the index is rebuilt.
+        Returns the store and the counts of added, removed and unchanged chunks.
+        """
+        manifest = self.read_manifest()
+        stored_ids = self._read_chunk_ids()
+        if manifest.get("settings") != self.settings_key() or stored_ids is None:
+            store = self.build(key, documents, source)
+            return store, {"added": len(documents), "removed": manifest.get("chunks", 0), "unchanged": 0}
+
+        ids = self.chunk_ids(documents)
+        stored = set(stored_ids)
+        current = set(ids)
+        new = [i for i, id in enumerate(ids) if id not in stored]
+        removed = [id for id in stored_ids if id not in current]
+        # An interrupted update leaves the store unknown, the next load rebuilds it
+        self._write_manifest({**manifest, "key": None, "settings": None})
+        store = self._open_store()
+        if removed:
+            store.delete(removed)
+        if new:
+            store.add_documents([documents[i] for i in new], ids=[ids[i] for i in new])
+        if removed or new:
+            self._save_store(store)
+        self._write_index_files(key, source, ids)
+        return store, {"added": len(new), "removed": len(removed), "unchanged": len(ids) - len(new)}
+
+    def load_lexical(self, key: str) -> Optional[BM25Index]:
+        """
+        Loads the stored BM25 index if it was built for the given key, returns None otherwise.
+        """
+        return BM25Index.load(os.path.join(self.path, self.LEXICAL_INDEX), key)
+
+    def save_lexical(self, key: str, lexical_index: BM25Index):
+        lexical_index.save(os.path.join(self.path, self.LEXICAL_INDEX), key)
@@ -2,7 +2,9 @@
 Agent-Assembly-Line
 """
 
+import asyncio
 import os
+import threading
 from agent_assembly_line.config import Config
 
 _llm_embeddings_mapping = {
@@ -29,56 +31,169 @@ _llm_embeddings_mapping = {
     # Add more mappings as needed
 }
 
+class ClientRegistry:
+    """
+    Process-wide registry of LLM and embeddings clients. Agents with the same
+    provider, model, timeout and keep-alive share one client and its connection
+    pool. References are counted, so a client is only closed when no agent uses it.
+    The keys are given by the LLMFactory, they include the event loop of async use.
+    """
+
+    def __init__(self):
+        self._clients = {}  # key -> [client, references]
+        self._keys = {}     # id(client) -> key
+        self._lock = threading.Lock()
+
+    def acquire(self, key, create):
+        with self._lock:
+            if key in self._clients:
+                entry = self._clients[key]
+                entry[1] += 1
+                return entry[0]
+            client = create()
+            self._clients[key] = [client, 1]
+            self._keys[id(client)] = key
+            return client
+
+    def release(self, client) -> bool:
+        """
+        Returns True if the last reference was released. Unknown clients, e.g.
+        created outside of the registry, are owned by the caller.
+        """
+        with self._lock:
+            key = self._keys.get(id(client))
+            if key is None:
+                return True
+            entry = self._clients[key]
+            entry[1] -= 1
+            if entry[1] > 0:
+                return False
+            del self._clients[key]
+            del self._keys[id(client)]
+            return True
+
+    def references(self, client) -> int:
+        with self._lock:
+            key = self._keys.get(id(client))
+            return self._clients[key][1] if key is not None else 0
+
+    def __len__(self):
+        return len(self._clients)
+
+_client_registry = ClientRegistry()
+
 class LLMFactory:
+    @staticmethod
+    def embeddings_model_name(config: Config) -> str:
+        """
+        Name of the embeddings model used for the configured LLM.
+        """
+        if config.custom_embeddings:
+            return config.custom_embeddings
+        if config.llm_type == "openai":
+            return _llm_embeddings_mapping.get("openai", {}).get(config.model_name, {}).get("embeddings", "text-embedding-ada-002")
+        return _llm_embeddings_mapping.get(config.llm_type, {}).get(config.model_name, {}).get("embeddings", "nomic-embed-text")
+
     @staticmethod
     def create_llm_and_embeddings(config: Config):
+        """
+        Returns the LLM and the embeddings for the config. The clients are shared
+        process-wide, see ClientRegistry, per event loop if called on a running one,
+        e.g. a test's loop. Give them back with release().
+        With embedding-cache enabled, the embeddings are wrapped by the process-wide
+        embedding cache.
+        """
+        # the async connection pools are bound to the event loop using them, clients
+        # acquired on a running loop are only shared on that loop
+        loop = LLMFactory._running_loop()
+        llm_key = (config.llm_type, "llm", config.model_name, config.timeout, config.ollama_keep_alive, loop)
+        embeddings_key = (config.llm_type, "embeddings", LLMFactory.embeddings_model_name(config), loop)
+
+        llm = _client_registry.acquire(llm_key, lambda: LLMFactory._create_llm(config))
+        try:
+            embeddings = _client_registry.acquire(embeddings_key, lambda: LLMFactory._create_embeddings(config))
+        except Exception:
+            _client_registry.release(llm)
+            raise
+        if config.embedding_cache:
+            from agent_assembly_line.embedding_cache import CachedEmbeddings, get_embedding_cache
+            embeddings = CachedEmbeddings(embeddings, LLMFactory.embeddings_model_name(config), get_embedding_cache())
+        return llm, embeddings
+
+    @staticmethod
+    def _running_loop():
+        try:
+            return asyncio.get_running_loop()
+        except RuntimeError:
+            return None
+
+    @staticmethod
+    def release(client) -> bool:
+        """
+        Gives back an LLM or embeddings client from create_llm_and_embeddings().
+        Returns True if it was the last reference, only then the client should be closed.
+        """
+        from agent_assembly_line.embedding_cache import CachedEmbeddings
+        if isinstance(client, CachedEmbeddings):
+            client = client.embeddings
+        return _client_registry.release(client)
+
+    @staticmethod
+    def _create_llm(config: Config):
         llm_type, model_name = config.llm_type, config.model_name
         if llm_type == "ollama":
             from langchain_ollama.llms import OllamaLLM
-            from langchain_ollama.embeddings import OllamaEmbeddings
-            # do before first run: ollama pull nomic-embed-text
-            embeddings = ( config.custom_embeddings or 
-                          _llm_embeddings_mapping.get("ollama", {}).get(model_name, {}).get("embeddings", "nomic-embed-text") )
-            embeddings = OllamaEmbeddings(model=embeddings)
-            llm = OllamaLLM(model=model_name, timeout=config.timeout, ollama_keep_alive=config.ollama_keep_alive)
-            return llm, embeddings
+            return OllamaLLM(model=model_name, timeout=config.timeout, ollama_keep_alive=config.ollama_keep_alive)
 
         elif llm_type == "openai":
             from langchain_openai.llms import OpenAI
             from langchain_openai import ChatOpenAI
-            from langchain_openai.embeddings import OpenAIEmbeddings
-            api_key = os.getenv("OPENAI_API_KEY")
-            if not api_key:
-                raise ValueError("OPENAI_API_KEY not found in environment variables.")
-
+            api_key = LLMFactory._api_key("OPENAI_API_KEY", "OPENAI_API_KEY not found in environment variables.")
             if model_name == "gpt-3.5-turbo":
-                llm = OpenAI(api_key=api_key, model=config.model_name, timeout=config.timeout)
-            else:
-                llm = ChatOpenAI(api_key=api_key, model=config.model_name, timeout=config.timeout)
-            embeddings = ( config.custom_embeddings or
-                          _llm_embeddings_mapping.get("openai", {}).get(model_name, {}).get("embeddings", "text-embedding-ada-002") )
-            embeddings = OpenAIEmbeddings(api_key=api_key, model=embeddings)
-            return llm, embeddings
+                return OpenAI(api_key=api_key, model=config.model_name, timeout=config.timeout)
+            return ChatOpenAI(api_key=api_key, model=config.model_name, timeout=config.timeout)
 
         elif llm_type == "runpod":
             from langchain_runpod.llms import RunpodLLM
-            from langchain_runpod.embeddings import RunpodEmbeddings
-            api_key = os.getenv("RUNPOD_API_KEY")
-            if not api_key:
-                raise ValueError("Runpod API key not found in environment variables")
+            api_key = LLMFactory._api_key("RUNPOD_API_KEY", "Runpod API key not found in environment variables")
 
             # Extract the endpoint from the model_name (e.g., "runpod:my_serverless_endpoint")
             if not model_name.startswith("runpod:"):
                 raise ValueError("Runpod model_name must start with 'runpod:'")
             endpoint = model_name.split("runpod:")[1]
+            return RunpodLLM(api_key=api_key, endpoint=endpoint, timeout=config.timeout)
+
+        else:
+            raise ValueError(f"Unsupported LLM type: {llm_type}")
+
+    @staticmethod
+    def _create_embeddings(config: Config):
+        llm_type = config.llm_type
+        if llm_type == "ollama":
+            from langchain_ollama.embeddings import OllamaEmbeddings
+            # do before first run: ollama pull nomic-embed-text
+            return OllamaEmbeddings(model=LLMFactory.embeddings_model_name(config))
 
-            llm = RunpodLLM(api_key=api_key, endpoint=endpoint, timeout=config.timeout)
-            embeddings = RunpodEmbeddings(api_key=api_key, model=config.embeddings)
-            return llm, embeddings
+        elif llm_type == "openai":
+            from langchain_openai.embeddings import OpenAIEmbeddings
+            api_key = LLMFactory._api_key("OPENAI_API_KEY", "OPENAI_API_KEY not found in environment variables.")
+            return OpenAIEmbeddings(api_key=api_key, model=LLMFactory.embeddings_model_name(config))
+
+        elif llm_type == "runpod":
+            from langchain_runpod.embeddings import RunpodEmbeddings
+            api_key = LLMFactory._api_key("RUNPOD_API_KEY", "Runpod API key not found in environment variables")
+            return RunpodEmbeddings(api_key=api_key, model=config.embeddings)
 
         else:
             raise ValueError(f"Unsupported LLM type: {llm_type}")
 
+    @staticmethod
+    def _api_key(env_var: str, error_message: str) -> str:
+        api_key = os.getenv(env_var)
+        if not api_key:
+            raise ValueError(error_message)
+        return api_key
+
     @staticmethod
     def extract_response(response, config: Config):
         # @todo write tests for this function
@@ -0,0 +1,252 @@
+"""
+Agent-Assembly-Line
+"""
+
+import bisect
+import math
+import threading
+from typing import Any, Callable, Iterable, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+class _Metric:
+    """
+    A metric family with a fixed set of label names, each label combination has its own value.
+    """
+
+    type = ""
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = ()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values: dict[tuple, Any] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: dict) -> tuple:
+        if len(labels) != len(self.labels):
+            raise ValueError(f"{self.name} needs the labels {', '.join(self.labels)}")
+        return tuple(str(labels[name]) for name in self.labels)
+
+    def samples(self) -> list[tuple[str, dict, float]]:
+        with self._lock:
+            return [(self.name, dict(zip(self.labels, key)), value) for key, value in self._values.items()]
+
+class Counter(_Metric):
+    type = "counter"
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+class Gauge(_Metric):
+    type = "gauge"
+
+    def set(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def inc(self, amount: float = 1, **labels):
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels):
+        self.inc(-amount, **labels)
+
+class Histogram(_Metric):
+    """
+    Counts observations into cumulative buckets, with their sum and count.
+    """
+
+    type = "histogram"
+
+    def __init__(self, name: str, help: str, labels: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value: float, **labels):
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(self.buckets):
+                state[0][i] += 1
+            state[1] += value
+            state[2] += 1
+
+    def samples(self) -> list[tuple[str, dict, float]]:
+        with self._lock:
+            values = [(key, list(counts), total, count) for key, (counts, total, count) in self._values.items()]
+        samples = []
+        for key, counts, total, count in values:
+            labels = dict(zip(self.labels, key))
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                samples.append((f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative))
+            samples.append((f"{self.name}_bucket", {**labels, "le": "+Inf"}, count))
+            samples.append((f"{self.name}_sum", labels, total))
+            samples.append((f"{self.name}_count", labels, count))
+        return samples
+
+class MetricFamily:
+    """
+    Samples of a metric computed at scrape time by a collector, e.g. from counters kept by the agents.
+    """
+
+    def __init__(self, name: str, type: str, help: str, samples: Optional[list[tuple[dict, float]]] = None):
+        self.name = name
+        self.type = type
+        self.help = help
+        self._samples = samples or []
+
+    def add(self, value: float, **labels):
+        self._samples.append((labels, value))
+
+    def samples(self) -> list[tuple[str, dict, float]]:
+        return [(self.name, labels, value) for labels, value in self._samples]
+
+class MetricsRegistry:
+    """
+    In-process metrics rendered in the Prometheus text format.
+
+    Counters, gauges and histograms are updated on the hot path, an update is a
+    dict lookup under a lock. Collectors are called at scrape time and return
+    MetricFamily objects for values that are kept elsewhere anyway.
+    """
+
+    def __init__(self):
+        self._metrics: dict[str, _Metric] = {}
+        self._collectors: list[Callable[[], Iterable[MetricFamily]]] = []
+        self._lock = threading.Lock()
+
+    def _register(self, metric: _Metric) -> _Metric:
+        with self._lock:
+            existing = self._metrics.get(metric.name)
+            if existing is not None:
+                if type(existing) is not type(metric) or existing.labels != metric.labels:
+                    raise ValueError(f"Metric {metric.name} is already registered differently.")
+                return existing
+            self._metrics[metric.name] = metric
+            return metric
+
+    def counter(self, name: str, help: str, labels: Iterable[str] = ()) -> Counter:
+        return self._register(Counter(name, help, labels))
+
+    def gauge(self, name: str, help: str, labels: Iterable[str] = ()) -> Gauge:
+        return self._register(Gauge(name, help, labels))
+
+    def histogram(self, name: str, help: str, labels: Iterable[str] = (), buckets: Iterable[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram(name, help, labels, buckets))
+
+    def register_collector(self, collector: Callable[[], Iterable[MetricFamily]]):
+        with self._lock:
+            self._collectors.append(collector)
+
+    def render(self) -> str:
+        with self._lock:
+            families = list(self._metrics.values())
+            collectors = list(self._collectors)
+        for collector in collectors:
+            try:
+                families.extend(collector())
+            except Exception as e:
+                print(f"Collecting metrics failed: {e}")
+        lines = []
+        for family in families:
+            lines.append(f"# HELP {family.name} {_escape(family.help)}")
+            lines.append(f"# TYPE {family.name} {family.type}")
+            for name, labels, value in family.samples():
+                lines.append(f"{name}{_format_labels(labels)} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+# The process-wide registry, rendered by the /metrics endpoint of the REST server
+REGISTRY = MetricsRegistry()
+
+LLM_CALLS_IN_FLIGHT = REGISTRY.gauge("agent_llm_calls_in_flight", "LLM calls of agent chains currently running.")
+STREAM_CANCELLATIONS = REGISTRY.counter("agent_stream_cancellations_total", "Streamed answers aborted before the end, e.g. by a disconnected client.", ["agent"])
+
+class LLMCallTracker(BaseCallbackHandler):
+    """
+    Keeps LLM_CALLS_IN_FLIGHT up to date, passed with every chain call of an agent.
+    """
+
+    run_inline = True
+
+    def on_llm_start(self, serialized: Optional[dict], prompts: list, *, run_id: UUID, **kwargs: Any):
+        LLM_CALLS_IN_FLIGHT.inc()
+
+    def on_chat_model_start(self, serialized: Optional[dict], messages: list, *, run_id: UUID, **kwargs: Any):
+        LLM_CALLS_IN_FLIGHT.inc()
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any):
+        LLM_CALLS_IN_FLIGHT.dec()
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        LLM_CALLS_IN_FLIGHT.dec()
+
+LLM_CALL_TRACKER = LLMCallTracker()
+
+def _hit_ratio(hits: int, misses: int) -> float:
+    lookups = hits + misses
+    return hits / lookups if lookups else 0.0
+
+def collect_agent_metrics(agents: Iterable) -> list[MetricFamily]:
+    """
+    Metrics of the given agents from the counters they maintain anyway: vector store
+    sizes, messages waiting for the memory auto-save and query embedding cache hits,
+    and the hits of the persistent embedding cache if it is used.
+    """
+    store_sizes = MetricFamily("agent_vector_store_documents", "gauge", "Documents in the vector stores of an agent.")
+    pending = MetricFamily("agent_memory_pending_messages", "gauge", "Messages of the memory assistant waiting for the auto-save.")
+    hits = MetricFamily("agent_query_embedding_cache_hits_total", "counter", "Query embeddings served from the agent's cache.")
+    misses = MetricFamily("agent_query_embedding_cache_misses_total", "counter", "Query embeddings not in the agent's cache.")
+    hit_ratio = MetricFamily("agent_query_embedding_cache_hit_ratio", "gauge", "Hit ratio of the agent's query embedding cache.")
+    for agent in agents:
+        for store, size in agent.vectorstore_sizes().items():
+            store_sizes.add(size, agent=agent.name, store=store)
+        pending.add(getattr(agent.memory_assistant, "message_count_since_last_save", 0), agent=agent.name)
+        hits.add(agent.query_embeddings.hits, agent=agent.name)
+        misses.add(agent.query_embeddings.misses, agent=agent.name)
+        hit_ratio.add(_hit_ratio(agent.query_embeddings.hits, agent.query_embeddings.misses), agent=agent.name)
+    families = [store_sizes, pending, hits, misses, hit_ratio]
+
+    from agent_assembly_line import embedding_cache
+    cache = embedding_cache._embedding_cache
+    if cache is not None:
+        families.append(MetricFamily("embedding_cache_hits_total", "counter", "Embeddings served from the persistent embedding cache.", [({}, cache.hits)]))
+        families.append(MetricFamily("embedding_cache_misses_total", "counter", "Embeddings not in the persistent embedding cache.", [({}, cache.misses)]))
+        families.append(MetricFamily("embedding_cache_hit_ratio", "gauge", "Hit ratio of the persistent embedding cache.", [({}, _hit_ratio(cache.hits, cache.misses))]))
+    return families
+
+def collect_scheduler_metrics(scheduler) -> list[MetricFamily]:
+    """
+    Busy slots, queue depth and rejected requests of an LLMScheduler.
+    """
+    return [
+        MetricFamily("llm_scheduler_slots", "gauge", "LLM slots of the scheduler.", [({}, scheduler.slots)]),
+        MetricFamily("llm_scheduler_slots_busy", "gauge", "LLM slots running agent work.", [({}, scheduler.active)]),
+        MetricFamily("llm_scheduler_queue_depth", "gauge", "Requests waiting for an LLM slot.", [({}, scheduler.queued)]),
+        MetricFamily("llm_scheduler_rejected_total", "counter", "Requests rejected as the queue was full.", [({}, scheduler.rejected)]),
+    ]
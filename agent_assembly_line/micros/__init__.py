@@ -1,14 +1,30 @@
-from .fmi_weather_agent import FmiWeatherAgent
-from .website_summary_agent import WebsiteSummaryAgent
-from .choose_agent_agent import ChooseAgentAgent
-from .clarity_agent import ClarityAgent
-from .diff_details_agent import DiffDetailsAgent
-from .diff_sum_agent import DiffSumAgent
-from .intent_agent import IntentAgent
-from .one_word_agent import OneWordAgent
-from .sentiment_agent import SentimentAgent
-from .sum_agent import SumAgent
-from .test_validator_agent import TestValidatorAgent
-from .website_summary_agent import WebsiteSummaryAgent
-from .yes_no_agent import YesNoAgent
-from .one_ten_agent import OneTenAgent
\ No newline at end of file
+import importlib
+
+# Micro agents are imported on first access, importing one imports the Agent.
+_LAZY_EXPORTS = {
+    "FmiWeatherAgent": ".fmi_weather_agent",
+    "WebsiteSummaryAgent": ".website_summary_agent",
+    "ChooseAgentAgent": ".choose_agent_agent",
+    "ClarityAgent": ".clarity_agent",
+    "DiffDetailsAgent": ".diff_details_agent",
+    "DiffSumAgent": ".diff_sum_agent",
+    "IntentAgent": ".intent_agent",
+    "OneWordAgent": ".one_word_agent",
+    "SentimentAgent": ".sentiment_agent",
+    "SumAgent": ".sum_agent",
+    "TestValidatorAgent": ".test_validator_agent",
+    "YesNoAgent": ".yes_no_agent",
+    "OneTenAgent": ".one_ten_agent",
+}
+
+__all__ = list(_LAZY_EXPORTS)
+
+def __getattr__(name):
+    if name in _LAZY_EXPORTS:
+        value = getattr(importlib.import_module(_LAZY_EXPORTS[name], __name__), name)
+        globals()[name] = value
+        return value
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+def __dir__():
+    return sorted(set(globals()) | set(__all__))
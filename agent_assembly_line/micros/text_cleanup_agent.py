@@ -5,6 +5,7 @@ Agent-Assembly-Line
 import os
 from agent_assembly_line.agent import Agent
 from agent_assembly_line.config import Config
+from agent_assembly_line.utils.text_splitter import TextSplitter
 
 class TextCleanupAgent(Agent):
     """
@@ -113,6 +114,11 @@ corrupted umlauts, and other symbol problems in the provided text.
             "llm": {
                 "model-identifier": model_identifier
             },
+            "chunking": kwargs.get("chunking", {
+                "size": 1500,
+                "overlap": 0,
+                "boundaries": ["paragraph", "sentence", "clause", "word"],
+            }),
         })
         super().__init__(config=config)
 
@@ -121,83 +127,23 @@ corrupted umlauts, and other symbol problems in the provided text.
         if self.verbose:
             print(message)
 
-    def chunk_text(self, text, chunk_size=1500):
+    def chunk_text(self, text, chunk_size=None):
         """
-        Chunks the text into smaller pieces for processing with improved boundary detection.
+        Chunks the text into smaller pieces for processing, breaking at paragraph,
+        sentence, punctuation or word boundaries in that order of preference.
         No overlap is used to prevent text duplication.
 
         Args:
             text (str): The text to chunk
-            chunk_size (int): Size of each chunk in characters
+            chunk_size (int): Size of each chunk, defaults to the chunking config
         
         Returns:
             list: List of text chunks
         """
-        chunks = []
-        start = 0
-
-        if not text:
-            return [""]
-
-        if len(text) <= chunk_size:
-            return [text.strip()]
-
-        while start < len(text):
-            end = start + chunk_size
-            
-            # If we're at the end of the text, take everything remaining
-            if end >= len(text):
-                chunk = text[start:].strip()
-                if chunk:  # Only add non-empty chunks
-                    chunks.append(chunk)
-                break
-
-            # Look for the best breaking point in order of preference
-            chunk = text[start:end]
-            best_break = -1
-
-            # 1. Try to break at paragraph boundaries (double newlines)
-            paragraph_break = chunk.rfind('\n\n')
-            if paragraph_break > chunk_size * 0.3:  # Don't break too early
-                best_break = paragraph_break + 2
-
-            # 2. If no good paragraph break, try sentence endings
-            if best_break == -1:
-                for break_char in ['. ', '! ', '? ']:
-                    sentence_break = chunk.rfind(break_char)
-                    if sentence_break > chunk_size * 0.5:  # More lenient for sentences
-                        best_break = sentence_break + len(break_char)
-                        break
-
-            # 3. If no good sentence break, try other punctuation
-            if best_break == -1:
-                for break_char in [': ', '; ', ', ']:
-                    punct_break = chunk.rfind(break_char)
-                    if punct_break > chunk_size * 0.7:  # More conservative for punctuation
-                        best_break = punct_break + len(break_char)
-                        break
-
-            # 4. As last resort, break at word boundary
-            if best_break == -1:
-                # Find the last space that's not too close to the beginning
-                word_break = chunk.rfind(' ')
-                if word_break > chunk_size * 0.8:  # Very conservative for word breaks
-                    best_break = word_break + 1
-
-            # Apply the break or use the full chunk if no good break found
-            if best_break != -1:
-                chunk = text[start:start + best_break]
-                start = start + best_break
-            else:
-                # No good break found, use the full chunk and move forward
-                start = end
-
-            # Add the chunk if it's not empty
-            chunk = chunk.strip()
-            if chunk:
-                chunks.append(chunk)
-
-        return chunks
+        splitter = self._text_splitter()
+        if chunk_size is not None:
+            splitter = TextSplitter(chunk_size=chunk_size, chunk_overlap=0, unit=splitter.unit, boundaries=splitter.boundaries)
+        return splitter.split_text(text) or [""]
 
     def process_file(self):
         """
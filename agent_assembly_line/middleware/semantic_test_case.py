@@ -5,7 +5,6 @@ Agent-Assembly-Line
 import unittest
 import unittest.async_case
 import unittest.util
-from agent_assembly_line.micros.test_validator_agent import TestValidatorAgent
 from unittest.util import safe_repr
 from agent_assembly_line.utils import strtobool
 
@@ -31,6 +30,7 @@ class SemanticTestCase(unittest.TestCase):
     """
     @classmethod
     def setUpClass(cls):
+        from agent_assembly_line.micros.test_validator_agent import TestValidatorAgent
         cls.agent = TestValidatorAgent(mode='local')
 
     @classmethod
@@ -151,6 +151,7 @@ class AioSemanticTestCase(aiounittest.AsyncTestCase):
     """
     @classmethod
     def setUpClass(cls):
+        from agent_assembly_line.micros.test_validator_agent import TestValidatorAgent
         cls.agent = TestValidatorAgent(mode='local')
 
     @classmethod
@@ -0,0 +1,136 @@
+"""
+Agent-Assembly-Line
+"""
+
+import hashlib
+import re
+from typing import Any, AsyncIterator, Iterator, Optional
+
+import numpy as np
+from langchain_core.runnables import Runnable
+
+from agent_assembly_line.utils.lru_cache import LRUCache
+
+class ResponseCache:
+    """
+    Cache of an agent's answers for repeated questions.
+
+    In exact mode an answer is reused for the same normalized prompt with the same
+    retrieved chunks, inline context and history. The semantic mode additionally
+    reuses an answer when the query embedding of a prompt is at least `threshold`
+    cosine similar to a cached one; this lookup happens before retrieval, agents
+    with a memory skip it. Entries expire after `ttl` seconds, at most `max_size`
+    entries are kept. The agent invalidates the semantic cache when its data changes.
+    """
+
+    MODES = ("exact", "semantic")
+
+    def __init__(self, mode: str = "exact", ttl: Optional[float] = 600, max_size: int = 256, threshold: float = 0.95):
+        if mode not in self.MODES:
+            raise ValueError(f"Invalid response cache mode: {mode}. Choose either 'exact' or 'semantic'.")
+        self.mode = mode
+        self.threshold = threshold
+        self.entries = LRUCache(max_size=max_size, ttl=ttl)
+
+    @classmethod
+    def from_config(cls, response_cache: dict) -> Optional["ResponseCache"]:
+        """
+        Creates the cache from the response-cache section of the agent config,
+        e.g. { "mode": "semantic", "ttl": 600, "max-size": 256, "threshold": 0.95 }.
+        Returns None if the section is missing.
+        """
+        if not response_cache:
+            return None
+        return cls(
+            mode=response_cache.get("mode", "exact"),
+            ttl=response_cache.get("ttl", 600),
+            max_size=response_cache.get("max-size", 256),
+            threshold=response_cache.get("threshold", 0.95),
+        )
+
+    @property
+    def semantic(self) -> bool:
+        return self.mode == "semantic"
+
+    @property
+    def hits(self) -> int:
+        return self.entries.hits
+
+    @property
+    def misses(self) -> int:
+        return self.entries.misses
+
+    @staticmethod
+    def normalize(prompt: str) -> str:
+        return re.sub(r"\s+", " ", prompt).strip().lower()
+
+    @staticmethod
+    def key(agent_name: str, prompt: str, inputs: dict) -> str:
+        """
+        Key of the answer to a prompt, given the retrieved chunks, the inline context and
+        the history, a follow-up question depends on the conversation before.
+        """
+        key_hash = hashlib.sha256()
+        for part in (agent_name, ResponseCache.normalize(prompt), inputs.get("global_store", ""), inputs.get("session_store", ""),
+                     inputs.get("context", ""), inputs.get("history", "")):
+            key_hash.update(part.encode("utf-8"))
+            key_hash.update(b"\0")
+        return key_hash.hexdigest()
+
+    def get(self, key: str) -> Optional[str]:
+        entry = self.entries.get(key)
+        return entry[0] if entry else None
+
+    def get_similar(self, query_embedding) -> Optional[str]:
+        """
+        Returns the cached answer with the most similar query embedding above the threshold.
+        """
+        items = [(key, entry) for key, entry in self.entries.items() if entry[1] is not None]
+        if not items:
+            self.entries.count_miss()
+            return None
+        matrix = np.asarray([embedding for _, (_, embedding) in items], dtype=np.float32)
+        query = np.asarray(query_embedding, dtype=np.float32)
+        norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query)
+        similarities = matrix @ query / np.where(norms == 0, 1, norms)
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.threshold:
+            self.entries.count_miss()
+            return None
+        # refreshes recency and counts the hit, or the miss if it expired meanwhile
+        entry = self.entries.get(items[best][0])
+        return entry[0] if entry is not None else None
+
+    def put(self, key: str, answer: str, query_embedding=None):
+        self.entries.put(key, (answer, query_embedding))
+
+    def invalidate(self):
+        self.entries.clear()
+
+    def __len__(self):
+        return len(self.entries)
+
+
+class CachedAnswer(Runnable):
+    """
+    Runnable replaying a cached answer, streamed word by word.
+    """
+
+    def __init__(self, answer: str):
+        self.answer = answer
+
+    def _chunks(self) -> list[str]:
+        return re.findall(r"\S+\s*|\s+", self.answer)
+
+    def invoke(self, input: Any, config: Optional[Any] = None, **kwargs: Any) -> str:
+        return self.answer
+
+    async def ainvoke(self, input: Any, config: Optional[Any] = None, **kwargs: Any) -> str:
+        return self.answer
+
+    def stream(self, input: Any, config: Optional[Any] = None, **kwargs: Any) -> Iterator[str]:
+        yield from self._chunks()
+
+    async def astream(self, input: Any, config: Optional[Any] = None, **kwargs: Any) -> AsyncIterator[str]:
+        for chunk in self._chunks():
+            yield chunk
@@ -3,16 +3,23 @@ Agent-Assembly-Line
 """
 
 import os, re
+import json
 import shutil
 import asyncio
+import time
+from contextlib import asynccontextmanager, nullcontext
 
-from fastapi import FastAPI, File, UploadFile
-from fastapi.responses import JSONResponse, StreamingResponse
+from fastapi import Depends, FastAPI, File, Request, UploadFile
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
 from pydantic import BaseModel
 
 from agent_assembly_line.agent_manager import AgentManager
 from agent_assembly_line.exceptions import DataLoadError, EmptyDataError
 from agent_assembly_line.memory_assistant import MemoryStrategy
+from agent_assembly_line.metrics import REGISTRY, MetricFamily, collect_agent_metrics, collect_scheduler_metrics
+from agent_assembly_line.scheduler import LLMScheduler, QueueFullError, BACKGROUND
+from agent_assembly_line.sessions import SessionManager
+from agent_assembly_line.streaming import ClientDisconnected, cancel_on_disconnect, coalesce
 
 from langchain_core.messages import (
     AIMessage,
@@ -20,15 +27,100 @@ from langchain_core.messages import (
     SystemMessage
 )
 
-app = FastAPI()
-agent_manager = AgentManager()
+agent_manager = AgentManager.from_env()
 agent_manager.select_agent("chat-demo", debug=True)
+# blocking agent work runs in worker threads, at most OLLAMA_NUM_PARALLEL at once
+scheduler = LLMScheduler.from_env()
+# per-user state of requests with a session id, over the shared agent
+sessions = SessionManager.from_env()
 
 def start_memory_assistant():
     agent = agent_manager.get_agent()
-    asyncio.create_task(agent.startMemoryAssistant())
+    asyncio.create_task(agent_manager.start_agent(agent))
+
+async def _run_in_background(fn, *args, **kwargs):
+    return await scheduler.run(fn, *args, priority=BACKGROUND, **kwargs)
+
+async def evict_idle():
+    while True:
+        await asyncio.sleep(min(agent_manager.idle_ttl or 60, sessions.ttl, 60))
+        await asyncio.to_thread(sessions.evict_idle)
+        # also closes the evicted agents which were still in use
+        if agent_manager.evict_idle():
+            await agent_manager.close_evicted()
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    # started with the server's event loop, there is none while the module is imported
+    start_memory_assistant()
+    tasks = [
+        asyncio.create_task(agent_manager.prewarm(AgentManager.prewarm_names(), _run_in_background, debug=True)),
+        asyncio.create_task(evict_idle()),
+    ]
+    yield
+    for task in tasks:
+        task.cancel()
+    sessions.close()
+    await agent_manager.aclose()
+
+app = FastAPI(lifespan=lifespan)
+
+REQUESTS = REGISTRY.counter("http_requests_total", "HTTP requests by route, method and status.", ["route", "method", "status"])
+REQUEST_LATENCY = REGISTRY.histogram("http_request_duration_seconds", "Latency of HTTP requests until the response starts, by route.", ["route", "method"])
+STREAM_TTFT = REGISTRY.histogram("stream_time_to_first_token_seconds", "Time from an /api/stream request to its first token.")
+STREAM_TOKENS_PER_SECOND = REGISTRY.histogram("stream_tokens_per_second", "Streamed tokens per second after the first token of /api/stream.",
+                                              buckets=(1, 2, 5, 10, 20, 35, 50, 75, 100, 150, 250))
+REGISTRY.register_collector(lambda: collect_agent_metrics(list(agent_manager.agents.values())))
+REGISTRY.register_collector(lambda: collect_scheduler_metrics(scheduler))
+REGISTRY.register_collector(lambda: [MetricFamily("agent_sessions", "gauge", "Sessions of REST users.", [({}, len(sessions))])])
+
+def session_agent(request: Request):
+    """
+    The agent of the request's session, by the X-Session-Id header or the session_id
+    query parameter, e.g. for EventSource. Requests without a session id share the agent.
+    Run in a worker thread by FastAPI, the first session of an agent loads its data.
+    The agent is in use until the request is answered, it isn't closed meanwhile.
+    """
+    agent = agent_manager.acquire()
+    try:
+        session_id = request.headers.get("X-Session-Id") or request.query_params.get("session_id")
+        yield sessions.get(agent, session_id) if session_id else agent
+    finally:
+        agent_manager.release(agent)
+
+# /api/stream sends the answer in batches of STREAM_FLUSH_MS or STREAM_FLUSH_CHARS,
+# and a keep-alive comment after STREAM_KEEP_ALIVE_SEC without a frame
+STREAM_COALESCING = {
+    "flush_interval": float(os.getenv('STREAM_FLUSH_MS', '50')) / 1000,
+    "max_chars": int(os.getenv('STREAM_FLUSH_CHARS', '64')),
+    "keep_alive": float(os.getenv('STREAM_KEEP_ALIVE_SEC', '15')),
+}
+KEEP_ALIVE = ": keep-alive\n\n"
+
+def sse_frame(stage: str, **payload) -> str:
+    """
+    A server-sent event with a JSON payload, the stage is "retrieval", "generation", "done" or "error".
+    """
+    return f"data: {json.dumps({'stage': stage, **payload})}\n\n"
+
+def _queue_full(e: QueueFullError, **content):
+    return JSONResponse(content={**content, "status": "queue-full", "queued": e.queued, "message": e.message},
+                        status_code=429, headers={"Retry-After": "1"})
 
-start_memory_assistant()
+@app.middleware("http")
+async def record_request_metrics(request: Request, call_next):
+    start = time.perf_counter()
+    status = 500
+    try:
+        response = await call_next(request)
+        status = response.status_code
+        return response
+    finally:
+        # the route template, not the path, keeps the label set small
+        route = request.scope.get("route")
+        path = route.path if route is not None else "unmatched"
+        REQUESTS.inc(route=path, method=request.method, status=status)
+        REQUEST_LATENCY.observe(time.perf_counter() - start, route=path, method=request.method)
 
 class RequestItem(BaseModel):
     prompt: str
@@ -71,8 +163,7 @@ def data_sources():
     return get_agents()
 
 @app.get('/api/info')
-def info():
-    agent = agent_manager.get_agent()
+def info(agent = Depends(session_agent)):
     return {
         "name": agent.config.name,
         "description": agent.config.description,
@@ -88,10 +179,13 @@ def info():
 
 @app.post("/api/select-agent")
 async def select_agent(request: AgentSelectItem):
-    if request.agent != agent_manager.get_agent().name:
-        await agent_manager.get_agent().cleanup()
-        agent_manager.get_agent().closeModels()
-    agent = agent_manager.select_agent(request.agent, debug=True)
+    try:
+        # an agent not in the pool reads its config files, its data is loaded on first use
+        agent = await _run_in_background(agent_manager.select_agent, request.agent, debug=True)
+    except QueueFullError as e:
+        return _queue_full(e)
+    await agent_manager.start_agent(agent)
+    await agent_manager.close_evicted()
     return {}
 
 def _detect_url(prompt):
@@ -102,55 +196,111 @@ def _detect_url(prompt):
     return url_pattern.match(prompt)
 
 @app.post("/api/question")
-async def question(request: RequestItem):
-    agent = agent_manager.get_agent()
+async def question(request: RequestItem, agent = Depends(session_agent)):
     prompt = request.prompt
 
-    if _detect_url(prompt):
-        sum, size = agent.add_url(prompt)
-        return { "answer" : sum, "shouldUpdate" : True, "size" : size }
+    try:
+        if _detect_url(prompt):
+            sum, size = await _run_in_background(agent.add_url, prompt)
+            return { "answer" : sum, "shouldUpdate" : True, "size" : size }
 
-    text = agent.run(prompt, skip_rag=False)
+        text = await scheduler.run(agent.run, prompt, skip_rag=False)
+    except QueueFullError as e:
+        return _queue_full(e, answer="", shouldUpdate=False, size=0)
     return { "answer" : text, "shouldUpdate" : False, "size" : 0 }
 
-from fastapi import Request
-
 @app.get("/api/stream")
-async def stream(request: Request):
-    agent = agent_manager.get_agent()
+async def stream(request: Request, agent = Depends(session_agent)):
     prompt = request.query_params.get("prompt")
 
-    async def event_generator():
-        if _detect_url(prompt):
-            summary, size = agent.add_url(prompt)
-            yield f"data: {summary} {size}\n\n"
-        else:
-            async for response in agent.stream(prompt):
-                yield f"data: {response}\n\n"
-            yield "data: [DONE]\n\n"
+    if scheduler.full:
+        return _queue_full(QueueFullError(scheduler.queued))
+
+    async def url_summary():
+        summary, size = await _run_in_background(agent.add_url, prompt)
+        yield f"{summary} {size}"
 
+    async def event_generator():
+        start = time.perf_counter()
+
+        def elapsed_ms():
+            return round((time.perf_counter() - start) * 1000, 1)
+
+        try:
+            yield sse_frame("retrieval", elapsed_ms=elapsed_ms())
+            first_token, tokens = None, 0
+            is_url = _detect_url(prompt)
+            if is_url:
+                # loaded with a background slot of its own
+                answer, slot = url_summary(), nullcontext()
+            else:
+                # a closed browser tab cancels the generation, also while waiting for a token
+                answer, slot = cancel_on_disconnect(request.receive, agent.stream(prompt)), scheduler.slot()
+            async with slot:
+                async for chunks in coalesce(answer, **STREAM_COALESCING):
+                    if chunks is None:
+                        yield KEEP_ALIVE
+                        continue
+                    if first_token is None:
+                        first_token = time.perf_counter()
+                        if not is_url:
+                            STREAM_TTFT.observe(first_token - start)
+                    # each streamed chunk counts as one token
+                    tokens += len(chunks)
+                    yield sse_frame("generation", text="".join(chunks), elapsed_ms=elapsed_ms())
+            ttft_ms = None
+            if first_token is not None:
+                ttft_ms = round((first_token - start) * 1000, 1)
+                elapsed = time.perf_counter() - first_token
+                if not is_url and tokens > 1 and elapsed > 0:
+                    STREAM_TOKENS_PER_SECOND.observe((tokens - 1) / elapsed)
+            yield sse_frame("done", tokens=tokens, ttft_ms=ttft_ms, elapsed_ms=elapsed_ms())
+        except QueueFullError as e:
+            # the queue filled up between the check and the start of the stream
+            yield sse_frame("error", text=e.message, elapsed_ms=elapsed_ms())
+        except ClientDisconnected:
+            # nobody is left to read the rest
+            pass
+        except Exception as e:
+            # the client waits for a done or error frame, it mustn't end without one
+            print("Streaming failed:", e)
+            yield sse_frame("error", text=f"Failed to answer. {e}", elapsed_ms=elapsed_ms())
+        finally:
+            agent_manager.release(pooled_agent)
+
+    # the stream is sent after the request's dependencies are closed, it uses the agent on its own
+    pooled_agent = agent_manager.acquire(agent.session_of or agent)
     return StreamingResponse(event_generator(), media_type="text/event-stream")
 
+@app.get('/metrics')
+def metrics():
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4; charset=utf-8")
+
 @app.get('/api/memory')
-def memory():
-    agent = agent_manager.get_agent()
+def memory(agent = Depends(session_agent)):
     return {
         "memory": agent.get_summary_memory()
     }
 
-@app.post("/api/upload-file")
-def upload_file(file: UploadFile = File(...)):
-    agent = agent_manager.get_agent()
-    try:
-        upload_directory = "uploads"
-        os.makedirs(upload_directory, exist_ok=True)
-        file_path = os.path.join(upload_directory, file.filename)
+def _save_and_add_file(agent, file: UploadFile) -> int:
+    upload_directory = "uploads"
+    if agent.session_id:
+        # the session's collection name is derived from the session id, safe as a directory name
+        upload_directory = os.path.join(upload_directory, agent.user_collection)
+    os.makedirs(upload_directory, exist_ok=True)
+    file_path = os.path.join(upload_directory, file.filename)
 
-        with open(file_path, "wb") as buffer:
-            shutil.copyfileobj(file.file, buffer)
+    with open(file_path, "wb") as buffer:
+        shutil.copyfileobj(file.file, buffer)
 
-        total_text_length = agent.add_file(upload_directory, file.filename)
+    return agent.add_file(upload_directory, file.filename)
 
+@app.post("/api/upload-file")
+async def upload_file(file: UploadFile = File(...), agent = Depends(session_agent)):
+    try:
+        total_text_length = await _run_in_background(_save_and_add_file, agent, file)
+    except QueueFullError as e:
+        return _queue_full(e, filename=file.filename)
     except EmptyDataError as e:
         return JSONResponse(content={"filename": file.filename, "message": e.message}, status_code=400)
     except DataLoadError as e:
@@ -161,8 +311,7 @@ def upload_file(file: UploadFile = File(...)):
     return JSONResponse(content={"filename": file.filename, "message": f'File "{file.filename}" added successfully with {total_text_length} characters of text.'})
 
 @app.get("/api/load-history")
-def load_history():
-    agent = agent_manager.get_agent()
+def load_history(agent = Depends(session_agent)):
     try:
         messages = agent.memory_assistant.messages
         messages_dict = []
@@ -0,0 +1,6 @@
+from .context_packer import ContextPacker, estimate_tokens
+from .bm25 import BM25Index
+from .fusion import reciprocal_rank_fusion
+from .diversity import RetrievalDiversifier
+
+__all__ = ['ContextPacker', 'estimate_tokens', 'BM25Index', 'reciprocal_rank_fusion', 'RetrievalDiversifier']
@@ -0,0 +1,119 @@
+"""
+Agent-Assembly-Line
+"""
+
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter
+from typing import Optional
+
+from langchain_core.documents import Document
+
+def tokenize(text: str) -> list[str]:
+    """
+    Lowercased word tokens, identifiers like product codes keep their digits.
+    """
+    return re.findall(r"\w+", text.lower())
+
+class BM25Index:
+    """
+    Okapi BM25 inverted index of documents, for lexical retrieval of exact terms like
+    identifiers, codes and names which embeddings match poorly.
+
+    Documents are added incrementally, the postings map each term to the
+    documents containing it with the term frequency. A search only visits the
+    postings of the query terms.
+    """
+
+    def __init__(self, documents: Optional[list[Document]] = None, k1: float = 1.5, b: float = 0.75):
+        self.k1 = k1
+        self.b = b
+        self.documents: list[Document] = []
+        self.lengths: list[int] = []
+        self.total_length = 0
+        self.postings: dict[str, dict[int, int]] = {}
+        self._lock = threading.Lock()
+        if documents:
+            self.add_documents(documents)
+
+    def __len__(self):
+        return len(self.documents)
+
+    def add_documents(self, documents: list[Document]):
+        with self._lock:
+            for doc in documents:
+                i = len(self.documents)
+                terms = Counter(tokenize(doc.page_content))
+                for term, frequency in terms.items():
+                    self.postings.setdefault(term, {})[i] = frequency
+                length = sum(terms.values())
+                self.documents.append(doc)
+                self.lengths.append(length)
+                self.total_length += length
+
+    def search(self, query: str, k: int = 4) -> list[tuple[Document, float]]:
+        """
+        Returns the k best matching documents with their BM25 score, documents
+        without any query term are not returned.
+        """
+        with self._lock:
+            count = len(self.documents)
+            if count == 0 or k <= 0:
+                return []
+            average_length = self.total_length / count or 1
+            scores: dict[int, float] = {}
+            for term in set(tokenize(query)):
+                postings = self.postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for i, frequency in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / average_length)
+                    scores[i] = scores.get(i, 0.0) + idf * frequency * (self.k1 + 1) / (frequency + norm)
+            top = heapq.nlargest(k, scores.items(), key=lambda item: item[1])
+            return [(self.documents[i], score) for i, score in top]
+
+    def save(self, path: str, key: str = ""):
+        """
+        Saves the index as JSON, replaced atomically. The key identifies the data it was built from.
+        """
+        with self._lock:
+            data = {
+                "key": key,
+                "k1": self.k1,
+                "b": self.b,
+                "documents": [{"page_content": doc.page_content, "metadata": doc.metadata} for doc in self.documents],
+                "lengths": self.lengths,
+                "postings": {term: list(postings.items()) for term, postings in self.postings.items()},
+            }
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(data, f)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str, key: Optional[str] = None) -> Optional["BM25Index"]:
+        """
+        Loads a saved index, returns None if there is none or it was saved for another key.
+        """
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Ignoring unreadable BM25 index {path}: {e}")
+            return None
+        if key is not None and data.get("key") != key:
+            return None
+        index = cls(k1=data["k1"], b=data["b"])
+        index.documents = [Document(page_content=doc["page_content"], metadata=doc["metadata"]) for doc in data["documents"]]
+        index.lengths = data["lengths"]
+        index.total_length = sum(index.lengths)
+        index.postings = {term: dict((i, frequency) for i, frequency in postings) for term, postings in data["postings"].items()}
+        return index
@@ -0,0 +1,146 @@
+"""
+Agent-Assembly-Line
+"""
+
+from typing import Callable, Optional
+
+from agent_assembly_line.utils.tokens import estimate_tokens
+
+class ContextPacker:
+    """
+    Fits the variable parts of a RAG prompt into a token budget.
+
+    The budget left after the template and the question is allocated across the
+    sections global_store, session_store, context and history by their shares.
+    Room a section doesn't need is handed to the other sections. Retrieved chunks
+    arrive ranked, best first; the lowest ranked chunks that don't fit are dropped.
+    Inline context is truncated at the end, history at the beginning, so the most
+    recent messages are kept.
+    """
+
+    DEFAULT_SHARES = {
+        "global_store": 0.4,
+        "session_store": 0.3,
+        "context": 0.2,
+        "history": 0.1,
+    }
+    SEPARATOR = "\n\n"
+
+    def __init__(self, max_tokens: int, shares: Optional[dict] = None, token_counter: Callable[[str], int] = estimate_tokens):
+        if max_tokens < 1:
+            raise ValueError("max_tokens must be at least 1")
+        self.max_tokens = max_tokens
+        self.shares = dict(self.DEFAULT_SHARES)
+        if shares:
+            unknown = set(shares) - set(self.DEFAULT_SHARES)
+            if unknown:
+                raise ValueError(f"Unknown context sections: {', '.join(sorted(unknown))}")
+            self.shares.update(shares)
+        self.token_counter = token_counter
+
+    @classmethod
+    def from_config(cls, context_budget: dict) -> Optional["ContextPacker"]:
+        """
+        Creates a packer from the context-budget section of the agent config, e.g.
+        { "tokens": 6000, "global_store": 0.5, "history": 0.1 }. Returns None without a budget.
+        """
+        if not context_budget or not context_budget.get("tokens"):
+            return None
+        shares = {name: share for name, share in context_budget.items() if name != "tokens"}
+        return cls(int(context_budget["tokens"]), shares)
+
+    def allocate(self, available: int, demands: dict) -> dict:
+        """
+        Splits the available tokens across the sections by their shares. Sections that
+        need less than their share get their demand, the rest is redistributed.
+        """
+        allocation = {name: 0 for name in demands}
+        open_sections = {name for name, demand in demands.items() if demand > 0 and self.shares.get(name, 0) > 0}
+        remaining = max(available, 0)
+        while open_sections and remaining > 0:
+            total_share = sum(self.shares[name] for name in open_sections)
+            satisfied = {
+                name for name in open_sections
+                if demands[name] - allocation[name] <= remaining * self.shares[name] / total_share
+            }
+            if not satisfied:
+                for name in open_sections:
+                    allocation[name] += int(remaining * self.shares[name] / total_share)
+                break
+            for name in satisfied:
+                remaining -= demands[name] - allocation[name]
+                allocation[name] = demands[name]
+            open_sections -= satisfied
+        return allocation
+
+    def pack(self, template: str, question: str, global_store: list, session_store: list, context: str, history: str) -> tuple[dict, dict]:
+        """
+        Returns the packed sections as strings and a report of the allocation and of
+        what was dropped or truncated.
+        """
+        reserved = self.token_counter(template) + self.token_counter(question)
+        available = self.max_tokens - reserved
+
+        chunks = {
+            "global_store": [doc.page_content for doc in global_store],
+            "session_store": [doc.page_content for doc in session_store],
+        }
+        texts = {"context": context, "history": history}
+
+        demands = {}
+        for name in self.DEFAULT_SHARES:
+            if "{" + name + "}" not in template:
+                demands[name] = 0
+            elif name in chunks:
+                demands[name] = self.token_counter(self.SEPARATOR.join(chunks[name]))
+            else:
+                demands[name] = self.token_counter(texts[name])
+        allocation = self.allocate(available, demands)
+
+        sections = {}
+        dropped_chunks = {}
+        for name, section_chunks in chunks.items():
+            kept = self._fit_chunks(section_chunks, allocation[name])
+            sections[name] = self.SEPARATOR.join(kept)
+            dropped_chunks[name] = len(section_chunks) - len(kept)
+
+        truncated_chars = {}
+        sections["context"] = self._truncate(context, allocation["context"], keep_end=False)
+        sections["history"] = self._truncate(history, allocation["history"], keep_end=True)
+        for name in texts:
+            truncated_chars[name] = len(texts[name]) - len(sections[name])
+
+        report = {
+            "budget": self.max_tokens,
+            "reserved": reserved,
+            "allocated": allocation,
+            "used": {name: self.token_counter(text) for name, text in sections.items()},
+            "dropped_chunks": dropped_chunks,
+            "truncated_chars": truncated_chars,
+        }
+        return sections, report
+
+    def _fit_chunks(self, chunks: list, max_tokens: int) -> list:
+        kept = []
+        used = 0
+        separator_tokens = self.token_counter(self.SEPARATOR)
+        for chunk in chunks:
+            tokens = self.token_counter(chunk) + (separator_tokens if kept else 0)
+            if used + tokens <= max_tokens:
+                kept.append(chunk)
+                used += tokens
+        return kept
+
+    def _truncate(self, text: str, max_tokens: int, keep_end: bool) -> str:
+        tokens = self.token_counter(text)
+        if tokens <= max_tokens:
+            return text
+        if max_tokens <= 0:
+            return ""
+        length = len(text) * max_tokens // tokens
+        while length > 0:
+            truncated = text[-length:] if keep_end else text[:length]
+            if self.token_counter(truncated) <= max_tokens:
+                return truncated
+            length -= max(1, length // 20)
+        return ""
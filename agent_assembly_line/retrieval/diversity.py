@@ -0,0 +1,125 @@
+"""
+Agent-Assembly-Line
+"""
+
+import re
+from typing import Optional
+
+import numpy as np
+from langchain_core.documents import Document
+
+def shingles(text: str, size: int = 3) -> set:
+    """
+    Word n-grams of the normalized text, the fingerprint for near-duplicate detection.
+    """
+    words = re.findall(r"\w+", text.lower())
+    if len(words) < size:
+        return {" ".join(words)} if words else set()
+    return {" ".join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+def jaccard(a: set, b: set) -> float:
+    if not a and not b:
+        return 1.0
+    return len(a & b) / len(a | b)
+
+def mmr_order(query_embedding, embeddings, lambda_mult: float = 0.5, k: Optional[int] = None, selected=None) -> list[int]:
+    """
+    Maximal marginal relevance: picks the next document by
+    lambda * similarity to the query - (1 - lambda) * max similarity to the picked ones.
+    Documents picked before, e.g. from another store, are given as selected embeddings.
+    Returns the indices of the picked documents in order.
+    """
+    if len(embeddings) == 0:
+        return []
+    def normalize(vectors):
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+    docs = normalize(embeddings)
+    relevance = docs @ normalize(query_embedding)[0]
+    redundancy = np.full(len(docs), -np.inf, dtype=np.float32)
+    if selected is not None and len(selected):
+        redundancy = (docs @ normalize(selected).T).max(axis=1)
+    k = len(docs) if k is None else min(k, len(docs))
+    picked = []
+    candidates = list(range(len(docs)))
+    while candidates and len(picked) < k:
+        penalty = np.where(np.isinf(redundancy[candidates]), 0, redundancy[candidates])
+        scores = lambda_mult * relevance[candidates] - (1 - lambda_mult) * penalty
+        best = candidates.pop(int(np.argmax(scores)))
+        picked.append(best)
+        redundancy = np.maximum(redundancy, docs @ docs[best])
+    return picked
+
+class RetrievalDiversifier:
+    """
+    Post-retrieval stage removing duplicate and near-duplicate chunks across the agent
+    and the user store, and optionally reranking them by maximal marginal relevance,
+    so the prompt carries more distinct information per token.
+
+    Chunks are near-duplicates if the Jaccard similarity of their word 3-grams is at
+    least `threshold`. The higher ranked chunk is kept, agent store chunks before user
+    store chunks. MMR needs the embeddings of the retrieved chunks, `mmr_k` limits the
+    chunks kept per store.
+    """
+
+    def __init__(self, threshold: float = 0.85, mmr: bool = False, lambda_mult: float = 0.5, mmr_k: Optional[int] = None):
+        if not 0 < threshold <= 1:
+            raise ValueError("The near-duplicate threshold must be in (0, 1].")
+        if not 0 <= lambda_mult <= 1:
+            raise ValueError("The MMR lambda must be in [0, 1].")
+        self.threshold = threshold
+        self.mmr = mmr
+        self.lambda_mult = lambda_mult
+        self.mmr_k = mmr_k
+
+    @classmethod
+    def from_config(cls, diversity: dict) -> Optional["RetrievalDiversifier"]:
+        """
+        Creates the stage from the diversity section of the agent config, e.g.
+        { "near-duplicate-threshold": 0.85, "mmr": true, "mmr-lambda": 0.5, "mmr-k": 5 }.
+        Returns None if the section is missing.
+        """
+        if not diversity:
+            return None
+        return cls(
+            threshold=diversity.get("near-duplicate-threshold", 0.85),
+            mmr=diversity.get("mmr", False),
+            lambda_mult=diversity.get("mmr-lambda", 0.5),
+            mmr_k=diversity.get("mmr-k"),
+        )
+
+    def deduplicate(self, *doc_lists: list[Document]) -> tuple[list[list[Document]], int]:
+        """
+        Removes duplicates within and across the ranked lists, returns the lists and the number of removed chunks.
+        """
+        kept_shingles = []
+        results = []
+        removed = 0
+        for docs in doc_lists:
+            kept = []
+            for doc in docs:
+                fingerprint = shingles(doc.page_content)
+                if any(jaccard(fingerprint, other) >= self.threshold for other in kept_shingles):
+                    removed += 1
+                    continue
+                kept_shingles.append(fingerprint)
+                kept.append(doc)
+            results.append(kept)
+        return results, removed
+
+    def rerank(self, query_embedding, doc_lists: list[list[Document]], embedding_lists: list) -> list[list[Document]]:
+        """
+        Reorders each list by MMR, chunks picked from an earlier list count as already picked.
+        A list without embeddings (None) keeps its order, e.g. as the vector store reranked it.
+        """
+        results = []
+        selected = []
+        for docs, embeddings in zip(doc_lists, embedding_lists):
+            if embeddings is None:
+                results.append(docs[:self.mmr_k])
+                continue
+            order = mmr_order(query_embedding, embeddings, self.lambda_mult, self.mmr_k, selected)
+            results.append([docs[i] for i in order])
+            selected.extend(embeddings[i] for i in order)
+        return results
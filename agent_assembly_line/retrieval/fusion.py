@@ -0,0 +1,20 @@
+"""
+Agent-Assembly-Line
+"""
+
+from langchain_core.documents import Document
+
+def reciprocal_rank_fusion(rankings: list[list[Document]], k: int = 4, rrf_k: int = 60) -> list[Document]:
+    """
+    Fuses rankings of documents, e.g. of vector and lexical search, with reciprocal
+    rank fusion: a document scores the sum of 1 / (rrf_k + rank) over the rankings.
+    Documents with the same content are the same document. Returns the top k.
+    """
+    scores: dict[str, float] = {}
+    documents: dict[str, Document] = {}
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            scores[doc.page_content] = scores.get(doc.page_content, 0.0) + 1.0 / (rrf_k + rank)
+            documents.setdefault(doc.page_content, doc)
+    fused = sorted(scores, key=scores.get, reverse=True)[:k]
+    return [documents[content] for content in fused]
@@ -0,0 +1,114 @@
+"""
+Agent-Assembly-Line
+"""
+
+import asyncio
+import heapq
+import itertools
+import os
+from contextlib import asynccontextmanager
+from typing import Any, Callable
+
+INTERACTIVE = 0
+BACKGROUND = 10
+
+class QueueFullError(Exception):
+    def __init__(self, queued: int):
+        self.queued = queued
+        self.message = f"All LLM slots are busy and {queued} requests are already queued, try again later."
+        super().__init__(self.message)
+
+class LLMScheduler:
+    """
+    Limits the agent work running at once to a number of LLM slots, e.g. the
+    OLLAMA_NUM_PARALLEL requests Ollama serves in parallel. Further requests wait
+    in a queue ordered by priority, lower first, then by arrival. QueueFullError
+    is raised when max_queue requests are already waiting.
+
+    Blocking work is run with run(), in a worker thread so the event loop keeps
+    serving other requests and streams. Async work, like streaming an answer,
+    holds a slot with `async with scheduler.slot():`.
+
+    Used from one event loop, it needs no locks.
+    """
+
+    def __init__(self, slots: int = 4, max_queue: int = 32):
+        if slots < 1:
+            raise ValueError("The scheduler needs at least one slot.")
+        if max_queue < 0:
+            raise ValueError("The queue size must not be negative.")
+        self.slots = slots
+        self.max_queue = max_queue
+        self.active = 0
+        self.rejected = 0
+        self._waiting: list[tuple[int, int, asyncio.Future]] = []
+        self._arrival = itertools.count()
+
+    @classmethod
+    def from_env(cls) -> "LLMScheduler":
+        return cls(int(os.getenv('OLLAMA_NUM_PARALLEL', '4')), int(os.getenv('LLM_QUEUE_SIZE', '32')))
+
+    @property
+    def queued(self) -> int:
+        return len(self._waiting)
+
+    @property
+    def full(self) -> bool:
+        return self.active >= self.slots and self.queued >= self.max_queue
+
+    async def acquire(self, priority: int = INTERACTIVE):
+        if self.active < self.slots and not self._waiting:
+            self.active += 1
+            return
+        if self.queued >= self.max_queue:
+            self.rejected += 1
+            raise QueueFullError(self.queued)
+        entry = (priority, next(self._arrival), asyncio.get_running_loop().create_future())
+        heapq.heappush(self._waiting, entry)
+        try:
+            await entry[2]
+        except asyncio.CancelledError:
+            if entry[2].cancelled():
+                # release() skips and drops cancelled waiters, it may have done so already
+                if entry in self._waiting:
+                    self._waiting.remove(entry)
+                    heapq.heapify(self._waiting)
+            else:
+                # the slot was handed over just before the cancellation
+                self.release()
+            raise
+
+    def release(self):
+        """
+        Hands the slot over to the next waiting request, or frees it.
+        """
+        while self._waiting:
+            _, _, waiter = heapq.heappop(self._waiting)
+            if not waiter.done():
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+    @asynccontextmanager
+    async def slot(self, priority: int = INTERACTIVE):
+        await self.acquire(priority)
+        try:
+            yield
+        finally:
+            self.release()
+
+    async def run(self, fn: Callable, *args, priority: int = INTERACTIVE, **kwargs) -> Any:
+        """
+        Runs fn in a worker thread once a slot is free. A cancelled caller does not
+        stop the thread, the slot is only released when fn returns.
+        """
+        await self.acquire(priority)
+        work = asyncio.ensure_future(asyncio.to_thread(fn, *args, **kwargs))
+        work.add_done_callback(self._work_done)
+        return await asyncio.shield(work)
+
+    def _work_done(self, work: asyncio.Future):
+        self.release()
+        if not work.cancelled():
+            # retrieved, so errors of abandoned work are not reported as never retrieved
+            work.exception()
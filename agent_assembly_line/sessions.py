@@ -0,0 +1,99 @@
+"""
+Agent-Assembly-Line
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+
+class SessionManager:
+    """
+    Sessions of agents by agent name and session id, see Agent.session().
+
+    Sessions idle for ttl seconds, and the least recently used ones beyond
+    max_sessions, are evicted and their user vector stores deleted. A session
+    of an agent that was reloaded, e.g. after the AgentManager evicted it, is
+    replaced by a new session of the current agent.
+    """
+
+    def __init__(self, ttl: float = 1800, max_sessions: int = 1000):
+        if max_sessions < 1:
+            raise ValueError("At least one session is needed.")
+        self.ttl = ttl
+        self.max_sessions = max_sessions
+        self.sessions = OrderedDict()
+        self._last_used = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_env(cls) -> "SessionManager":
+        return cls(float(os.getenv('SESSION_TTL', '1800')), int(os.getenv('MAX_SESSIONS', '1000')))
+
+    def __len__(self):
+        return len(self.sessions)
+
+    def get(self, agent, session_id: str):
+        """
+        Returns the session of the agent, a new one for an unknown session id.
+        New sessions are created outside the lock, the first session of an agent
+        loads the agent's data and must not block the other sessions.
+        """
+        key = (agent.name, session_id)
+        with self._lock:
+            session, closing = self._get(key, agent)
+        if session is None:
+            created = agent.session(session_id)
+            with self._lock:
+                session, more = self._get(key, agent, created)
+            closing += more
+        for old in closing:
+            old.close_session()
+        return session
+
+    def _get(self, key, agent, created=None) -> tuple:
+        """
+        Returns the session of the agent, the created one if there is none yet,
+        and the sessions to close. The created session is not used if another
+        request added a session meanwhile.
+        """
+        session = self.sessions.get(key)
+        closing = []
+        if session is not None and session.session_of is not agent:
+            closing.append(self.sessions.pop(key))
+            del self._last_used[key]
+            session = None
+        if session is None:
+            if created is None:
+                return None, closing
+            session = self.sessions[key] = created
+        self.sessions.move_to_end(key)
+        self._last_used[key] = time.monotonic()
+        return session, closing + self._evict()
+
+    def _evict(self) -> list:
+        now = time.monotonic()
+        evicted = []
+        for key in list(self.sessions):
+            if now - self._last_used[key] > self.ttl or len(self.sessions) > self.max_sessions:
+                evicted.append(self.sessions.pop(key))
+                del self._last_used[key]
+        return evicted
+
+    def evict_idle(self) -> int:
+        """
+        Evicts and closes the sessions idle for longer than ttl, returns their number.
+        """
+        with self._lock:
+            evicted = self._evict()
+        for session in evicted:
+            session.close_session()
+        return len(evicted)
+
+    def close(self):
+        with self._lock:
+            sessions = list(self.sessions.values())
+            self.sessions.clear()
+            self._last_used.clear()
+        for session in sessions:
+            session.close_session()
@@ -0,0 +1,118 @@
+"""
+Agent-Assembly-Line
+"""
+
+import asyncio
+from typing import AsyncIterator, Awaitable, Callable, Optional
+
+_END = object()
+
+class ClientDisconnected(Exception):
+    pass
+
+async def wait_for_disconnect(receive: Callable[[], Awaitable[dict]]):
+    """
+    Returns when the ASGI receive channel reports the client's disconnect.
+    """
+    while True:
+        message = await receive()
+        if message["type"] == "http.disconnect":
+            return
+
+async def cancel_on_disconnect(receive: Callable[[], Awaitable[dict]], chunks: AsyncIterator, buffer_size: int = 64) -> AsyncIterator:
+    """
+    Yields the chunks, e.g. of Agent.stream(), iterated by a producer task that is
+    cancelled as soon as the client disconnects. The cancellation reaches the awaited
+    model request, so generation stops instead of running on until the next write
+    to the closed connection fails. ClientDisconnected is raised after cancelling.
+
+    The producer runs in one task, context variables like the current span keep
+    working across chunks.
+    """
+    queue = asyncio.Queue(maxsize=buffer_size)
+
+    async def produce():
+        try:
+            try:
+                async for chunk in chunks:
+                    await queue.put(chunk)
+            finally:
+                if hasattr(chunks, "aclose"):
+                    await chunks.aclose()
+        except Exception as e:
+            await queue.put(e)
+        await queue.put(_END)
+
+    producer = asyncio.create_task(produce())
+    disconnect = asyncio.create_task(wait_for_disconnect(receive))
+    try:
+        while True:
+            get = asyncio.ensure_future(queue.get())
+            await asyncio.wait({get, disconnect}, return_when=asyncio.FIRST_COMPLETED)
+            if not get.done():
+                get.cancel()
+                raise ClientDisconnected()
+            item = get.result()
+            if item is _END:
+                return
+            if isinstance(item, Exception):
+                raise item
+            yield item
+    finally:
+        disconnect.cancel()
+        producer.cancel()
+        await asyncio.gather(producer, disconnect, return_exceptions=True)
+
+async def coalesce(chunks: AsyncIterator[str], flush_interval: float = 0.05, max_chars: int = 64, keep_alive: Optional[float] = 15.0) -> AsyncIterator[Optional[list[str]]]:
+    """
+    Batches streamed chunks, so a stream is not written and rendered token by token.
+    Yields the chunks buffered for flush_interval seconds or up to max_chars
+    characters, whichever comes first. The first chunk is yielded right away, it
+    is the time to first token. None is yielded when nothing was yielded for
+    keep_alive seconds, e.g. during a long retrieval, to send a keep-alive.
+    """
+    loop = asyncio.get_running_loop()
+    iterator = chunks.__aiter__()
+    buffer, size = [], 0
+    first, flush_at, last_yield = True, None, loop.time()
+    pending = None
+
+    async def next_chunk():
+        return await iterator.__anext__()
+
+    try:
+        while True:
+            if pending is None:
+                # kept across timeouts, waiting doesn't cancel the iteration
+                pending = asyncio.ensure_future(next_chunk())
+            deadline = flush_at if buffer else (last_yield + keep_alive if keep_alive else None)
+            timeout = None if deadline is None else max(0.0, deadline - loop.time())
+            done, _ = await asyncio.wait({pending}, timeout=timeout)
+            if not done:
+                if buffer:
+                    yield buffer
+                else:
+                    yield None
+                buffer, size, flush_at, last_yield = [], 0, None, loop.time()
+                continue
+            try:
+                chunk = pending.result()
+            except StopAsyncIteration:
+                pending = None
+                break
+            pending = None
+            buffer.append(chunk)
+            size += len(chunk)
+            if flush_at is None:
+                flush_at = loop.time() + flush_interval
+            if first or size >= max_chars or flush_interval <= 0:
+                yield buffer
+                buffer, size, flush_at, last_yield, first = [], 0, None, loop.time(), False
+        if buffer:
+            yield buffer
+    finally:
+        if pending is not None:
+            pending.cancel()
+            await asyncio.gather(pending, return_exceptions=True)
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
@@ -0,0 +1,9 @@
+from .tracer import Span, Trace, Tracer, span, current_span, use_span, in_span
+from .exporters import SpanExporter, LogExporter, RingBufferExporter, OpenTelemetryExporter
+from .callbacks import SpanCallbackHandler
+
+__all__ = [
+    'Span', 'Trace', 'Tracer', 'span', 'current_span', 'use_span', 'in_span',
+    'SpanExporter', 'LogExporter', 'RingBufferExporter', 'OpenTelemetryExporter',
+    'SpanCallbackHandler',
+]
@@ -0,0 +1,80 @@
+"""
+Agent-Assembly-Line
+"""
+
+from typing import Any, Optional
+from uuid import UUID
+
+from langchain_core.callbacks import BaseCallbackHandler
+
+from agent_assembly_line.tracing.tracer import Span
+
+class SpanCallbackHandler(BaseCallbackHandler):
+    """
+    Records the steps of an agent's chain as child spans of `parent`: prompt_render,
+    llm, llm_first_token from the start of the LLM call to its first token, and parse.
+    Pass it in the config of a chain call.
+    """
+
+    # sync handler, runs in the calling thread or event loop instead of an executor
+    run_inline = True
+
+    STEPS = {
+        "ChatPromptTemplate": "prompt_render",
+        "StrOutputParser": "parse",
+    }
+
+    def __init__(self, parent: Span):
+        self.parent = parent
+        self._spans: dict[UUID, Span] = {}
+        self._first_tokens: dict[UUID, Span] = {}
+
+    def _start(self, run_id: UUID, name: str, **attributes):
+        self._spans[run_id] = self.parent.trace.start_span(name, self.parent, **attributes)
+
+    def _end(self, run_id: UUID, error: Optional[BaseException] = None):
+        first_token = self._first_tokens.pop(run_id, None)
+        if first_token is not None:
+            first_token.end()
+        span = self._spans.pop(run_id, None)
+        if span is not None:
+            if error is not None:
+                span.set_attribute("error", type(error).__name__)
+            span.end()
+
+    def first_token(self):
+        """
+        Ends the time-to-first-token spans of all running LLM calls, for
+        models streaming without token callbacks.
+        """
+        for run_id in list(self._first_tokens):
+            self._first_tokens.pop(run_id).end()
+
+    def on_chain_start(self, serialized: Optional[dict], inputs: Any, *, run_id: UUID, **kwargs: Any):
+        name = self.STEPS.get(kwargs.get("name"))
+        if name:
+            self._start(run_id, name)
+
+    def on_chain_end(self, outputs: Any, *, run_id: UUID, **kwargs: Any):
+        self._end(run_id)
+
+    def on_chain_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._end(run_id, error)
+
+    def on_llm_start(self, serialized: Optional[dict], prompts: list, *, run_id: UUID, **kwargs: Any):
+        self._start(run_id, "llm")
+        self._first_tokens[run_id] = self.parent.trace.start_span("llm_first_token", self.parent)
+
+    def on_chat_model_start(self, serialized: Optional[dict], messages: list, *, run_id: UUID, **kwargs: Any):
+        self.on_llm_start(serialized, messages, run_id=run_id, **kwargs)
+
+    def on_llm_new_token(self, token: str, *, run_id: UUID, **kwargs: Any):
+        first_token = self._first_tokens.pop(run_id, None)
+        if first_token is not None:
+            first_token.end()
+
+    def on_llm_end(self, response: Any, *, run_id: UUID, **kwargs: Any):
+        self._end(run_id)
+
+    def on_llm_error(self, error: BaseException, *, run_id: UUID, **kwargs: Any):
+        self._end(run_id, error)
@@ -0,0 +1,118 @@
+"""
+Agent-Assembly-Line
+"""
+
+import logging
+import math
+import threading
+from collections import deque
+from typing import Optional
+
+from agent_assembly_line.tracing.tracer import Trace
+
+class SpanExporter:
+    """
+    Receives every finished trace of a tracer.
+    """
+
+    def export(self, trace: Trace):
+        raise NotImplementedError
+
+class LogExporter(SpanExporter):
+    """
+    Logs one line per trace with the durations of its spans.
+    """
+
+    def __init__(self, logger: Optional[logging.Logger] = None, level: int = logging.INFO):
+        self.logger = logger or logging.getLogger("agent_assembly_line.tracing")
+        self.level = level
+
+    def export(self, trace: Trace):
+        if not self.logger.isEnabledFor(self.level):
+            return
+        spans = ", ".join(f"{span.name} {span.duration_ms:.1f} ms" for span in trace.spans[1:])
+        self.logger.log(self.level, "%s %.1f ms: %s", trace.root.name, trace.root.duration_ms, spans)
+
+class RingBufferExporter(SpanExporter):
+    """
+    Keeps the last `max_traces` traces in memory, e.g. for latency percentiles of a span.
+    """
+
+    def __init__(self, max_traces: int = 1000):
+        self.traces: deque = deque(maxlen=max_traces)
+        self._lock = threading.Lock()
+
+    def export(self, trace: Trace):
+        with self._lock:
+            self.traces.append(trace)
+
+    def clear(self):
+        with self._lock:
+            self.traces.clear()
+
+    def durations(self, name: str) -> list[float]:
+        """
+        The durations in ms of all buffered spans with the name.
+        """
+        with self._lock:
+            traces = list(self.traces)
+        return [span.duration_ms for trace in traces for span in trace.spans if span.name == name]
+
+    def percentile(self, name: str, percentile: float) -> Optional[float]:
+        """
+        Nearest-rank percentile of the durations of the span, e.g. 95 for the p95.
+        """
+        durations = sorted(self.durations(name))
+        if not durations:
+            return None
+        rank = max(1, math.ceil(percentile / 100 * len(durations)))
+        return durations[rank - 1]
+
+class OpenTelemetryExporter(SpanExporter):
+    """
+    Replays finished traces as OpenTelemetry spans with their original timing, to
+    the global tracer provider unless another one is given. Needs opentelemetry-api
+    and, to send the spans anywhere, a configured opentelemetry-sdk.
+    """
+
+    def __init__(self, tracer_provider=None, instrumentation_name: str = "agent_assembly_line"):
+        try:
+            from opentelemetry import trace as otel_trace
+        except ImportError:
+            raise ImportError(
+                "opentelemetry-api is required for the OpenTelemetry exporter. "
+                "Please install it with: pip install opentelemetry-api opentelemetry-sdk"
+            )
+        self._otel_trace = otel_trace
+        self.tracer = otel_trace.get_tracer(instrumentation_name, tracer_provider=tracer_provider)
+
+    @staticmethod
+    def _attributes(attributes: dict) -> dict:
+        return {key: value for key, value in attributes.items() if isinstance(value, (str, bool, int, float))}
+
+    def export(self, trace: Trace):
+        otel_spans = {}
+        # parents are started before their children
+        for span in trace.spans:
+            parent = otel_spans.get(span.parent.span_id) if span.parent else None
+            context = self._otel_trace.set_span_in_context(parent) if parent is not None else None
+            otel_spans[span.span_id] = self.tracer.start_span(
+                span.name,
+                context=context,
+                start_time=int(span.start * 1e9),
+                attributes=self._attributes({**span.attributes, "agent.trace_id": trace.trace_id}),
+            )
+        for span in reversed(trace.spans):
+            otel_spans[span.span_id].end(end_time=int(span.end_time * 1e9))
+
+def create_exporter(name: str, tracing: dict) -> SpanExporter:
+    """
+    Creates an exporter by its name in the tracing config.
+    """
+    if name == "log":
+        return LogExporter()
+    if name == "memory":
+        return RingBufferExporter(tracing.get("buffer-size", 1000))
+    if name == "opentelemetry":
+        return OpenTelemetryExporter()
+    raise ValueError(f"Unknown trace exporter: {name}. Choose 'log', 'memory' or 'opentelemetry'.")
@@ -0,0 +1,203 @@
+"""
+Agent-Assembly-Line
+"""
+
+import time
+import uuid
+from contextlib import contextmanager, nullcontext
+from contextvars import ContextVar
+from typing import AsyncIterator, Iterator, Optional
+
+# The span code runs in, spans started in the same context become its children.
+# Tasks and threads started by asyncio inherit it.
+_current_span: ContextVar[Optional["Span"]] = ContextVar("agent_assembly_line_span", default=None)
+
+class Span:
+    """
+    A named, timed step of an agent call. `start` is the wall clock time in
+    seconds, the duration is measured with the performance counter.
+    """
+
+    def __init__(self, name: str, trace: Optional["Trace"] = None, parent: Optional["Span"] = None, attributes: Optional[dict] = None):
+        self.name = name
+        self.trace = trace
+        self.parent = parent
+        self.span_id = uuid.uuid4().hex[:16]
+        self.attributes = dict(attributes or {})
+        self.start = time.time()
+        self._start_counter = time.perf_counter()
+        self.duration_ms: Optional[float] = None
+
+    @property
+    def ended(self) -> bool:
+        return self.duration_ms is not None
+
+    @property
+    def end_time(self) -> Optional[float]:
+        return None if self.duration_ms is None else self.start + self.duration_ms / 1000
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def end(self):
+        """
+        Ends the span, later calls keep the first end.
+        """
+        if self.duration_ms is None:
+            self.duration_ms = (time.perf_counter() - self._start_counter) * 1000
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "span_id": self.span_id,
+            "parent_id": self.parent.span_id if self.parent else None,
+            "start": self.start,
+            "duration_ms": self.duration_ms,
+            "attributes": self.attributes,
+        }
+
+class Trace:
+    """
+    The spans of one agent call, the first one is the root span of the call.
+    """
+
+    def __init__(self, name: str, tracer: Optional["Tracer"] = None, **attributes):
+        self.trace_id = uuid.uuid4().hex
+        self.tracer = tracer
+        self.spans: list[Span] = []
+        self.root = self.start_span(name, **attributes)
+
+    @property
+    def ended(self) -> bool:
+        return self.root.ended
+
+    def start_span(self, name: str, parent: Optional[Span] = None, **attributes) -> Span:
+        span = Span(name, self, parent, attributes)
+        self.spans.append(span)
+        return span
+
+    def end(self):
+        """
+        Ends the root span and spans left open, e.g. by an aborted stream, and exports the trace.
+        """
+        for span in self.spans:
+            span.end()
+        if self.tracer is not None:
+            self.tracer.export(self)
+
+    def summary(self) -> list[dict]:
+        return [span.to_dict() for span in self.spans]
+
+def current_span() -> Optional[Span]:
+    """
+    The span of the running trace code runs in, None outside of traces.
+    """
+    span = _current_span.get()
+    if span is None or span.trace is None or span.trace.ended:
+        return None
+    return span
+
+@contextmanager
+def use_span(span: Optional[Span]) -> Iterator[Optional[Span]]:
+    """
+    Runs the block in the span, spans started in it become its children.
+    With None the block runs outside of traces.
+    """
+    token = _current_span.set(span)
+    try:
+        yield span
+    finally:
+        _current_span.reset(token)
+
+async def in_span(span: Optional[Span], iterator: AsyncIterator) -> AsyncIterator:
+    """
+    Yields the items of the async iterator, e.g. a model stream, each step runs in
+    the span. An async generator must not keep a span set across its yields, the
+    code consuming it would run in the span. Closing closes the iterator too.
+    """
+    iterator = iterator.__aiter__()
+    try:
+        while True:
+            with use_span(span):
+                try:
+                    item = await iterator.__anext__()
+                except StopAsyncIteration:
+                    return
+            yield item
+    finally:
+        if hasattr(iterator, "aclose"):
+            await iterator.aclose()
+
+@contextmanager
+def span(name: str, **attributes) -> Iterator[Span]:
+    """
+    Records a child span of the current span. Outside of traces the span is not recorded.
+    """
+    parent = current_span()
+    if parent is None:
+        yield Span(name, attributes=attributes)
+        return
+    child = parent.trace.start_span(name, parent, **attributes)
+    try:
+        with use_span(child):
+            yield child
+    except BaseException as e:
+        child.set_attribute("error", type(e).__name__)
+        raise
+    finally:
+        child.end()
+
+class Tracer:
+    """
+    Starts a trace per agent call and hands finished traces to its exporters.
+
+    Calls nested into a running trace, e.g. run() of a routed agent, become part
+    of that trace. The exporters are configured in the tracing section of the
+    agent config, see from_config().
+    """
+
+    def __init__(self, exporters=None):
+        self.exporters = list(exporters or [])
+
+    @classmethod
+    def from_config(cls, tracing: dict) -> "Tracer":
+        """
+        Creates the tracer from the tracing section of the agent config, e.g.
+        { "exporters": ["log", "memory", "opentelemetry"], "buffer-size": 1000 }.
+        Without the section spans are only attached to the agent's stats.
+        """
+        from agent_assembly_line.tracing.exporters import create_exporter
+
+        tracing = tracing or {}
+        return cls([create_exporter(name, tracing) for name in tracing.get("exporters", [])])
+
+    def add_exporter(self, exporter):
+        self.exporters.append(exporter)
+
+    def export(self, trace: Trace):
+        for exporter in self.exporters:
+            try:
+                exporter.export(trace)
+            except Exception as e:
+                print(f"Exporting trace {trace.root.name} failed: {e}")
+
+    @contextmanager
+    def trace(self, name: str, in_context: bool = True, **attributes) -> Iterator[Trace]:
+        """
+        Runs the block in a new trace, or in the running trace if there is one.
+        Without in_context the root span is not set as the current span, e.g. for
+        async generators, which run their steps in it, see use_span() and in_span().
+        """
+        parent = current_span()
+        if parent is not None:
+            yield parent.trace
+            return
+        trace = Trace(name, self, **attributes)
+        try:
+            with use_span(trace.root) if in_context else nullcontext():
+                yield trace
+        except BaseException as e:
+            trace.root.set_attribute("error", type(e).__name__)
+            raise
+        finally:
+            trace.end()
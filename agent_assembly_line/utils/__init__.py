@@ -1,3 +1,5 @@
 from .string_utils import strtobool
+from .lru_cache import LRUCache
+from .tokens import estimate_tokens
 
-__all__ = ['strtobool']
\ No newline at end of file
+__all__ = ['strtobool', 'LRUCache', 'estimate_tokens']
@@ -0,0 +1,85 @@
+"""
+Agent-Assembly-Line
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Optional
+
+class LRUCache:
+    """
+    Small thread-safe least-recently-used cache with a maximum number of entries
+    and an optional time to live in seconds. Counts hits and misses.
+    """
+
+    def __init__(self, max_size: int = 128, ttl: Optional[float] = None):
+        if max_size < 1:
+            raise ValueError("max_size must be at least 1")
+        self.max_size = max_size
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _expired(self, expires_at) -> bool:
+        return expires_at is not None and expires_at <= time.monotonic()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key in self._entries:
+                value, expires_at = self._entries[key]
+                if not self._expired(expires_at):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return value
+                del self._entries[key]
+            self.misses += 1
+            return default
+
+    def peek(self, key, default=None):
+        """
+        Returns the value without counting a hit or miss and without refreshing it.
+        """
+        with self._lock:
+            if key in self._entries:
+                value, expires_at = self._entries[key]
+                if not self._expired(expires_at):
+                    return value
+            return default
+
+    def count_miss(self):
+        """
+        Counts a miss of a lookup not done with get(), e.g. a search over items().
+        """
+        with self._lock:
+            self.misses += 1
+
+    def put(self, key, value):
+        expires_at = time.monotonic() + self.ttl if self.ttl else None
+        with self._lock:
+            self._entries[key] = (value, expires_at)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def items(self) -> list:
+        """
+        Returns the entries that are not expired, least recently used first.
+        """
+        with self._lock:
+            for key in [key for key, (_, expires_at) in self._entries.items() if self._expired(expires_at)]:
+                del self._entries[key]
+            return [(key, value) for key, (value, _) in self._entries.items()]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __contains__(self, key):
+        with self._lock:
+            return key in self._entries and not self._expired(self._entries[key][1])
+
+    def __len__(self):
+        return len(self._entries)
@@ -2,8 +2,182 @@
 Agent-Assembly-Line
 """
 
-from langchain_core.text_splitters import RecursiveCharacterTextSplitter
+import re
+from typing import Callable, Iterable, Iterator, Optional
+
+from langchain_core.documents import Document
+
+from agent_assembly_line.utils.tokens import estimate_tokens
+
+# Named boundaries with their separators and the minimum fill of the chunk, as a
+# fraction of the size, before a break there is accepted. Coarse boundaries may
+# end a chunk earlier than fine ones.
+BOUNDARIES = {
+    "paragraph": (("\n\n",), 0.3),
+    "line": (("\n",), 0.4),
+    "sentence": ((". ", "! ", "? "), 0.5),
+    "clause": ((": ", "; ", ", "), 0.7),
+    "word": ((" ", "\n", "\t"), 0.8),
+}
+DEFAULT_BOUNDARIES = ("paragraph", "line", "sentence", "clause", "word")
+UNITS = ("chars", "tokens")
+
+# Upper bound of characters per token, limits the window searched for a token sized chunk.
+MAX_CHARS_PER_TOKEN = 16
+
+_WHITESPACE = re.compile(r"\s")
+
+class TextSplitter:
+    """
+    Splits text into chunks of at most `chunk_size` characters or tokens, with
+    `chunk_overlap` of the same unit repeated at the start of the next chunk.
+
+    A chunk ends at the most preferred boundary found in its window, e.g. a
+    paragraph break before a sentence end before a space, and is cut hard if
+    there is none. Boundaries are names from BOUNDARIES or literal separators.
+    Tokens are counted with `token_counter`, a rough estimate by default.
+
+    The iter_ methods are generators, chunks of large documents are produced
+    one at a time.
+    """
+
+    def __init__(self, chunk_size: int = 1000, chunk_overlap: int = 100, unit: str = "chars",
+                 boundaries: Iterable[str] = DEFAULT_BOUNDARIES, token_counter: Callable[[str], int] = estimate_tokens):
+        if unit not in UNITS:
+            raise ValueError(f"Unknown chunk unit: {unit}, use one of {', '.join(UNITS)}")
+        if chunk_size < 1:
+            raise ValueError("The chunk size must be at least 1.")
+        if not 0 <= chunk_overlap < chunk_size:
+            raise ValueError("The chunk overlap must be at least 0 and smaller than the chunk size.")
+        self.chunk_size = chunk_size
+        self.chunk_overlap = chunk_overlap
+        self.unit = unit
+        self.boundaries = list(boundaries)
+        self.token_counter = token_counter
+        self._levels = [BOUNDARIES.get(boundary, ((boundary,), 0.5)) for boundary in self.boundaries]
+
+    @classmethod
+    def from_config(cls, chunking: Optional[dict]) -> "TextSplitter":
+        """
+        Creates the splitter from the chunking section of the agent config, e.g.
+        { "size": 256, "overlap": 32, "unit": "tokens", "boundaries": ["paragraph", "sentence", "word"] }.
+        Missing settings keep their defaults.
+        """
+        chunking = chunking or {}
+        return cls(
+            chunk_size=chunking.get("size", 1000),
+            chunk_overlap=chunking.get("overlap", 100),
+            unit=chunking.get("unit", "chars"),
+            boundaries=chunking.get("boundaries", DEFAULT_BOUNDARIES),
+        )
+
+    @property
+    def settings(self) -> dict:
+        """
+        The settings which determine the chunks, e.g. to key stored indexes.
+        """
+        return {
+            "size": self.chunk_size,
+            "overlap": self.chunk_overlap,
+            "unit": self.unit,
+            "boundaries": self.boundaries,
+        }
+
+    def length(self, text: str) -> int:
+        return len(text) if self.unit == "chars" else self.token_counter(text)
+
+    def iter_text(self, text: str) -> Iterator[str]:
+        yield from self._split(text)
+
+    def split_text(self, text: str) -> list[str]:
+        return list(self.iter_text(text))
+
+    def iter_documents(self, documents: Iterable[Document]) -> Iterator[Document]:
+        """
+        Chunks of the documents, each with a copy of the metadata of its document.
+        """
+        for doc in documents:
+            for chunk in self.iter_text(doc.page_content):
+                yield Document(page_content=chunk, metadata=dict(doc.metadata))
+
+    def split_documents(self, documents: Iterable[Document]) -> list[Document]:
+        return list(self.iter_documents(documents))
+
+    def _split(self, text: str) -> Iterator[str]:
+        """
+        Yields the chunks of the text. A chunk must end after the end of the
+        previous chunk, so overlapping chunks always advance.
+        """
+        start, floor, n = 0, 0, len(text)
+        while start < n:
+            end = self._window_end(text, start)
+            if end >= n:
+                chunk = text[start:].strip()
+                if chunk:
+                    yield chunk
+                return
+            cut = self._cut(text, start, end, floor)
+            chunk = text[start:cut].strip()
+            start = self._overlap_start(text, start, cut)
+            floor = cut
+            if chunk:
+                yield chunk
+
+    def _window_end(self, text: str, start: int) -> int:
+        """
+        The end of the longest text from start which fits into the chunk size.
+        """
+        n = len(text)
+        if self.unit == "chars":
+            return min(n, start + self.chunk_size)
+        hi = min(n, start + self.chunk_size * MAX_CHARS_PER_TOKEN)
+        if self.length(text[start:hi]) <= self.chunk_size:
+            return hi
+        lo = start + 1
+        while lo < hi:
+            mid = (lo + hi + 1) // 2
+            if self.length(text[start:mid]) <= self.chunk_size:
+                lo = mid
+            else:
+                hi = mid - 1
+        return lo
+
+    def _cut(self, text: str, start: int, end: int, floor: int) -> int:
+        """
+        The end of the chunk in the window at the most preferred boundary, the window end if there is none.
+        """
+        for separators, fill in self._levels:
+            lowest = max(floor, start + int(fill * (end - start)))
+            best = -1
+            for separator in separators:
+                position = text.rfind(separator, lowest, end)
+                if position >= 0:
+                    best = max(best, position + len(separator))
+            if best > 0:
+                return best
+        return end
+
+    def _overlap_start(self, text: str, start: int, cut: int) -> int:
+        """
+        The start of the next chunk, repeating up to the overlap of this one from a word start on.
+        """
+        if self.chunk_overlap == 0:
+            return cut
+        if self.unit == "chars":
+            position = max(start + 1, cut - self.chunk_overlap)
+        else:
+            lo, hi = start + 1, cut
+            while lo < hi:
+                mid = (lo + hi) // 2
+                if self.length(text[mid:cut]) <= self.chunk_overlap:
+                    hi = mid
+                else:
+                    lo = mid + 1
+            position = lo
+        if not text[position - 1].isspace():
+            whitespace = _WHITESPACE.search(text, position, cut)
+            position = whitespace.end() if whitespace else cut
+        return position
 
 def split_documents(documents, chunk_size=1000, chunk_overlap=100):
-    text_splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap)
-    return text_splitter.split_documents(documents)
\ No newline at end of file
+    return TextSplitter(chunk_size=chunk_size, chunk_overlap=chunk_overlap).split_documents(documents)
@@ -0,0 +1,10 @@
+"""
+Agent-Assembly-Line
+"""
+
+def estimate_tokens(text: str) -> int:
+    """
+    Rough token estimate of about 4 characters per token, good enough for budgeting
+    without a model specific tokenizer.
+    """
+    return (len(text) + 3) // 4
@@ -0,0 +1,2 @@
+from .vector_store_factory import VectorStoreFactory
+from .numpy_store import NumpyVectorStore
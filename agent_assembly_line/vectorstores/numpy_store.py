@@ -0,0 +1,256 @@
+"""
+Agent-Assembly-Line
+"""
+
+import json
+import os
+import threading
+import uuid
+from typing import Any, Callable, Iterable, Optional, Sequence, Union
+
+import numpy as np
+from langchain_core.documents import Document
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+MetadataFilter = Union[dict, Callable[[dict], bool]]
+
+class NumpyVectorStore(VectorStore):
+    """
+    In-memory vector store for small and ephemeral collections, e.g. uploads,
+    single URLs and micro agents.
+
+    The embeddings are kept normalized as float32 rows of one contiguous NumPy
+    matrix, a search is a vectorized brute-force cosine similarity with a partial
+    sort for the top k. Scores are cosine similarities, higher is more similar.
+    With a persist directory the collection is saved with np.save by save() or
+    close(), not on every change, and loaded memory-mapped.
+    """
+
+    def __init__(self, embedding: Embeddings, collection: str = "default", persist_directory: Optional[str] = None):
+        self._embedding = embedding
+        self.collection = collection
+        self.persist_directory = persist_directory
+        self._matrix = np.zeros((0, 0), dtype=np.float32)  # rows beyond _size are spare capacity
+        self._size = 0
+        self._ids: list[str] = []
+        self._texts: list[str] = []
+        self._metadatas: list[dict] = []
+        self._unsaved = False
+        self._lock = threading.RLock()
+
+    @classmethod
+    def open(cls, collection: str, embedding: Embeddings, persist_directory: Optional[str] = None) -> "NumpyVectorStore":
+        """
+        Creates the store, loads the collection if it was saved in the persist directory before.
+        """
+        store = cls(embedding, collection, persist_directory)
+        if persist_directory and os.path.exists(store._vectors_path):
+            store.load()
+        return store
+
+    @property
+    def embeddings(self) -> Embeddings:
+        return self._embedding
+
+    @property
+    def vectors(self) -> np.ndarray:
+        """
+        The normalized embeddings, one row per document.
+        """
+        return self._matrix[:self._size]
+
+    def __len__(self):
+        return self._size
+
+    @staticmethod
+    def _normalize(vectors) -> np.ndarray:
+        vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+        norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+        return vectors / np.where(norms == 0, 1, norms)
+
+    def _append(self, vectors: np.ndarray):
+        if self._size and self._matrix.shape[1] != vectors.shape[1]:
+            raise ValueError(f"Embedding dimension {vectors.shape[1]} doesn't match the store's dimension {self._matrix.shape[1]}")
+        needed = self._size + len(vectors)
+        if needed > self._matrix.shape[0] or self._matrix.shape[1] != vectors.shape[1] or not self._matrix.flags.writeable:
+            # grow by doubling, a memory-mapped matrix is copied into memory
+            capacity = max(needed, 2 * self._size, 16)
+            matrix = np.empty((capacity, vectors.shape[1]), dtype=np.float32)
+            if self._size:
+                matrix[:self._size] = self.vectors
+            self._matrix = matrix
+        self._matrix[self._size:needed] = vectors
+        self._size = needed
+
+    def add_texts(self, texts: Iterable[str], metadatas: Optional[list[dict]] = None, *, ids: Optional[list[str]] = None, **kwargs: Any) -> list[str]:
+        texts = list(texts)
+        if not texts:
+            return []
+        metadatas = metadatas or [{} for _ in texts]
+        ids = [id or uuid.uuid4().hex for id in ids] if ids else [uuid.uuid4().hex for _ in texts]
+        vectors = NumpyVectorStore._normalize(self._embedding.embed_documents(texts))
+        with self._lock:
+            self._delete(ids)  # documents with known ids are replaced
+            self._append(vectors)
+            self._ids.extend(ids)
+            self._texts.extend(texts)
+            self._metadatas.extend(dict(metadata or {}) for metadata in metadatas)
+            self._unsaved = True
+        return ids
+
+    def _delete(self, ids) -> int:
+        ids = set(ids)
+        keep = [i for i, id in enumerate(self._ids) if id not in ids]
+        if len(keep) == self._size:
+            return 0
+        self._matrix = np.ascontiguousarray(self._matrix[keep])
+        removed = self._size - len(keep)
+        self._size = len(keep)
+        self._ids = [self._ids[i] for i in keep]
+        self._texts = [self._texts[i] for i in keep]
+        self._metadatas = [self._metadatas[i] for i in keep]
+        self._unsaved = True
+        return removed
+
+    def delete(self, ids: Optional[list[str]] = None, **kwargs: Any) -> Optional[bool]:
+        with self._lock:
+            if ids is None:
+                self.reset_collection()
+            else:
+                self._delete(ids)
+        return True
+
+    def reset_collection(self):
+        with self._lock:
+            self._matrix = np.zeros((0, 0), dtype=np.float32)
+            self._size = 0
+            self._ids, self._texts, self._metadatas = [], [], []
+            self._unsaved = True
+
+    def get_by_ids(self, ids: Sequence[str], /) -> list[Document]:
+        with self._lock:
+            positions = {id: i for i, id in enumerate(self._ids)}
+            return [self._document(positions[id]) for id in ids if id in positions]
+
+    def _document(self, i) -> Document:
+        return Document(id=self._ids[i], page_content=self._texts[i], metadata=dict(self._metadatas[i]))
+
+    @staticmethod
+    def _matches(metadata: dict, filter: MetadataFilter) -> bool:
+        if callable(filter):
+            return filter(metadata)
+        for key, value in filter.items():
+            if isinstance(value, (list, tuple, set)):
+                if metadata.get(key) not in value:
+                    return False
+            elif metadata.get(key) != value:
+                return False
+        return True
+
+    def _top_k(self, embedding: list[float], k: int, filter: Optional[MetadataFilter]) -> tuple[np.ndarray, np.ndarray]:
+        """
+        Returns the rows of the k most cosine similar documents and the similarities, call with the lock held.
+        """
+        if self._size == 0 or k <= 0:
+            return np.empty(0, dtype=int), np.empty(0, dtype=np.float32)
+        scores = self.vectors @ NumpyVectorStore._normalize(embedding)[0]
+        candidates = self._size
+        if filter:
+            mask = np.fromiter((NumpyVectorStore._matches(metadata, filter) for metadata in self._metadatas), dtype=bool, count=self._size)
+            scores = np.where(mask, scores, -np.inf)
+            candidates = int(mask.sum())
+        k = min(k, candidates)
+        if k == 0:
+            return np.empty(0, dtype=int), scores
+        top = np.argpartition(-scores, k - 1)[:k]
+        return top[np.argsort(-scores[top], kind="stable")], scores
+
+    def similarity_search_with_score_by_vector(self, embedding: list[float], k: int = 4, filter: Optional[MetadataFilter] = None) -> list[tuple[Document, float]]:
+        """
+        Returns the k most cosine similar documents with their similarity.
+        The filter is a dict of metadata values, a list value matches any of its
+        items, or a function of the metadata.
+        """
+        with self._lock:
+            top, scores = self._top_k(embedding, k, filter)
+            return [(self._document(i), float(scores[i])) for i in top]
+
+    def similarity_search_with_vectors_by_vector(self, embedding: list[float], k: int = 4, filter: Optional[MetadataFilter] = None) -> list[tuple[Document, np.ndarray]]:
+        """
+        Returns the k most cosine similar documents with their normalized embeddings,
+        e.g. to rerank them by MMR without embedding them again.
+        """
+        with self._lock:
+            top, _ = self._top_k(embedding, k, filter)
+            return [(self._document(i), self.vectors[i].copy()) for i in top]
+
+    def similarity_search_by_vector(self, embedding: list[float], k: int = 4, filter: Optional[MetadataFilter] = None, **kwargs: Any) -> list[Document]:
+        return [doc for doc, _ in self.similarity_search_with_score_by_vector(embedding, k, filter)]
+
+    async def asimilarity_search_by_vector(self, embedding: list[float], k: int = 4, filter: Optional[MetadataFilter] = None, **kwargs: Any) -> list[Document]:
+        # A brute-force search of a small matrix is faster than the hop to an executor
+        return self.similarity_search_by_vector(embedding, k, filter)
+
+    def similarity_search_with_score(self, query: str, k: int = 4, filter: Optional[MetadataFilter] = None, **kwargs: Any) -> list[tuple[Document, float]]:
+        return self.similarity_search_with_score_by_vector(self._embedding.embed_query(query), k, filter)
+
+    def similarity_search(self, query: str, k: int = 4, filter: Optional[MetadataFilter] = None, **kwargs: Any) -> list[Document]:
+        return self.similarity_search_by_vector(self._embedding.embed_query(query), k, filter)
+
+    def _select_relevance_score_fn(self) -> Callable[[float], float]:
+        return lambda score: score
+
+    @classmethod
+    def from_texts(cls, texts: list[str], embedding: Embeddings, metadatas: Optional[list[dict]] = None, *, ids: Optional[list[str]] = None,
+                   collection: str = "default", persist_directory: Optional[str] = None, **kwargs: Any) -> "NumpyVectorStore":
+        store = cls.open(collection, embedding, persist_directory)
+        store.add_texts(texts, metadatas, ids=ids)
+        store.close()
+        return store
+
+    @property
+    def _vectors_path(self) -> str:
+        return os.path.join(self.persist_directory, f"{self.collection}.npy")
+
+    @property
+    def _documents_path(self) -> str:
+        return os.path.join(self.persist_directory, f"{self.collection}.json")
+
+    def close(self):
+        """
+        Saves the changes not saved yet, if there is a persist directory. The store stays usable.
+        """
+        with self._lock:
+            if self.persist_directory and self._unsaved:
+                self.save()
+
+    def save(self):
+        """
+        Saves the collection to the persist directory, the vectors with np.save, the
+        documents as JSON. Both files are replaced atomically.
+        """
+        with self._lock:
+            os.makedirs(self.persist_directory, exist_ok=True)
+            tmp_path = self._vectors_path + ".tmp"
+            with open(tmp_path, "wb") as f:
+                np.save(f, self.vectors)
+            os.replace(tmp_path, self._vectors_path)
+            tmp_path = self._documents_path + ".tmp"
+            with open(tmp_path, "w") as f:
+                json.dump({"ids": self._ids, "texts": self._texts, "metadatas": self._metadatas}, f)
+            os.replace(tmp_path, self._documents_path)
+            self._unsaved = False
+
+    def load(self):
+        """
+        Loads the collection from the persist directory, the vectors are memory-mapped
+        and only copied into memory when documents are added.
+        """
+        with self._lock:
+            with open(self._documents_path, "r") as f:
+                documents = json.load(f)
+            self._matrix = np.load(self._vectors_path, mmap_mode="r")
+            self._size = len(documents["ids"])
+            self._ids, self._texts, self._metadatas = documents["ids"], documents["texts"], documents["metadatas"]
+            self._unsaved = False
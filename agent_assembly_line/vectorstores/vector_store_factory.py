@@ -0,0 +1,46 @@
+"""
+Agent-Assembly-Line
+"""
+
+from typing import Callable, Optional
+
+from langchain_core.embeddings import Embeddings
+from langchain_core.vectorstores import VectorStore
+
+def _create_chroma(collection: str, embeddings: Embeddings, persist_directory: Optional[str] = None) -> VectorStore:
+    import chromadb
+    from langchain_chroma import Chroma
+    # a fresh settings object per store, Chroma modifies it for persistent clients
+    client_settings = chromadb.config.Settings(anonymized_telemetry=False)
+    return Chroma(collection, embeddings, persist_directory=persist_directory, client_settings=client_settings)
+
+def _create_numpy(collection: str, embeddings: Embeddings, persist_directory: Optional[str] = None) -> VectorStore:
+    from .numpy_store import NumpyVectorStore
+    return NumpyVectorStore.open(collection, embeddings, persist_directory)
+
+# Vector store backends by name, selected with `vector-store` in the agent config.
+# A backend creates an empty or, with a persist directory, the stored collection.
+_BACKENDS: dict[str, Callable[..., VectorStore]] = {
+    "chroma": _create_chroma,
+    "numpy": _create_numpy,
+}
+
+class VectorStoreFactory:
+    @staticmethod
+    def register_backend(name: str, create: Callable[..., VectorStore]):
+        """
+        Registers a vector store backend, create(collection, embeddings, persist_directory=None)
+        returns a langchain VectorStore supporting add_documents(), delete() and
+        similarity_search_by_vector().
+        """
+        _BACKENDS[name] = create
+
+    @staticmethod
+    def backends() -> list[str]:
+        return list(_BACKENDS)
+
+    @staticmethod
+    def create(backend: str, collection: str, embeddings: Embeddings, persist_directory: Optional[str] = None) -> VectorStore:
+        if backend not in _BACKENDS:
+            raise ValueError(f"Unsupported vector store: {backend}. Choose one of {', '.join(_BACKENDS)}.")
+        return _BACKENDS[backend](collection, embeddings, persist_directory)
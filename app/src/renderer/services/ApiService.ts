@@ -47,16 +47,27 @@ export const sendMessage = async (message: Message): Promise<{ answer: string; s
   }
 };
 
+export interface StreamFrame {
+  stage: 'retrieval' | 'generation' | 'done' | 'error';
+  text?: string;
+  elapsed_ms: number;
+  tokens?: number;
+  ttft_ms?: number | null;
+}
+
 export const streamMessage = (message: Message, onMessage: (data: string) => void,  onComplete: () => void, onError: (error: Event) => void): void => {
   const eventSource = new EventSource(`${API_URL}/stream?prompt=${encodeURIComponent(message.text)}`);
 
   eventSource.onmessage = (event) => {
-    if (event.data === '[DONE]') {
+    const frame: StreamFrame = JSON.parse(event.data);
+    if (frame.stage === 'generation' || frame.stage === 'error') {
+      onMessage(frame.text || '');
+    }
+    if (frame.stage === 'done' || frame.stage === 'error') {
       eventSource.close();
       onComplete();
-    } else {
-      onMessage(event.data);
-    }  };
+    }
+  };
 
   eventSource.onerror = (error) => {
     console.error('Error with message stream:', error);
@@ -0,0 +1,25 @@
+"""
+Agent-Assembly-Line
+"""
+
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListLLM
+from agent_assembly_line.agent import Agent
+from agent_assembly_line.config import Config
+
+def create_agent(name="test-agent", template="{global_store} {question}", data=None, responses=None, model=None, embeddings=None, **config) -> Agent:
+    """
+    Returns an agent with a fake model and fake embeddings, answering with responses.
+    The data defaults to one inline sentence. Other config entries are passed with
+    underscores instead of hyphens, e.g. vector_store="numpy" for "vector-store".
+    """
+    agent = Agent(config=Config(config_dict={
+        "name": name,
+        "data": { "inline": "Aethelland is a small country." } if data is None else data,
+        "prompt": { "inline_rag_templates": template },
+        "llm": { "model-identifier": "ollama:gemma2:latest" },
+        **{ key.replace("_", "-"): value for key, value in config.items() },
+    }))
+    agent.model = model or FakeListLLM(responses=responses or ["fake answer"])
+    agent.embeddings = embeddings or DeterministicFakeEmbedding(size=16)
+    return agent
@@ -0,0 +1,90 @@
+"""
+Agent-Assembly-Line
+"""
+
+import asyncio
+import unittest, aiounittest
+from unittest.mock import patch
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from agent_factory import create_agent
+
+def _create_agent():
+    return create_agent("async-test-agent", "{global_store} {session_store} {question}", { "inline": "Aethelland is a small country. " * 100 })
+
+class TestAgentAsync(aiounittest.AsyncTestCase):
+
+    async def test_ado_chain_uses_async_retrieval(self):
+        agent = _create_agent()
+
+        async def aembed_query(self, text):
+            return [0.1] * 16
+
+        with patch.object(DeterministicFakeEmbedding, "aembed_query", autospec=True, side_effect=aembed_query) as mock_aembed, \
+             patch.object(type(agent.agent_vectorstore), "asimilarity_search_by_vector", autospec=True, return_value=[]) as mock_asearch:
+            inputs, _ = await agent.ado_chain("How big is Aethelland?")
+        mock_aembed.assert_called_once()
+        self.assertEqual(mock_asearch.call_count, 2)
+        self.assertEqual(inputs["question"], "How big is Aethelland?")
+
+    async def test_ado_chain_matches_do_chain(self):
+        agent = _create_agent()
+        inputs, _ = agent.do_chain("How big is Aethelland?")
+        ainputs, _ = await agent.ado_chain("How big is Aethelland?")
+        self.assertEqual(inputs["global_store"], ainputs["global_store"])
+        self.assertEqual(inputs["session_store"], ainputs["session_store"])
+
+    async def test_arun_and_stream(self):
+        agent = _create_agent()
+        self.assertEqual(await agent.arun("How big is Aethelland?"), "fake answer")
+        chunks = [chunk async for chunk in agent.stream("How big is Aethelland?")]
+        self.assertEqual("".join(chunks), "fake answer")
+
+    async def test_retrieval_does_not_block_event_loop(self):
+        agent = _create_agent()
+        original = DeterministicFakeEmbedding.embed_query
+
+        def slow_embed_query(self, text):
+            import time
+            time.sleep(0.2)
+            return original(self, text)
+
+        ticks = 0
+        async def ticker():
+            nonlocal ticks
+            while True:
+                await asyncio.sleep(0.01)
+                ticks += 1
+
+        with patch.object(DeterministicFakeEmbedding, "embed_query", slow_embed_query):
+            task = asyncio.ensure_future(ticker())
+            await agent.ado_chain("How big is Aethelland?")
+            task.cancel()
+        self.assertGreater(ticks, 5)
+
+    async def test_loading_data_does_not_block_event_loop(self):
+        agent = _create_agent()
+        original = DeterministicFakeEmbedding.embed_documents
+
+        def slow_embed_documents(self, texts):
+            import time
+            time.sleep(0.2)
+            return original(self, texts)
+
+        gaps = []
+        async def ticker():
+            loop = asyncio.get_running_loop()
+            last = loop.time()
+            while True:
+                await asyncio.sleep(0.01)
+                gaps.append(loop.time() - last)
+                last = loop.time()
+
+        with patch.object(DeterministicFakeEmbedding, "embed_documents", slow_embed_documents):
+            task = asyncio.ensure_future(ticker())
+            self.assertEqual(await agent.arun("How big is Aethelland?"), "fake answer")
+            task.cancel()
+        self.assertGreater(agent.agent_store_size, 0)
+        self.assertLess(max(gaps), 0.1)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,66 @@
+"""
+Agent-Assembly-Line
+"""
+
+import unittest, aiounittest
+from unittest.mock import patch
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from agent_factory import create_agent
+
+def _create_agent(responses):
+    return create_agent("batch-test-agent", data={ "inline": "Aethelland is a small country. " * 100 }, responses=responses)
+
+class TestAgentBatch(aiounittest.AsyncTestCase):
+
+    def test_run_many_embeds_in_one_call(self):
+        agent = _create_agent(["answer"])
+        agent.agent_vectorstore  # the data is embedded when first used
+        with patch.object(DeterministicFakeEmbedding, "embed_documents", autospec=True,
+                          side_effect=lambda self, texts: [[0.1] * 16 for _ in texts]) as mock_embed, \
+             patch.object(DeterministicFakeEmbedding, "embed_query", autospec=True, side_effect=AssertionError("single embedding")):
+            results = agent.run_many(["How big?", "Where?", "How big?"], max_concurrency=2)
+        mock_embed.assert_called_once()
+        self.assertEqual(mock_embed.call_args[0][1], ["How big?", "Where?"])
+        self.assertEqual(results, ["answer", "answer", "answer"])
+
+    def test_run_many_keeps_order_and_item_errors(self):
+        agent = _create_agent(["answer"])
+        results = agent.run_many(["How big?", "", 42, "Where?"])
+        self.assertEqual(results[0], "answer")
+        self.assertEqual(results[1], "")
+        self.assertIsInstance(results[2], TypeError)
+        self.assertEqual(results[3], "answer")
+
+    def test_run_many_llm_error_does_not_abort_batch(self):
+        agent = _create_agent(["answer"])
+        original_chain_inputs = agent._chain_inputs
+
+        def chain_inputs(prompt, agent_docs, user_docs):
+            inputs = original_chain_inputs(prompt, agent_docs, user_docs)
+            if prompt == "broken":
+                del inputs["question"]
+            return inputs
+
+        with patch.object(agent, "_chain_inputs", side_effect=chain_inputs):
+            results = agent.run_many(["How big?", "broken", "Where?"])
+        self.assertEqual(results[0], "answer")
+        self.assertIsInstance(results[1], Exception)
+        self.assertEqual(results[2], "answer")
+
+    def test_run_many_empty(self):
+        agent = _create_agent(["answer"])
+        self.assertEqual(agent.run_many([]), [])
+
+    async def test_abatch(self):
+        agent = _create_agent(["answer"])
+        results = await agent.abatch(["How big?", "", "Where?"], max_concurrency=2)
+        self.assertEqual(results, ["answer", "", "answer"])
+
+    async def test_abatch_skip_rag(self):
+        agent = _create_agent(["answer"])
+        with patch.object(DeterministicFakeEmbedding, "aembed_documents", autospec=True, side_effect=AssertionError("embedding")):
+            results = await agent.abatch(["How big?", "Where?"], skip_rag=True)
+        self.assertEqual(results, ["answer", "answer"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,116 @@
+"""
+Agent-Assembly-Line
+"""
+
+import unittest, aiounittest
+from unittest.mock import patch
+from agent_assembly_line.agent_manager import AgentManager
+from agent_factory import create_agent
+
+class PoolAgent:
+    loaded = []
+
+    def __init__(self, name, debug=False):
+        self.name = name
+        self.events = []
+        PoolAgent.loaded.append(name)
+
+    def warm_up(self):
+        self.events.append("warm_up")
+
+    async def startMemoryAssistant(self):
+        self.events.append("start")
+
+    async def stopMemoryAssistant(self):
+        self.events.append("stop")
+
+    async def aCloseModels(self):
+        self.events.append("close")
+
+class TestAgentPool(aiounittest.AsyncTestCase):
+
+    def setUp(self):
+        PoolAgent.loaded = []
+
+    def test_agents_are_reused(self):
+        manager = AgentManager(agent_class=PoolAgent)
+        first = manager.select_agent("chat-demo")
+        manager.select_agent("aethelland-demo")
+        self.assertIs(manager.select_agent("chat-demo"), first)
+        self.assertIs(manager.get_agent(), first)
+        self.assertEqual(PoolAgent.loaded, ["chat-demo", "aethelland-demo"])
+
+    async def test_least_recently_used_agent_is_evicted(self):
+        manager = AgentManager(max_agents=2, agent_class=PoolAgent)
+        a = manager.select_agent("a")
+        await manager.start_agent(a)
+        manager.select_agent("b")
+        manager.select_agent("a")
+        b_evicted = manager.agents["b"]
+        manager.select_agent("c")
+        self.assertEqual(list(manager.agents), ["a", "c"])
+        await manager.close_evicted()
+        self.assertEqual(b_evicted.events, ["close"])
+        manager.select_agent("d")
+        await manager.close_evicted()
+        self.assertEqual(a.events, ["start", "stop", "close"])
+
+    async def test_reloaded_agent_is_started_again(self):
+        manager = AgentManager(max_agents=1, agent_class=PoolAgent)
+        first = manager.select_agent("a")
+        await manager.start_agent(first)
+        manager.select_agent("b")
+        await manager.close_evicted()
+        reloaded = manager.select_agent("a")
+        await manager.start_agent(reloaded)
+        self.assertIsNot(reloaded, first)
+        self.assertEqual(first.events, ["start", "stop", "close"])
+        self.assertEqual(reloaded.events, ["start"])
+
+    async def test_agent_in_use_is_closed_after_its_release(self):
+        manager = AgentManager(max_agents=1, agent_class=PoolAgent)
+        manager.select_agent("a")
+        in_use = manager.acquire()
+        manager.select_agent("b")
+        await manager.close_evicted()
+        self.assertEqual(in_use.events, [])
+        self.assertEqual(manager.evict_idle(), 1)
+        manager.release(in_use)
+        await manager.close_evicted()
+        self.assertEqual(in_use.events, ["close"])
+        self.assertEqual(manager.evict_idle(), 0)
+
+    async def test_idle_agents_are_evicted(self):
+        manager = AgentManager(idle_ttl=60, agent_class=PoolAgent)
+        with patch("agent_assembly_line.agent_manager.time.monotonic", return_value=0):
+            idle = manager.select_agent("idle")
+            manager.select_agent("current")
+        with patch("agent_assembly_line.agent_manager.time.monotonic", return_value=120):
+            self.assertEqual(manager.evict_idle(), 1)
+        await manager.close_evicted()
+        self.assertEqual(list(manager.agents), ["current"])
+        self.assertEqual(idle.events, ["close"])
+
+    async def test_prewarm(self):
+        manager = AgentManager(agent_class=PoolAgent)
+        manager.select_agent("chat-demo")
+        await manager.prewarm(["aethelland-demo", "chat-demo"])
+        self.assertEqual(PoolAgent.loaded, ["chat-demo", "aethelland-demo"])
+        self.assertEqual(manager.get_agent().name, "chat-demo")
+        await manager.aclose()
+        self.assertEqual(manager.agents, {})
+        self.assertIsNone(manager.current_agent)
+
+    async def test_prewarm_loads_the_data(self):
+        manager = AgentManager(agent_class=lambda name, debug=False: create_agent(name, vector_store="numpy"))
+        await manager.prewarm(["pool-test-agent"])
+        agent = manager.agents["pool-test-agent"]
+        self.assertIsNotNone(agent._agent_vectorstore)
+        self.assertEqual(agent.vectorstore_sizes()["agent"], 1)
+
+    def test_prewarm_names(self):
+        with patch.dict("os.environ", {"AGENT_PREWARM": "chat-demo, aethelland-demo,"}):
+            self.assertEqual(AgentManager.prewarm_names(), ["chat-demo", "aethelland-demo"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,118 @@
+"""
+Agent-Assembly-Line
+"""
+
+import unittest
+import os, tempfile
+from unittest.mock import patch
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from langchain_core.language_models import FakeListLLM
+from agent_assembly_line.agent import Agent
+from agent_assembly_line.config import Config
+from agent_factory import create_agent
+
+RAG_TEMPLATE = """
+Context: {global_store}
+Session: {session_store}
+Question: {question}
+"""
+
+def _create_agent(inline="", responses=None):
+    return create_agent("vectorstore-test-agent", RAG_TEMPLATE, {"inline": inline} if inline else {}, responses)
+
+class TestAgentVectorStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _write_file(self, name, text):
+        with open(os.path.join(self.temp_dir.name, name), "w") as f:
+            f.write(text)
+
+    def test_sizes_without_data(self):
+        agent = _create_agent()
+        self.assertEqual(agent.vectorstore_sizes(), {"agent": 0, "user": 0})
+
+    def test_sizes_after_load_data(self):
+        agent = _create_agent(inline="Aethelland is a small country. " * 100)
+        self.assertEqual(agent.agent_store_size, 0)  # loaded on first use
+        agent.agent_vectorstore
+        self.assertGreater(agent.agent_store_size, 1)
+        self.assertEqual(agent.user_store_size, 0)
+
+    def test_sizes_after_add_file(self):
+        agent = _create_agent()
+        self._write_file("upload.txt", "An uploaded text. " * 200)
+        agent.add_file(self.temp_dir.name, "upload.txt")
+        first = agent.user_store_size
+        self.assertGreater(first, 1)
+
+        self._write_file("upload2.txt", "Another uploaded text.")
+        agent.add_file(self.temp_dir.name, "upload2.txt")
+        self.assertEqual(agent.user_store_size, first + 1)
+
+    def test_do_chain_does_not_fetch_collections(self):
+        agent = _create_agent(inline="Aethelland is a small country. " * 100)
+        with patch.object(type(agent.agent_vectorstore), "get", side_effect=AssertionError("full fetch")):
+            inputs, _ = agent.do_chain("How big is Aethelland?")
+        self.assertGreater(len(inputs["global_store"]), 0)
+
+    def test_prompt_is_embedded_once(self):
+        agent = _create_agent(inline="Aethelland is a small country. " * 100)
+        with patch.object(DeterministicFakeEmbedding, "embed_query", autospec=True, side_effect=lambda self, text: [0.1] * 16) as mock_embed:
+            agent.do_chain("How big is Aethelland?")
+            self.assertEqual(mock_embed.call_count, 1)
+            agent.do_chain("How big is Aethelland?")
+            self.assertEqual(mock_embed.call_count, 1)
+        self.assertEqual(agent.query_embeddings.hits, 1)
+
+    def test_chain_is_built_once(self):
+        agent = _create_agent(inline="Aethelland is a small country. " * 100)
+        _, chain = agent.do_chain("How big is Aethelland?")
+        _, same_chain = agent.do_chain("Where is Aethelland?")
+        self.assertIs(chain, same_chain)
+
+        agent.RAG_TEMPLATE = "{context} {question}"
+        _, new_chain = agent.do_chain("Where is Aethelland?")
+        self.assertIsNot(chain, new_chain)
+
+    def test_chain_batch(self):
+        agent = _create_agent(inline="Aethelland is a small country. " * 100, responses=["one", "two"])
+        inputs = [agent.do_chain(prompt)[0] for prompt in ["How big?", "Where?"]]
+        self.assertEqual(agent._get_chain().batch(inputs), ["one", "two"])
+
+    def test_agent_without_stores_is_lazy(self):
+        with patch("agent_assembly_line.agent.LLMFactory.create_llm_and_embeddings", side_effect=AssertionError("models created")), \
+             patch("agent_assembly_line.agent.Agent.load_data", side_effect=AssertionError("data loaded")):
+            agent = create_agent("lazy-test-agent", "{context} {question}", responses=["small"])
+            agent.embeddings = None  # only the model is given
+            agent.add_inline_text("Aethelland has 3 million inhabitants.")
+            self.assertEqual(agent.run("How big is Aethelland?"), "small")
+            agent.closeModels()
+        self.assertIsNone(agent._embeddings)
+        self.assertIsNone(agent._agent_vectorstore)
+        self.assertIsNone(agent._user_vectorstore)
+
+    def test_models_are_created_on_first_use(self):
+        agent = Agent(config=Config(config_dict={
+            "name": "lazy-test-agent",
+            "prompt": { "inline_rag_templates": "{context} {question}" },
+            "llm": { "model-identifier": "ollama:gemma2:latest" },
+        }))
+        model, embeddings = FakeListLLM(responses=[]), DeterministicFakeEmbedding(size=16)
+        with patch("agent_assembly_line.agent.LLMFactory.create_llm_and_embeddings", return_value=(model, embeddings)) as mock_create:
+            self.assertIsNone(agent._model)
+            self.assertIs(agent.model, model)
+            self.assertIs(agent.embeddings, embeddings)
+            self.assertEqual(mock_create.call_count, 1)
+
+    def test_search_k(self):
+        self.assertEqual(Agent._search_k(0), 1)
+        self.assertEqual(Agent._search_k(3), 3)
+        self.assertEqual(Agent._search_k(50), 10)
+
+if __name__ == '__main__':
+    unittest.main()
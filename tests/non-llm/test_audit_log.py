@@ -0,0 +1,102 @@
+"""
+Agent-Assembly-Line
+"""
+
+import gzip, json, os, tempfile, threading
+import unittest
+from unittest.mock import patch
+from agent_assembly_line.audit_log import AuditLog
+from agent_factory import create_agent
+
+class TestAuditLog(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.temp_dir.name, "audit.jsonl")
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _read(self, path):
+        opener = gzip.open if path.endswith(".gz") else open
+        with opener(path, "rt", encoding="utf-8") as f:
+            return [json.loads(line) for line in f]
+
+    def test_records_are_written(self):
+        log = AuditLog(self.path)
+        for i in range(5):
+            self.assertTrue(log.write({"sequence": i, "prompt": "Grüße"}))
+        log.flush()
+        self.assertEqual([record["sequence"] for record in self._read(self.path)], list(range(5)))
+        self.assertEqual(log.written, 5)
+
+    def test_rotation_with_compression(self):
+        log = AuditLog(self.path, max_bytes=200, backups=2, compress=True)
+        for i in range(20):
+            log.write({"sequence": i, "prompt": "x" * 50})
+        log.flush()
+        self.assertTrue(os.path.exists(self.path + ".1.gz"))
+        self.assertTrue(os.path.exists(self.path + ".2.gz"))
+        self.assertFalse(os.path.exists(self.path + ".3.gz"))
+        self.assertLessEqual(os.path.getsize(self.path), 200)
+        newest = self._read(self.path + ".1.gz") + self._read(self.path)
+        self.assertEqual(newest[-1]["sequence"], 19)
+
+    def _blocked_log(self, **settings):
+        release = threading.Event()
+        log = AuditLog(self.path, **settings)
+        write = log._write
+        log._write = lambda records: (release.wait(5), write(records))
+        return log, release
+
+    def test_drops_when_full(self):
+        log, release = self._blocked_log(queue_size=2)
+        results = [log.write({"sequence": i}) for i in range(10)]
+        self.assertIn(False, results)
+        self.assertGreater(log.dropped, 0)
+        release.set()
+        log.flush()
+        self.assertEqual(log.written + log.dropped, 10)
+
+    def test_samples_when_half_full(self):
+        log, release = self._blocked_log(queue_size=100, overflow="sample", sample_every=5)
+        for i in range(100):
+            log.write({"sequence": i})
+        release.set()
+        log.flush()
+        # the queue stays below full as only every 5th record is kept past half
+        self.assertLess(log.written, 70)
+        self.assertGreater(log.written, 50)
+        self.assertEqual(log.written + log.dropped, 100)
+
+    def test_from_config(self):
+        self.assertIsNone(AuditLog.from_config({}, "agent"))
+        log = AuditLog.from_config({"directory": self.temp_dir.name, "compress": True}, "agent")
+        self.assertIs(log, AuditLog.from_config({"directory": self.temp_dir.name}, "agent"))
+        self.assertTrue(log.compress)
+        with self.assertRaises(ValueError):
+            AuditLog(self.path, overflow="block")
+
+class TestAgentAuditLog(unittest.TestCase):
+
+    def test_prompts_are_audited(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            agent = create_agent("audit-test-agent", "{context} {question}", audit_log={ "directory": temp_dir })
+            opened_by = []
+            real_open = open
+            def tracking_open(file, *args, **kwargs):
+                opened_by.append((str(file), threading.current_thread()))
+                return real_open(file, *args, **kwargs)
+            with patch("builtins.open", side_effect=tracking_open):
+                agent.run("Where is Aethelland?")
+                agent.audit_log.flush()
+            # the file is only written by the worker
+            self.assertFalse(any("audit" in file and thread is threading.current_thread() for file, thread in opened_by))
+            with open(os.path.join(temp_dir, "audit_audit-test-agent.jsonl"), encoding="utf-8") as f:
+                records = [json.loads(line) for line in f]
+            self.assertEqual(len(records), 1)
+            self.assertIn("Where is Aethelland?", records[0]["prompt"])
+            self.assertEqual(records[0]["agent"], "audit-test-agent")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,114 @@
+"""
+Agent-Assembly-Line
+"""
+
+import os, tempfile
+import unittest, aiounittest
+from unittest.mock import patch
+from langchain_core.documents import Document
+from agent_assembly_line.agent import Agent
+from agent_assembly_line.retrieval import BM25Index, reciprocal_rank_fusion
+from agent_assembly_line.retrieval.bm25 import tokenize
+from agent_factory import create_agent
+
+def _docs(*texts):
+    return [Document(page_content=text) for text in texts]
+
+FILLER = [f"Weather report number {i} for the northern region, cloudy with some rain." for i in range(30)]
+
+class TestBM25Index(unittest.TestCase):
+
+    def test_tokenize(self):
+        self.assertEqual(tokenize("Order XK-4711, parse_diff()!"), ["order", "xk", "4711", "parse_diff"])
+
+    def test_exact_terms_rank_first(self):
+        index = BM25Index(_docs(*FILLER, "The forecast for Sodankylä: snow."))
+        results = index.search("weather in Sodankylä", k=3)
+        self.assertEqual(results[0][0].page_content, "The forecast for Sodankylä: snow.")
+        self.assertEqual(index.search("unknown terms", k=3), [])
+
+    def test_rare_terms_weigh_more(self):
+        index = BM25Index(_docs("rain rain rain", "rain snow", "sun"))
+        self.assertEqual(index.search("rain snow", k=1)[0][0].page_content, "rain snow")
+
+    def test_incremental_add(self):
+        index = BM25Index(_docs(*FILLER))
+        self.assertEqual(index.search("XK-4711", k=1), [])
+        index.add_documents(_docs("Product XK-4711 is a router."))
+        self.assertEqual(len(index), 31)
+        self.assertEqual(index.search("XK-4711", k=1)[0][0].page_content, "Product XK-4711 is a router.")
+
+    def test_save_and_load(self):
+        index = BM25Index([Document(page_content="Product XK-4711", metadata={"source": "catalog"}), *_docs(*FILLER)])
+        with tempfile.TemporaryDirectory() as temp_dir:
+            path = os.path.join(temp_dir, "bm25.json")
+            index.save(path, key="key")
+            self.assertIsNone(BM25Index.load(path, key="other key"))
+            loaded = BM25Index.load(path, key="key")
+            self.assertEqual(loaded.search("xk 4711 report", k=5), index.search("xk 4711 report", k=5))
+            self.assertEqual(loaded.documents[0].metadata, {"source": "catalog"})
+
+    def test_reciprocal_rank_fusion(self):
+        a, b, c = _docs("a", "b", "c")
+        self.assertEqual(reciprocal_rank_fusion([[a, b, c], [b]], k=2), [b, a])
+        self.assertEqual(reciprocal_rank_fusion([[a, b], []], k=5), [a, b])
+
+class TestAgentHybridSearch(aiounittest.AsyncTestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_file = os.path.join(self.temp_dir.name, "data.txt")
+        with open(self.data_file, "w") as f:
+            f.write("\n\n".join(FILLER + ["Product XK-4711 is a router."]))
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _create_agent(self, hybrid_search=True, persist_index=False):
+        agent = create_agent("hybrid-test-agent", "{global_store} {session_store} {question}", { "file": self.data_file },
+                             vector_store="numpy", hybrid_search=hybrid_search, persist_index=persist_index)
+        agent.chunk_size = 100
+        agent.chunk_overlap = 0
+        return agent
+
+    def test_identifier_is_retrieved(self):
+        agent = self._create_agent()
+        agent.agent_vectorstore
+        self.assertGreater(agent.agent_store_size, 10)
+        self.assertEqual(len(agent.agent_lexical_index), agent.agent_store_size)
+        inputs, _ = agent.do_chain("What is XK-4711?")
+        self.assertIn("XK-4711", inputs["global_store"])
+
+    async def test_identifier_is_retrieved_async(self):
+        agent = self._create_agent()
+        inputs, _ = await agent.ado_chain("What is XK-4711?")
+        self.assertIn("XK-4711", inputs["global_store"])
+
+    def test_disabled_by_default(self):
+        agent = self._create_agent(hybrid_search={})
+        agent.agent_vectorstore
+        self.assertIsNone(agent.agent_lexical_index)
+
+    def test_user_index_is_updated(self):
+        agent = self._create_agent()
+        upload = os.path.join(self.temp_dir.name, "upload.txt")
+        with open(upload, "w") as f:
+            f.write("\n\n".join(FILLER + ["Invoice INV-0815 is overdue."]))
+        agent.add_file(self.temp_dir.name, "upload.txt")
+        self.assertEqual(len(agent.user_lexical_index), agent.user_store_size)
+        inputs, _ = agent.do_chain("What about INV-0815?")
+        self.assertIn("INV-0815", inputs["session_store"])
+
+    def test_persisted_with_the_index(self):
+        with patch.dict(os.environ, {"USER_INDEX_PATH": os.path.join(self.temp_dir.name, "index")}):
+            first = self._create_agent(persist_index=True)
+            first.agent_vectorstore
+            self.assertTrue(os.path.exists(os.path.join(first.config.index_path, "bm25.json")))
+            with patch.object(Agent, "_text_splitter", side_effect=AssertionError("split again")):
+                second = self._create_agent(persist_index=True)
+                inputs, _ = second.do_chain("What is XK-4711?")
+            self.assertEqual(len(second.agent_lexical_index), len(first.agent_lexical_index))
+            self.assertIn("XK-4711", inputs["global_store"])
+
+if __name__ == '__main__':
+    unittest.main()
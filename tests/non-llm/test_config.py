@@ -126,5 +126,12 @@ class TestConfig(unittest.TestCase):
         self.assertIsNone(config.name)
         self.assertIsNone(config.description)
 
+    def test_index_path_per_agent(self):
+        with patch.dict(os.environ, {'USER_INDEX_PATH': self.test_dir.name}):
+            first = Config(config_dict={"name": "first", "prompt": {}, "llm": {"model-identifier": "ollama:test_model"}})
+            second = Config(config_dict={"name": "second", "prompt": {}, "llm": {"model-identifier": "ollama:test_model"}})
+            self.assertEqual(first.index_path, os.path.join(self.test_dir.name, "first", "index"))
+            self.assertNotEqual(first.index_path, second.index_path)
+
 if __name__ == '__main__':
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,79 @@
+"""
+Agent-Assembly-Line
+"""
+
+import unittest
+from langchain_core.documents import Document
+from agent_assembly_line.retrieval.context_packer import ContextPacker, estimate_tokens
+from agent_factory import create_agent
+
+TEMPLATE = "{global_store} {session_store} {context} {history} {question}"
+
+def _docs(*texts):
+    return [Document(page_content=text) for text in texts]
+
+class TestContextPacker(unittest.TestCase):
+
+    def test_everything_fits(self):
+        packer = ContextPacker(1000)
+        sections, report = packer.pack(TEMPLATE, "question", _docs("a" * 40, "b" * 40), _docs("c" * 40), "context", "history")
+        self.assertEqual(sections["global_store"], "a" * 40 + "\n\n" + "b" * 40)
+        self.assertEqual(sections["session_store"], "c" * 40)
+        self.assertEqual(sections["context"], "context")
+        self.assertEqual(sections["history"], "history")
+        self.assertEqual(report["dropped_chunks"], {"global_store": 0, "session_store": 0})
+
+    def test_drops_lowest_ranked_chunks(self):
+        packer = ContextPacker(100, {"global_store": 1.0, "session_store": 0, "context": 0, "history": 0})
+        chunks = _docs("first " * 20, "second " * 20, "third " * 20)
+        sections, report = packer.pack(TEMPLATE, "question", chunks, [], "", "")
+        self.assertIn("first", sections["global_store"])
+        self.assertNotIn("third", sections["global_store"])
+        self.assertGreater(report["dropped_chunks"]["global_store"], 0)
+        self.assertLessEqual(sum(report["used"].values()) + report["reserved"], 100)
+
+    def test_truncates_context_and_history(self):
+        packer = ContextPacker(60, {"global_store": 0, "session_store": 0, "context": 0.5, "history": 0.5})
+        context = "start of context " + "x" * 400
+        history = "y" * 400 + " latest message"
+        sections, report = packer.pack(TEMPLATE, "question", [], [], context, history)
+        self.assertTrue(sections["context"].startswith("start of context"))
+        self.assertTrue(sections["history"].endswith("latest message"))
+        self.assertGreater(report["truncated_chars"]["context"], 0)
+        self.assertGreater(report["truncated_chars"]["history"], 0)
+
+    def test_unused_share_is_redistributed(self):
+        packer = ContextPacker(100)
+        allocation = packer.allocate(100, {"global_store": 500, "session_store": 0, "context": 10, "history": 0})
+        self.assertEqual(allocation["context"], 10)
+        self.assertEqual(allocation["global_store"], 90)
+        self.assertEqual(allocation["session_store"], 0)
+
+    def test_sections_not_in_template_get_no_budget(self):
+        packer = ContextPacker(1000)
+        sections, report = packer.pack("{global_store} {question}", "question", _docs("a"), [], "context", "history")
+        self.assertEqual(report["allocated"]["context"], 0)
+        self.assertEqual(sections["context"], "")
+
+    def test_from_config(self):
+        self.assertIsNone(ContextPacker.from_config({}))
+        packer = ContextPacker.from_config({"tokens": 2000, "history": 0.2})
+        self.assertEqual(packer.max_tokens, 2000)
+        self.assertEqual(packer.shares["history"], 0.2)
+        with self.assertRaises(ValueError):
+            ContextPacker.from_config({"tokens": 2000, "unknown": 0.2})
+
+    def test_estimate_tokens(self):
+        self.assertEqual(estimate_tokens(""), 0)
+        self.assertEqual(estimate_tokens("abcd"), 1)
+        self.assertEqual(estimate_tokens("abcde"), 2)
+
+    def test_agent_reports_packing_in_stats(self):
+        agent = create_agent("packing-test-agent", data={ "inline": "Aethelland is a small country. " * 200 }, context_budget={ "tokens": 400 })
+        inputs, _ = agent.do_chain("How big is Aethelland?")
+        report = agent.stats["context_packing"]
+        self.assertGreater(report["dropped_chunks"]["global_store"], 0)
+        self.assertLessEqual(estimate_tokens(inputs["global_store"]), 400)
+
+if __name__ == '__main__':
+    unittest.main()
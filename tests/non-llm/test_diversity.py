@@ -0,0 +1,102 @@
+"""
+Agent-Assembly-Line
+"""
+
+import unittest, aiounittest
+from unittest.mock import patch
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from agent_assembly_line.retrieval import RetrievalDiversifier
+from agent_assembly_line.retrieval.diversity import mmr_order, shingles, jaccard
+from agent_factory import create_agent
+
+PASSAGE = "Aethelland is a small country in the mountains with three million inhabitants and a long history."
+
+def _docs(*texts):
+    return [Document(page_content=text) for text in texts]
+
+class TestRetrievalDiversifier(unittest.TestCase):
+
+    def test_near_duplicates_across_stores(self):
+        diversifier = RetrievalDiversifier(threshold=0.8)
+        agent_docs = _docs(PASSAGE, "The capital of Aethelland is Eldoria.", PASSAGE + " ")
+        user_docs = _docs(PASSAGE + " Indeed.", "Bananas are yellow.")
+        (agent_docs, user_docs), removed = diversifier.deduplicate(agent_docs, user_docs)
+        self.assertEqual([doc.page_content for doc in agent_docs], [PASSAGE, "The capital of Aethelland is Eldoria."])
+        self.assertEqual([doc.page_content for doc in user_docs], ["Bananas are yellow."])
+        self.assertEqual(removed, 2)
+
+    def test_distinct_chunks_are_kept(self):
+        (docs,), removed = RetrievalDiversifier().deduplicate(_docs("one two three four", "five six seven eight"))
+        self.assertEqual(len(docs), 2)
+        self.assertEqual(removed, 0)
+
+    def test_jaccard(self):
+        self.assertEqual(jaccard(shingles("a b c d"), shingles("A b, c d!")), 1.0)
+        self.assertEqual(jaccard(shingles("a b c"), shingles("x y z")), 0.0)
+
+    def test_mmr_prefers_diverse_documents(self):
+        query = [1.0, 0.0, 0.0]
+        embeddings = [[0.9, 0.1, 0.0], [0.9, 0.11, 0.0], [0.7, 0.0, 0.7]]
+        self.assertEqual(mmr_order(query, embeddings, lambda_mult=1.0), [0, 1, 2])
+        self.assertEqual(mmr_order(query, embeddings, lambda_mult=0.5), [0, 2, 1])
+        self.assertEqual(mmr_order(query, embeddings, lambda_mult=0.5, k=2), [0, 2])
+        self.assertEqual(mmr_order(query, embeddings, lambda_mult=0.5, selected=[[0.9, 0.1, 0.0]]), [2, 0, 1])
+
+    def test_rerank_across_lists(self):
+        diversifier = RetrievalDiversifier(mmr=True, lambda_mult=0.3, mmr_k=1)
+        a, b, c = _docs("a", "b", "c")
+        agent_docs, user_docs = diversifier.rerank([1.0, 0.0], [[a], [b, c]], [[[1.0, 0.0]], [[0.99, 0.01], [0.6, 0.8]]])
+        self.assertEqual(agent_docs, [a])
+        self.assertEqual(user_docs, [c])
+
+    def test_from_config(self):
+        self.assertIsNone(RetrievalDiversifier.from_config({}))
+        diversifier = RetrievalDiversifier.from_config({"mmr": True, "mmr-lambda": 0.7})
+        self.assertTrue(diversifier.mmr)
+        self.assertEqual(diversifier.lambda_mult, 0.7)
+        with self.assertRaises(ValueError):
+            RetrievalDiversifier.from_config({"near-duplicate-threshold": 0})
+
+class TestAgentDiversity(aiounittest.AsyncTestCase):
+
+    def _create_agent(self, diversity):
+        agent = create_agent("diversity-test-agent", "{global_store} {session_store} {question}", { "inline": "\n\n".join([PASSAGE] * 20) },
+                             vector_store="numpy", diversity=diversity)
+        agent.chunk_size = 120
+        agent.chunk_overlap = 0
+        return agent
+
+    def test_duplicates_are_removed(self):
+        agent = self._create_agent({})
+        inputs, _ = agent.do_chain("How big is Aethelland?")
+        self.assertGreater(inputs["global_store"].count(PASSAGE), 1)
+
+        agent = self._create_agent({"mmr": True})
+        inputs, _ = agent.do_chain("How big is Aethelland?")
+        self.assertEqual(inputs["global_store"].count(PASSAGE), 1)
+        self.assertGreater(agent.stats["duplicates_removed"], 0)
+
+    def test_mmr_uses_the_stored_vectors(self):
+        for vector_store in ["numpy", "chroma"]:
+            agent = self._create_agent({"mmr": True})
+            agent.config.vector_store = vector_store
+            agent.agent_vectorstore  # embeds the chunks
+            with patch.object(DeterministicFakeEmbedding, "embed_documents", side_effect=AssertionError("embedded again")):
+                inputs, _ = agent.do_chain("How big is Aethelland?")
+            self.assertEqual(inputs["global_store"].count(PASSAGE), 1)
+
+    async def test_mmr_uses_the_stored_vectors_async(self):
+        agent = self._create_agent({"mmr": True})
+        agent.agent_vectorstore
+        with patch.object(DeterministicFakeEmbedding, "aembed_documents", side_effect=AssertionError("embedded again")):
+            inputs, _ = await agent.ado_chain("How big is Aethelland?")
+        self.assertEqual(inputs["global_store"].count(PASSAGE), 1)
+
+    async def test_duplicates_are_removed_async(self):
+        agent = self._create_agent({"near-duplicate-threshold": 0.9})
+        inputs, _ = await agent.ado_chain("How big is Aethelland?")
+        self.assertEqual(inputs["global_store"].count(PASSAGE), 1)
+
+if __name__ == '__main__':
+    unittest.main()
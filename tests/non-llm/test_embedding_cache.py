@@ -0,0 +1,115 @@
+"""
+Agent-Assembly-Line
+"""
+
+import unittest
+import asyncio, os, tempfile, threading
+from unittest.mock import patch
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from agent_assembly_line.config import Config
+from agent_assembly_line.embedding_cache import EmbeddingCache, CachedEmbeddings
+from agent_assembly_line.llm_factory import LLMFactory
+
+class TestEmbeddingCache(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.cache = EmbeddingCache(os.path.join(self.temp_dir.name, "embeddings.sqlite3"))
+
+    def tearDown(self):
+        self.cache.close()
+        self.temp_dir.cleanup()
+
+    def test_get_many_and_put_many(self):
+        self.assertEqual(self.cache.get_many("model", ["a", "b"]), [None, None])
+        self.cache.put_many("model", ["a"], [[0.5, 0.25]])
+        self.assertEqual(self.cache.get_many("model", ["a", "b"]), [[0.5, 0.25], None])
+        self.assertEqual(self.cache.get_many("other-model", ["a"]), [None])
+        self.assertEqual(self.cache.stats()["hits"], 1)
+        self.assertEqual(self.cache.stats()["misses"], 4)
+
+    def test_persisted_on_disk(self):
+        self.cache.put_many("model", ["a"], [[0.5, 0.25]])
+        reopened = EmbeddingCache(self.cache.path)
+        self.assertEqual(reopened.get_many("model", ["a"]), [[0.5, 0.25]])
+        self.assertEqual(len(reopened), 1)
+        reopened.close()
+
+    def test_evicts_least_recently_used(self):
+        cache = EmbeddingCache(":memory:", max_entries=10)
+        for i in range(10):
+            cache.put_many("model", [f"text {i}"], [[float(i)]])
+        cache.get_many("model", ["text 0"])
+        cache.put_many("model", ["text 10"], [[10.0]])
+        self.assertEqual(len(cache), 9)
+        self.assertEqual(cache.get_many("model", ["text 0"]), [[0.0]])
+        self.assertEqual(cache.get_many("model", ["text 1"]), [None])
+        cache.close()
+
+    def test_lookups_do_not_write(self):
+        self.cache.put_many("model", ["a"], [[0.5, 0.25]])
+        changes = self.cache._db.total_changes
+        for _ in range(10):
+            self.cache.get_many("model", ["a", "b"])
+        self.assertEqual(self.cache._db.total_changes, changes)
+        self.cache._flush_size = 1
+        self.cache.get_many("model", ["a"])
+        self.assertEqual(self.cache._db.total_changes, changes + 1)
+
+    def test_cached_embeddings_only_embeds_missing_texts(self):
+        embeddings = DeterministicFakeEmbedding(size=8)
+        cached = CachedEmbeddings(embeddings, "fake", self.cache)
+        with patch.object(DeterministicFakeEmbedding, "embed_documents", autospec=True,
+                          side_effect=lambda self, texts: [[float(len(t))] * 8 for t in texts]) as mock_embed:
+            first = cached.embed_documents(["one", "three"])
+            second = cached.embed_documents(["one", "three", "seven"])
+            self.assertEqual(mock_embed.call_count, 2)
+            self.assertEqual(mock_embed.call_args[0][1], ["seven"])
+        self.assertEqual(second[:2], first)
+        self.assertEqual(second[2], [5.0] * 8)
+
+    def test_size_counts_replaced_entries_once(self):
+        self.cache.put_many("model", ["a", "b"], [[0.5], [0.25]])
+        self.cache.put_many("model", ["a", "c", "c"], [[0.5], [0.75], [0.75]])
+        self.assertEqual(len(self.cache), 3)
+        reopened = EmbeddingCache(self.cache.path)
+        self.assertEqual(len(reopened), 3)
+        reopened.close()
+
+    def test_async_lookups_run_in_a_worker_thread(self):
+        cached = CachedEmbeddings(DeterministicFakeEmbedding(size=8), "fake", self.cache)
+        threads = []
+        get_many, put_many = self.cache.get_many, self.cache.put_many
+        def tracking(method):
+            def call(*args):
+                threads.append(threading.current_thread())
+                return method(*args)
+            return call
+        with patch.object(self.cache, "get_many", tracking(get_many)), patch.object(self.cache, "put_many", tracking(put_many)):
+            vector = asyncio.run(cached.aembed_query("hello"))
+            self.assertEqual(asyncio.run(cached.aembed_documents(["hello", "world"]))[0], vector)
+        self.assertEqual(len(threads), 4)
+        self.assertNotIn(threading.main_thread(), threads)
+
+    def test_cached_embeddings_query(self):
+        embeddings = DeterministicFakeEmbedding(size=8)
+        cached = CachedEmbeddings(embeddings, "fake", self.cache)
+        vector = cached.embed_query("hello")
+        self.assertEqual(cached.embed_query("hello"), vector)
+        self.assertEqual(self.cache.hits, 1)
+        self.assertEqual(cached.size, 8)  # delegated to the wrapped embeddings
+
+    def test_llm_factory_wraps_embeddings(self):
+        config = Config(config_dict={
+            "name": "cache-test-agent",
+            "prompt": {},
+            "llm": { "model-identifier": "ollama:gemma2:latest" },
+            "embedding-cache": True,
+        })
+        with patch("agent_assembly_line.embedding_cache.get_embedding_cache", return_value=self.cache):
+            llm, embeddings = LLMFactory.create_llm_and_embeddings(config)
+        self.assertIsInstance(embeddings, CachedEmbeddings)
+        self.assertEqual(embeddings.model, "nomic-embed-text")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,61 @@
+"""
+Agent-Assembly-Line
+"""
+
+import json
+import os
+import subprocess
+import sys
+import unittest
+
+# Cold import budgets in seconds, generous to not fail on slow machines
+PACKAGE_IMPORT_BUDGET = float(os.getenv("PACKAGE_IMPORT_BUDGET", "0.5"))
+AGENT_IMPORT_BUDGET = float(os.getenv("AGENT_IMPORT_BUDGET", "3.0"))
+
+HEAVY_MODULES = ["chromadb", "langchain_chroma", "atproto", "selenium", "pytesseract", "webdriver_manager", "readability"]
+
+def _cold_import(statement, modules=HEAVY_MODULES):
+    """
+    Runs the import statement in a fresh interpreter, returns the import time
+    and the heavy modules that got imported.
+    """
+    code = (
+        "import json, sys, time\n"
+        "start = time.perf_counter()\n"
+        f"{statement}\n"
+        "elapsed = time.perf_counter() - start\n"
+        f"print(json.dumps([elapsed, [m for m in {modules!r} if m in sys.modules]]))\n"
+    )
+    output = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True).stdout
+    elapsed, heavy_modules = json.loads(output.strip().splitlines()[-1])
+    return elapsed, heavy_modules
+
+class TestImportTime(unittest.TestCase):
+
+    def test_package_import(self):
+        elapsed, heavy_modules = _cold_import("import agent_assembly_line")
+        self.assertEqual(heavy_modules, [])
+        self.assertLess(elapsed, PACKAGE_IMPORT_BUDGET)
+
+    def test_agent_import(self):
+        elapsed, heavy_modules = _cold_import("from agent_assembly_line import Agent")
+        self.assertEqual(heavy_modules, [])
+        self.assertLess(elapsed, AGENT_IMPORT_BUDGET)
+
+    def test_micros_import(self):
+        _, heavy_modules = _cold_import("from agent_assembly_line.micros import OneWordAgent")
+        self.assertEqual(heavy_modules, [])
+
+    def test_text_splitter_import(self):
+        _, heavy_modules = _cold_import("from agent_assembly_line.utils.text_splitter import TextSplitter", HEAVY_MODULES + ["numpy"])
+        self.assertEqual(heavy_modules, [])
+
+    def test_loader_is_imported_on_request(self):
+        _, heavy_modules = _cold_import(
+            "from agent_assembly_line.data_loaders.data_loader_factory import DataLoaderFactory\n"
+            "DataLoaderFactory.get_loader_class('bluesky')"
+        )
+        self.assertEqual(heavy_modules, ["atproto"])
+
+if __name__ == '__main__':
+    unittest.main()
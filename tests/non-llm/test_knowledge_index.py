@@ -0,0 +1,115 @@
+"""
+Agent-Assembly-Line
+"""
+
+import unittest
+import os, tempfile
+from unittest.mock import patch
+from langchain_core.documents import Document
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from agent_assembly_line.knowledge_index import KnowledgeIndex
+from agent_factory import create_agent
+
+class TestKnowledgeIndex(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_file = os.path.join(self.temp_dir.name, "data.txt")
+        self._write_data("Aethelland is a small country in the mountains. " * 100)
+        self.env_patcher = patch.dict(os.environ, {
+            'USER_INDEX_PATH': os.path.join(self.temp_dir.name, "index"),
+        })
+        self.env_patcher.start()
+
+    def tearDown(self):
+        self.env_patcher.stop()
+        self.temp_dir.cleanup()
+
+    def _write_data(self, text):
+        with open(self.data_file, "w") as f:
+            f.write(text)
+
+    def _create_agent(self, embeddings):
+        agent = create_agent("index-test-agent", data={ "file": self.data_file }, embeddings=embeddings, persist_index=True)
+        agent.agent_vectorstore  # loads the index
+        return agent
+
+    def test_index_is_reused_across_agents(self):
+        embeddings = DeterministicFakeEmbedding(size=16)
+        with patch.object(DeterministicFakeEmbedding, "embed_documents", autospec=True,
+                          side_effect=lambda self, texts: [[0.1] * 16 for _ in texts]) as mock_embed:
+            first = self._create_agent(embeddings)
+            self.assertEqual(mock_embed.call_count, 1)
+            second = self._create_agent(embeddings)
+            self.assertEqual(mock_embed.call_count, 1)
+
+        self.assertGreater(first.agent_store_size, 1)
+        self.assertEqual(first.agent_store_size, second.agent_store_size)
+        inputs, _ = second.do_chain("Where is Aethelland?")
+        self.assertGreater(len(inputs["global_store"]), 0)
+
+    def test_index_is_rebuilt_when_source_changes(self):
+        embeddings = DeterministicFakeEmbedding(size=16)
+        first = self._create_agent(embeddings)
+        self._write_data("Aethelland has a population of three million people.")
+        second = self._create_agent(embeddings)
+        self.assertEqual(second.agent_store_size, 1)
+        self.assertNotEqual(first.agent_store_size, second.agent_store_size)
+
+    def _assert_incremental_update(self, vector_store):
+        embeddings = DeterministicFakeEmbedding(size=16)
+        index = KnowledgeIndex(os.path.join(self.temp_dir.name, vector_store), embeddings, "nomic-embed-text", 1000, 100, vector_store)
+        docs = [Document(page_content=f"Chapter {i} of the reference.", metadata={"source": "reference"}) for i in range(10)]
+        store, counts = index.update("first", docs)
+        self.assertEqual(counts, {"added": 10, "removed": 0, "unchanged": 0})
+
+        changed = docs[:4] + docs[5:] + [Document(page_content="A new chapter.", metadata={"source": "reference"})] * 2
+        with patch.object(DeterministicFakeEmbedding, "embed_documents", autospec=True,
+                          side_effect=lambda self, texts: [[0.1] * 16 for _ in texts]) as mock_embed:
+            store, counts = index.update("second", changed)
+        self.assertEqual(counts, {"added": 2, "removed": 1, "unchanged": 9})
+        self.assertEqual(sum(len(call.args[1]) for call in mock_embed.call_args_list), 2)
+        self.assertEqual(index.size, 11)
+        self.assertIsNotNone(index.load("second"))
+        ids = KnowledgeIndex.chunk_ids(changed)
+        self.assertEqual(len(store.get_by_ids(ids)), 11)
+        self.assertEqual(store.get_by_ids(KnowledgeIndex.chunk_ids(docs[4:5])), [])
+
+    def test_incremental_update(self):
+        self._assert_incremental_update("chroma")
+
+    def test_incremental_update_numpy(self):
+        self._assert_incremental_update("numpy")
+
+    def test_settings_change_rebuilds(self):
+        embeddings = DeterministicFakeEmbedding(size=16)
+        docs = [Document(page_content=f"Chapter {i}.") for i in range(3)]
+        KnowledgeIndex(self.temp_dir.name, embeddings, "nomic-embed-text", 1000, 100, "numpy").update("key", docs)
+        _, counts = KnowledgeIndex(self.temp_dir.name, embeddings, "other-embeddings", 1000, 100, "numpy").update("key", docs)
+        self.assertEqual(counts, {"added": 3, "removed": 3, "unchanged": 0})
+
+    def test_agent_reports_update(self):
+        embeddings = DeterministicFakeEmbedding(size=16)
+        paragraphs = [f"Paragraph {i} about Aethelland and its mountains." for i in range(50)]
+        self._write_data("\n\n".join(paragraphs))
+        first = self._create_agent(embeddings)
+        self.assertGreater(first.agent_store_size, 2)
+        self.assertEqual(first.stats["index_update"]["added"], first.agent_store_size)
+        paragraphs[3] = "Paragraph 3 about Aethelland and its monasteries."
+        self._write_data("\n\n".join(paragraphs))
+        second = self._create_agent(embeddings)
+        self.assertEqual(second.stats["index_update"], {"added": 1, "removed": 1, "unchanged": first.agent_store_size - 1})
+        self.assertEqual(second.agent_store_size, first.agent_store_size)
+
+    def test_key_depends_on_settings(self):
+        embeddings = DeterministicFakeEmbedding(size=16)
+        index = KnowledgeIndex(self.temp_dir.name, embeddings, "nomic-embed-text", 1000, 100)
+        other_splitter = KnowledgeIndex(self.temp_dir.name, embeddings, "nomic-embed-text", 500, 100)
+        other_model = KnowledgeIndex(self.temp_dir.name, embeddings, "other-embeddings", 1000, 100)
+        key = index.key_for_file(self.data_file)
+        self.assertEqual(key, index.key_for_file(self.data_file))
+        self.assertNotEqual(key, other_splitter.key_for_file(self.data_file))
+        self.assertNotEqual(key, other_model.key_for_file(self.data_file))
+
+if __name__ == '__main__':
+    unittest.main()
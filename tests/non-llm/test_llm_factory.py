@@ -0,0 +1,81 @@
+"""
+Agent-Assembly-Line
+"""
+
+import asyncio
+import unittest, aiounittest
+from agent_assembly_line.agent import Agent
+from agent_assembly_line.config import Config
+from agent_assembly_line.llm_factory import LLMFactory, ClientRegistry
+
+def _config(timeout=120, embeddings="nomic-embed-text"):
+    return Config(config_dict={
+        "name": "factory-test-agent",
+        "prompt": { "inline_rag_templates": "{context} {question}" },
+        "llm": { "model-identifier": "ollama:gemma2:latest", "custom-embeddings": embeddings },
+        "timeout": timeout,
+    })
+
+class TestClientRegistry(unittest.TestCase):
+
+    def test_acquire_and_release(self):
+        registry = ClientRegistry()
+        client = registry.acquire("key", object)
+        self.assertIs(registry.acquire("key", object), client)
+        self.assertEqual(registry.references(client), 2)
+        self.assertFalse(registry.release(client))
+        self.assertTrue(registry.release(client))
+        self.assertEqual(len(registry), 0)
+        self.assertIsNot(registry.acquire("key", object), client)
+
+    def test_unknown_client_is_owned_by_caller(self):
+        self.assertTrue(ClientRegistry().release(object()))
+
+class TestLLMFactoryClients(aiounittest.AsyncTestCase):
+
+    def test_clients_are_shared(self):
+        llm, embeddings = LLMFactory.create_llm_and_embeddings(_config())
+        other_llm, other_embeddings = LLMFactory.create_llm_and_embeddings(_config())
+        self.assertIs(llm, other_llm)
+        self.assertIs(embeddings, other_embeddings)
+
+        slow_llm, slow_embeddings = LLMFactory.create_llm_and_embeddings(_config(timeout=300))
+        self.assertIsNot(llm, slow_llm)
+        self.assertIs(embeddings, slow_embeddings)
+
+        for client in (llm, embeddings, other_llm, other_embeddings, slow_llm, slow_embeddings):
+            LLMFactory.release(client)
+
+    async def test_event_loops_get_their_own_clients(self):
+        config = _config(timeout=4712, embeddings="embeddings-4712")
+        llm, embeddings = LLMFactory.create_llm_and_embeddings(config)
+
+        async def on_other_loop():
+            return LLMFactory.create_llm_and_embeddings(config)
+
+        other_llm, other_embeddings = await asyncio.to_thread(asyncio.run, on_other_loop())
+        self.assertIsNot(llm, other_llm)
+        self.assertIsNot(embeddings, other_embeddings)
+        same_llm, same_embeddings = LLMFactory.create_llm_and_embeddings(config)
+        self.assertIs(llm, same_llm)
+
+        for client in (llm, embeddings, other_llm, other_embeddings, same_llm, same_embeddings):
+            LLMFactory.release(client)
+
+    async def test_close_models_keeps_shared_clients_open(self):
+        config = _config(timeout=4711, embeddings="embeddings-4711")  # keys no other test uses
+        first = Agent(config=config)
+        second = Agent(config=config)
+        self.assertIs(first.model, second.model)
+
+        await first.aCloseModels()
+        self.assertFalse(second.model._client._client.is_closed)
+        first.closeModels()  # releasing twice must not steal the reference of the second agent
+        self.assertFalse(second.model._client._client.is_closed)
+
+        await second.aCloseModels()
+        self.assertTrue(second.model._client._client.is_closed)
+        self.assertTrue(second.embeddings._client._client.is_closed)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,44 @@
+"""
+Agent-Assembly-Line
+"""
+
+import unittest
+from agent_assembly_line.utils.lru_cache import LRUCache
+
+class TestLRUCache(unittest.TestCase):
+
+    def test_get_put(self):
+        cache = LRUCache(max_size=2)
+        cache.put("a", 1)
+        self.assertEqual(cache.get("a"), 1)
+        self.assertIsNone(cache.get("b"))
+        self.assertEqual(cache.hits, 1)
+        self.assertEqual(cache.misses, 1)
+
+    def test_peek(self):
+        cache = LRUCache(max_size=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        self.assertEqual(cache.peek("a"), 1)
+        self.assertIsNone(cache.peek("c"))
+        cache.put("c", 3)
+        self.assertNotIn("a", cache)
+        self.assertEqual((cache.hits, cache.misses), (0, 0))
+
+    def test_evicts_least_recently_used(self):
+        cache = LRUCache(max_size=2)
+        cache.put("a", 1)
+        cache.put("b", 2)
+        cache.get("a")
+        cache.put("c", 3)
+        self.assertIn("a", cache)
+        self.assertNotIn("b", cache)
+        self.assertIn("c", cache)
+        self.assertEqual(len(cache), 2)
+
+    def test_invalid_size(self):
+        with self.assertRaises(ValueError):
+            LRUCache(max_size=0)
+
+if __name__ == '__main__':
+    unittest.main()
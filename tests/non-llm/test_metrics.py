@@ -0,0 +1,86 @@
+"""
+Agent-Assembly-Line
+"""
+
+import unittest, aiounittest
+from unittest.mock import patch
+from langchain_core.language_models import FakeListLLM
+from agent_assembly_line.metrics import MetricsRegistry, LLM_CALLS_IN_FLIGHT, collect_agent_metrics
+from agent_factory import create_agent
+
+class TestMetricsRegistry(unittest.TestCase):
+
+    def test_counter_and_gauge(self):
+        registry = MetricsRegistry()
+        requests = registry.counter("http_requests_total", "HTTP requests.", ["route", "status"])
+        requests.inc(route="/api/info", status=200)
+        requests.inc(2, route="/api/info", status=200)
+        registry.gauge("in_flight", "Calls in flight.").set(3)
+        text = registry.render()
+        self.assertIn("# TYPE http_requests_total counter", text)
+        self.assertIn('http_requests_total{route="/api/info",status="200"} 3', text)
+        self.assertIn("in_flight 3", text)
+        with self.assertRaises(ValueError):
+            requests.inc(route="/api/info")
+
+    def test_histogram_buckets_are_cumulative(self):
+        registry = MetricsRegistry()
+        latency = registry.histogram("latency_seconds", "Latency.", ["route"], buckets=(0.1, 1))
+        for value in (0.05, 0.5, 5):
+            latency.observe(value, route="/")
+        text = registry.render()
+        self.assertIn('latency_seconds_bucket{route="/",le="0.1"} 1', text)
+        self.assertIn('latency_seconds_bucket{route="/",le="1"} 2', text)
+        self.assertIn('latency_seconds_bucket{route="/",le="+Inf"} 3', text)
+        self.assertIn('latency_seconds_sum{route="/"} 5.55', text)
+        self.assertIn('latency_seconds_count{route="/"} 3', text)
+
+    def test_metrics_are_registered_once(self):
+        registry = MetricsRegistry()
+        self.assertIs(registry.counter("calls_total", "Calls."), registry.counter("calls_total", "Calls."))
+        with self.assertRaises(ValueError):
+            registry.gauge("calls_total", "Calls.")
+
+    def test_label_values_are_escaped(self):
+        registry = MetricsRegistry()
+        registry.counter("questions_total", "Questions.", ["agent"]).inc(agent='say "hi"\n')
+        self.assertIn('questions_total{agent="say \\"hi\\"\\n"} 1', registry.render())
+
+    def test_failing_collector_is_skipped(self):
+        registry = MetricsRegistry()
+        registry.register_collector(lambda: 1 / 0)
+        registry.counter("calls_total", "Calls.").inc()
+        self.assertIn("calls_total 1", registry.render())
+
+class TestAgentMetrics(aiounittest.AsyncTestCase):
+
+    def _create_agent(self):
+        return create_agent("metrics-test-agent", "{global_store} {session_store} {question}", vector_store="numpy")
+
+    def test_llm_calls_in_flight(self):
+        agent = self._create_agent()
+        observed = []
+        invoke = FakeListLLM._call
+        def call(llm, *args, **kwargs):
+            observed.append(LLM_CALLS_IN_FLIGHT.samples()[0][2])
+            return invoke(llm, *args, **kwargs)
+        before = LLM_CALLS_IN_FLIGHT.samples()[0][2] if LLM_CALLS_IN_FLIGHT.samples() else 0
+        with patch.object(FakeListLLM, "_call", call):
+            agent.run("Where is Aethelland?")
+        self.assertEqual(observed, [before + 1])
+        self.assertEqual(LLM_CALLS_IN_FLIGHT.samples()[0][2], before)
+
+    async def test_agent_samples(self):
+        agent = self._create_agent()
+        await agent.arun("Where is Aethelland?")
+        await agent.arun("Where is Aethelland?")
+        registry = MetricsRegistry()
+        registry.register_collector(lambda: collect_agent_metrics([agent]))
+        text = registry.render()
+        self.assertIn('agent_vector_store_documents{agent="metrics-test-agent",store="agent"} 1', text)
+        self.assertIn('agent_query_embedding_cache_hits_total{agent="metrics-test-agent"} 1', text)
+        self.assertIn('agent_query_embedding_cache_hit_ratio{agent="metrics-test-agent"} 0.5', text)
+        self.assertIn('agent_memory_pending_messages{agent="metrics-test-agent"}', text)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,153 @@
+"""
+Agent-Assembly-Line
+"""
+
+import os, tempfile
+import unittest, aiounittest
+from unittest.mock import patch
+import numpy as np
+from langchain_core.embeddings import DeterministicFakeEmbedding
+from agent_assembly_line.vectorstores import NumpyVectorStore, VectorStoreFactory
+from agent_factory import create_agent
+
+TEXTS = ["Aethelland is a small country.", "The capital is Eldoria.", "Bananas are yellow."]
+METADATAS = [{"source": "wiki"}, {"source": "wiki"}, {"source": "fruit"}]
+
+class TestNumpyVectorStore(aiounittest.AsyncTestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.embeddings = DeterministicFakeEmbedding(size=16)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _store(self, persist_directory=None):
+        store = NumpyVectorStore.open("test", self.embeddings, persist_directory)
+        store.add_texts(TEXTS, METADATAS, ids=["a", "b", "c"])
+        return store
+
+    def test_search_ranks_by_cosine_similarity(self):
+        store = self._store()
+        results = store.similarity_search_with_score("The capital is Eldoria.", k=2)
+        self.assertEqual(results[0][0].page_content, "The capital is Eldoria.")
+        self.assertAlmostEqual(results[0][1], 1.0, places=5)
+        self.assertGreater(results[0][1], results[1][1])
+        self.assertEqual(len(store.similarity_search("Eldoria", k=10)), 3)
+
+    def test_metadata_filter(self):
+        store = self._store()
+        query = self.embeddings.embed_query("Bananas are yellow.")
+        self.assertEqual({doc.id for doc in store.similarity_search_by_vector(query, k=3, filter={"source": "wiki"})}, {"a", "b"})
+        self.assertEqual(len(store.similarity_search_by_vector(query, k=3, filter={"source": ["fruit", "news"]})), 1)
+        self.assertEqual(len(store.similarity_search_by_vector(query, k=3, filter=lambda metadata: metadata["source"] != "wiki")), 1)
+        self.assertEqual(store.similarity_search_by_vector(query, k=3, filter={"source": "news"}), [])
+
+    def test_delete_and_replace(self):
+        store = self._store()
+        store.delete(["b"])
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.get_by_ids(["a", "b"])[0].page_content, TEXTS[0])
+        store.add_texts(["Aethelland has three million inhabitants."], ids=["a"])
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.get_by_ids(["a"])[0].page_content, "Aethelland has three million inhabitants.")
+        store.reset_collection()
+        self.assertEqual(len(store), 0)
+        self.assertEqual(store.similarity_search("Aethelland"), [])
+
+    def test_vectors_are_contiguous_float32(self):
+        store = NumpyVectorStore(self.embeddings)
+        for i in range(40):
+            store.add_texts([f"text {i}"])
+        self.assertEqual(store.vectors.shape, (40, 16))
+        self.assertEqual(store.vectors.dtype, np.float32)
+        self.assertTrue(store.vectors.flags.c_contiguous)
+        np.testing.assert_allclose(np.linalg.norm(store.vectors, axis=1), 1.0, rtol=1e-5)
+
+    def test_save_and_load(self):
+        store = self._store(self.temp_dir.name)
+        store.save()
+        loaded = NumpyVectorStore.open("test", self.embeddings, self.temp_dir.name)
+        self.assertIsInstance(loaded._matrix, np.memmap)
+        self.assertEqual(len(loaded), 3)
+        self.assertEqual(loaded.similarity_search("Bananas are yellow.", k=1)[0].metadata, {"source": "fruit"})
+
+        loaded.add_texts(["Another text."])
+        loaded.close()
+        self.assertEqual(len(NumpyVectorStore.open("test", self.embeddings, self.temp_dir.name)), 4)
+        self.assertEqual(len(store), 3)
+
+    def test_changes_are_saved_explicitly(self):
+        store = self._store(self.temp_dir.name)
+        for i in range(5):
+            store.add_texts([f"text {i}"], ids=[f"t{i}"])
+        store.delete(["b"])
+        self.assertFalse(os.path.exists(os.path.join(self.temp_dir.name, "test.npy")))
+        with patch.object(NumpyVectorStore, "save", autospec=True, side_effect=NumpyVectorStore.save) as save:
+            store.close()
+            store.close()  # nothing changed since
+            self.assertEqual(save.call_count, 1)
+        loaded = NumpyVectorStore.open("test", self.embeddings, self.temp_dir.name)
+        self.assertEqual(loaded._ids, store._ids)
+        np.testing.assert_array_equal(loaded.vectors, store.vectors)
+        self.assertEqual(loaded.get_by_ids(["t4"])[0].page_content, "text 4")
+
+    async def test_async_search(self):
+        store = self._store()
+        docs = await store.asimilarity_search_by_vector(self.embeddings.embed_query("Bananas are yellow."), k=1)
+        self.assertEqual(docs[0].id, "c")
+
+class TestVectorStoreFactory(unittest.TestCase):
+
+    def test_backends(self):
+        embeddings = DeterministicFakeEmbedding(size=16)
+        self.assertIsInstance(VectorStoreFactory.create("numpy", "factory-test", embeddings), NumpyVectorStore)
+        with self.assertRaises(ValueError):
+            VectorStoreFactory.create("faiss", "factory-test", embeddings)
+
+    def test_register_backend(self):
+        created = []
+        def create(collection, embeddings, persist_directory=None):
+            created.append(collection)
+            return NumpyVectorStore(embeddings, collection)
+        VectorStoreFactory.register_backend("custom-test", create)
+        VectorStoreFactory.create("custom-test", "factory-test", DeterministicFakeEmbedding(size=16))
+        self.assertEqual(created, ["factory-test"])
+
+class TestAgentWithNumpyVectorStore(unittest.TestCase):
+
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.data_file = os.path.join(self.temp_dir.name, "data.txt")
+        with open(self.data_file, "w") as f:
+            f.write("Aethelland is a small country in the mountains. " * 100)
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def _create_agent(self, data, vector_store="numpy", persist_index=False):
+        return create_agent("numpy-store-test-agent", "{global_store} {session_store} {question}", data,
+                            vector_store=vector_store, persist_index=persist_index)
+
+    def test_agent_uses_numpy_stores(self):
+        agent = self._create_agent({ "inline": "Aethelland is a small country. " * 100 })
+        self.assertIsInstance(agent.agent_vectorstore, NumpyVectorStore)
+        self.assertIsInstance(agent.user_vectorstore, NumpyVectorStore)
+        self.assertEqual(len(agent.agent_vectorstore), agent.agent_store_size)
+        inputs, _ = agent.do_chain("How big is Aethelland?")
+        self.assertIn("Aethelland", inputs["global_store"])
+
+    def test_persistent_index(self):
+        with patch.dict(os.environ, {"USER_INDEX_PATH": os.path.join(self.temp_dir.name, "index")}):
+            first = self._create_agent({ "file": self.data_file }, persist_index=True)
+            self.assertIsInstance(first.agent_vectorstore, NumpyVectorStore)
+            with patch.object(DeterministicFakeEmbedding, "embed_documents", autospec=True, side_effect=AssertionError("embedded again")):
+                second = self._create_agent({ "file": self.data_file }, persist_index=True)
+                self.assertEqual(len(second.agent_vectorstore), first.agent_store_size)
+            with patch.object(DeterministicFakeEmbedding, "embed_documents", autospec=True,
+                              side_effect=lambda self, texts: [[0.1] * 16 for _ in texts]) as mock_embed:
+                self._create_agent({ "file": self.data_file }, vector_store="chroma", persist_index=True).agent_vectorstore
+                self.assertEqual(mock_embed.call_count, 1)  # built again for the other backend
+
+if __name__ == '__main__':
+    unittest.main()
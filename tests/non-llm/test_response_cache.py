@@ -0,0 +1,102 @@
+"""
+Agent-Assembly-Line
+"""
+
+import time
+import unittest, aiounittest
+from unittest.mock import patch
+from langchain_core.messages import HumanMessage
+from agent_assembly_line.response_cache import ResponseCache, CachedAnswer
+from agent_factory import create_agent
+
+def _create_agent(response_cache, responses=None):
+    return create_agent("response-cache-test-agent", "{global_store} {context} {question}", { "inline": "Aethelland is a small country. " * 100 },
+                        responses or ["first answer", "second answer"], response_cache=response_cache)
+
+class TestResponseCache(aiounittest.AsyncTestCase):
+
+    def test_exact_mode(self):
+        agent = _create_agent({"mode": "exact"})
+        self.assertEqual(agent.run("How big is Aethelland?"), "first answer")
+        self.assertEqual(agent.run("How big is Aethelland?"), "first answer")
+        self.assertEqual(agent.stats["response_cache"], "hit")
+        self.assertEqual(agent.run("Where is Aethelland?"), "second answer")
+        self.assertEqual(agent.response_cache.hits, 1)
+
+    def test_invalidated_when_data_changes(self):
+        agent = _create_agent({"mode": "exact"})
+        agent.run("How big is Aethelland?")
+        agent.add_inline_text("Aethelland has three million inhabitants.")
+        self.assertEqual(agent.run("How big is Aethelland?"), "second answer")
+
+        agent = _create_agent({"mode": "semantic"})
+        agent.run("How big is Aethelland?")
+        agent.add_inline_text("Aethelland has three million inhabitants.")
+        self.assertEqual(len(agent.response_cache), 0)
+
+    def test_session_data_keeps_the_shared_answers(self):
+        agent = _create_agent({"mode": "exact"})
+        agent.run("How big is Aethelland?")
+        agent.session("alice").add_inline_text("Alice likes tea.")
+        self.assertEqual(len(agent.response_cache), 1)
+        self.assertEqual(agent.run("How big is Aethelland?"), "first answer")
+
+    def test_follow_up_depends_on_the_history(self):
+        for mode in ["exact", "semantic"]:
+            agent = _create_agent({"mode": mode})
+            agent.config.use_memory = True
+            agent.run("And the second one?")
+            agent.memory_assistant.messages.append(HumanMessage(content="Which rivers are in Aethelland?"))
+            self.assertEqual(agent.run("And the second one?"), "second answer")
+
+    def test_semantic_mode_skips_retrieval(self):
+        agent = _create_agent({"mode": "semantic", "threshold": 0.99})
+        agent.run("How big is Aethelland?")
+        # embedded once for the cache lookup and the retrieval, storing the answer is no lookup
+        self.assertEqual((agent.query_embeddings.hits, agent.query_embeddings.misses), (1, 1))
+        with patch.object(agent, "_retrieve", side_effect=AssertionError("retrieval")):
+            self.assertEqual(agent.run("How big is Aethelland?"), "first answer")
+        self.assertEqual(agent.run("Something completely different"), "second answer")
+
+    def test_key(self):
+        inputs = {"global_store": "chunk", "session_store": "", "context": "", "history": "old"}
+        key = ResponseCache.key("agent", "How big is Aethelland?", inputs)
+        self.assertEqual(key, ResponseCache.key("agent", "  how big is  Aethelland? ", dict(inputs, today="Monday")))
+        self.assertNotEqual(key, ResponseCache.key("agent", "How big is Aethelland?", dict(inputs, history="new")))
+        self.assertNotEqual(key, ResponseCache.key("agent", "How big is Aethelland?", dict(inputs, global_store="other chunk")))
+        self.assertNotEqual(key, ResponseCache.key("other agent", "How big is Aethelland?", inputs))
+
+    def test_ttl(self):
+        cache = ResponseCache(ttl=0.05)
+        cache.put("key", "answer")
+        self.assertEqual(cache.get("key"), "answer")
+        time.sleep(0.1)
+        self.assertIsNone(cache.get("key"))
+
+    def test_max_size(self):
+        cache = ResponseCache(max_size=2)
+        for i in range(3):
+            cache.put(f"key {i}", f"answer {i}")
+        self.assertEqual(len(cache), 2)
+        self.assertIsNone(cache.get("key 0"))
+
+    def test_from_config(self):
+        self.assertIsNone(ResponseCache.from_config({}))
+        with self.assertRaises(ValueError):
+            ResponseCache.from_config({"mode": "fuzzy"})
+
+    async def test_cached_answer_is_streamed(self):
+        agent = _create_agent({"mode": "exact"})
+        first = "".join([chunk async for chunk in agent.stream("How big is Aethelland?")])
+        chunks = [chunk async for chunk in agent.stream("How big is Aethelland?")]
+        self.assertEqual(first, "first answer")
+        self.assertEqual(chunks, ["first ", "answer"])
+        self.assertEqual(await agent.arun("How big is Aethelland?"), "first answer")
+
+    def test_cached_answer_runnable(self):
+        runnable = CachedAnswer("one two  three")
+        self.assertEqual(runnable.invoke({}), "one two  three")
+        self.assertEqual("".join(runnable.stream({})), "one two  three")
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+"""
+Agent-Assembly-Line
+"""
+
+import asyncio, threading, time
+import unittest, aiounittest
+from agent_assembly_line.scheduler import LLMScheduler, QueueFullError, BACKGROUND
+
+class TestLLMScheduler(aiounittest.AsyncTestCase):
+
+    async def test_slots_limit_concurrency(self):
+        scheduler = LLMScheduler(slots=2)
+        running, peak = [0], [0]
+        lock = threading.Lock()
+        def work():
+            with lock:
+                running[0] += 1
+                peak[0] = max(peak[0], running[0])
+            time.sleep(0.02)
+            with lock:
+                running[0] -= 1
+            return threading.current_thread()
+        threads = await asyncio.gather(*[scheduler.run(work) for _ in range(6)])
+        self.assertEqual(peak[0], 2)
+        self.assertNotIn(threading.current_thread(), threads)
+        self.assertEqual((scheduler.active, scheduler.queued), (0, 0))
+
+    async def test_priority_then_arrival_order(self):
+        scheduler = LLMScheduler(slots=1)
+        order = []
+        async def request(name, priority):
+            async with scheduler.slot(priority):
+                order.append(name)
+        async with scheduler.slot():
+            tasks = [asyncio.ensure_future(request(name, priority))
+                     for name, priority in [("upload", BACKGROUND), ("first", 0), ("second", 0)]]
+            await asyncio.sleep(0)
+            self.assertEqual(scheduler.queued, 3)
+        await asyncio.gather(*tasks)
+        self.assertEqual(order, ["first", "second", "upload"])
+
+    async def test_full_queue_is_rejected(self):
+        scheduler = LLMScheduler(slots=1, max_queue=1)
+        async with scheduler.slot():
+            waiting = asyncio.ensure_future(scheduler.run(lambda: "answer"))
+            await asyncio.sleep(0)
+            self.assertTrue(scheduler.full)
+            with self.assertRaises(QueueFullError) as e:
+                await scheduler.run(lambda: "answer")
+            self.assertEqual(e.exception.queued, 1)
+        self.assertEqual(await waiting, "answer")
+        self.assertEqual(scheduler.rejected, 1)
+
+    async def test_cancelled_requests_leave_the_queue(self):
+        scheduler = LLMScheduler(slots=1)
+        async with scheduler.slot():
+            waiting = asyncio.ensure_future(scheduler.acquire())
+            await asyncio.sleep(0)
+            waiting.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiting
+            self.assertEqual(scheduler.queued, 0)
+        self.assertEqual(scheduler.active, 0)
+
+    async def test_waiter_cancelled_while_the_slot_is_released(self):
+        for cancel_first in [True, False]:
+            scheduler = LLMScheduler(slots=1)
+            await scheduler.acquire()
+            waiting = asyncio.ensure_future(scheduler.acquire())
+            await asyncio.sleep(0)
+            if cancel_first:
+                waiting.cancel()
+                scheduler.release()
+            else:
+                scheduler.release()
+                waiting.cancel()
+            with self.assertRaises(asyncio.CancelledError):
+                await waiting
+            self.assertEqual((scheduler.active, scheduler.queued), (0, 0))
+
+    async def test_slot_is_held_until_the_thread_returns(self):
+        scheduler = LLMScheduler(slots=1)
+        release = threading.Event()
+        work = asyncio.ensure_future(scheduler.run(release.wait, 5))
+        await asyncio.sleep(0.01)
+        work.cancel()
+        await asyncio.sleep(0.01)
+        self.assertEqual(scheduler.active, 1)
+        release.set()
+        async with scheduler.slot():
+            self.assertEqual(scheduler.active, 1)
+        self.assertEqual(scheduler.active, 0)
+
+    def test_invalid_settings(self):
+        with self.assertRaises(ValueError):
+            LLMScheduler(slots=0)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,120 @@
+"""
+Agent-Assembly-Line
+"""
+
+import os, tempfile, threading
+import unittest, aiounittest
+from unittest.mock import patch
+from langchain_core.documents import Document
+from agent_assembly_line.sessions import SessionManager
+from agent_factory import create_agent
+
+class TestAgentSessions(aiounittest.AsyncTestCase):
+
+    def _create_agent(self, vector_store="numpy", name="session-test-agent"):
+        return create_agent(name, "{global_store} {session_store} {context} {question}", vector_store=vector_store)
+
+    def test_sessions_share_the_agent_store(self):
+        agent = self._create_agent()
+        alice, bob = agent.session("alice"), agent.session("bob")
+        self.assertIs(alice.agent_vectorstore, agent.agent_vectorstore)
+        self.assertIs(bob.agent_vectorstore, agent.agent_vectorstore)
+        self.assertIs(alice.model, agent.model)
+        self.assertIs(alice.query_embeddings, agent.query_embeddings)
+        self.assertEqual(alice._acquired_clients, ())
+
+    async def test_session_state_is_isolated(self):
+        agent = self._create_agent()
+        alice, bob = agent.session("alice"), agent.session("bob")
+        alice.add_inline_text("Alice likes tea.")
+        alice._add_user_documents([Document(page_content="Alice's notes about Aethelland.")])
+        await alice.arun("Where is Aethelland?")
+
+        self.assertEqual(bob.inline_context, "")
+        self.assertEqual(agent.inline_context, "")
+        self.assertEqual(alice.vectorstore_sizes(), {"agent": 1, "user": 1})
+        self.assertEqual(bob.vectorstore_sizes(), {"agent": 1, "user": 0})
+        self.assertNotEqual(alice.user_collection, bob.user_collection)
+        self.assertIn("prompt_size", alice.stats)
+        self.assertNotIn("prompt_size", agent.stats)
+
+    def test_session_history_is_not_saved(self):
+        with tempfile.TemporaryDirectory() as temp_dir:
+            memory_path = os.path.join(temp_dir, "history.json")
+            with patch.dict(os.environ, {'USER_MEMORY_PATH': memory_path, 'LOCAL_MEMORY_PATH': memory_path}):
+                agent = self._create_agent()
+                agent.config.use_memory = True
+                session = agent.session("alice")
+            self.assertIsNot(session.memory_assistant, agent.memory_assistant)
+            self.assertIsNone(session.memory_assistant.auto_save_path)
+
+    def test_closing_deletes_the_chroma_collection(self):
+        agent = self._create_agent(vector_store="chroma", name="session-chroma-test-agent")
+        alice = agent.session("alice")
+        alice._add_user_documents([Document(page_content="Alice's notes.", metadata={"source": "upload"})])
+        bob = agent.session("bob")
+        self.assertEqual(bob.user_vectorstore.similarity_search_by_vector([0.0] * 16, 1), [])
+        store = alice.user_vectorstore
+        alice.close_session()
+        self.assertIsNone(alice._user_vectorstore)
+        with self.assertRaises(Exception):
+            store.similarity_search_by_vector([0.0] * 16, 1)
+        with self.assertRaises(ValueError):
+            agent.close_session()
+
+class TestSessionManager(unittest.TestCase):
+
+    def _create_agent(self):
+        return create_agent("session-manager-test-agent", vector_store="numpy")
+
+    def test_sessions_are_reused(self):
+        agent = self._create_agent()
+        sessions = SessionManager()
+        alice = sessions.get(agent, "alice")
+        self.assertIs(sessions.get(agent, "alice"), alice)
+        self.assertIsNot(sessions.get(agent, "bob"), alice)
+        self.assertEqual(len(sessions), 2)
+
+    def test_reloaded_agent_replaces_sessions(self):
+        sessions = SessionManager()
+        old = sessions.get(self._create_agent(), "alice")
+        agent = self._create_agent()
+        self.assertIs(sessions.get(agent, "alice").session_of, agent)
+        self.assertIsNot(sessions.get(agent, "alice"), old)
+
+    def test_new_session_does_not_block_the_others(self):
+        agent, loading = self._create_agent(), self._create_agent()
+        sessions = SessionManager()
+        bob = sessions.get(agent, "bob")
+        started, release = threading.Event(), threading.Event()
+        create_session = loading.session
+        def slow_session(session_id):
+            started.set()
+            release.wait(5)
+            return create_session(session_id)
+        with patch.object(loading, "session", side_effect=slow_session):
+            thread = threading.Thread(target=sessions.get, args=(loading, "alice"))
+            thread.start()
+            started.wait(5)
+            self.assertIs(sessions.get(agent, "bob"), bob)
+            self.assertEqual(len(sessions), 1)
+            release.set()
+            thread.join(5)
+        self.assertEqual(len(sessions), 2)
+
+    def test_idle_and_least_recently_used_sessions_are_evicted(self):
+        agent = self._create_agent()
+        sessions = SessionManager(ttl=60, max_sessions=2)
+        with patch("agent_assembly_line.sessions.time.monotonic", return_value=0):
+            sessions.get(agent, "a")
+            sessions.get(agent, "b")
+            sessions.get(agent, "c")
+        self.assertEqual([session_id for _, session_id in sessions.sessions], ["b", "c"])
+        with patch("agent_assembly_line.sessions.time.monotonic", return_value=30):
+            sessions.get(agent, "c")
+        with patch("agent_assembly_line.sessions.time.monotonic", return_value=80):
+            self.assertEqual(sessions.evict_idle(), 1)
+        self.assertEqual([session_id for _, session_id in sessions.sessions], ["c"])
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,140 @@
+"""
+Agent-Assembly-Line
+"""
+
+import asyncio
+import gc
+import unittest, aiounittest
+from unittest.mock import AsyncMock
+from langchain_core.language_models import FakeStreamingListLLM
+from agent_assembly_line.metrics import LLM_CALLS_IN_FLIGHT, STREAM_CANCELLATIONS
+from agent_assembly_line.streaming import ClientDisconnected, cancel_on_disconnect, coalesce
+from agent_factory import create_agent
+
+class FakeClient:
+    """
+    ASGI receive channel of a client that disconnects on disconnect().
+    """
+
+    def __init__(self):
+        self._disconnected = asyncio.Event()
+
+    def disconnect(self):
+        self._disconnected.set()
+
+    async def receive(self):
+        await self._disconnected.wait()
+        return {"type": "http.disconnect"}
+
+async def _numbers(produced, delay=0.01):
+    for i in range(100):
+        await asyncio.sleep(delay)
+        produced.append(i)
+        yield i
+
+class TestCancelOnDisconnect(aiounittest.AsyncTestCase):
+
+    async def test_all_chunks_without_disconnect(self):
+        chunks = [chunk async for chunk in cancel_on_disconnect(FakeClient().receive, _numbers([], 0))]
+        self.assertEqual(chunks, list(range(100)))
+
+    async def test_disconnect_cancels_the_producer(self):
+        client, produced, received = FakeClient(), [], []
+        with self.assertRaises(ClientDisconnected):
+            async for chunk in cancel_on_disconnect(client.receive, _numbers(produced)):
+                received.append(chunk)
+                if chunk == 2:
+                    client.disconnect()
+        count = len(produced)
+        await asyncio.sleep(0.05)
+        self.assertEqual(len(produced), count)
+        self.assertLess(count, 10)
+
+    async def test_errors_are_raised(self):
+        async def failing():
+            yield 1
+            raise KeyError("model")
+        with self.assertRaises(KeyError):
+            async for _ in cancel_on_disconnect(FakeClient().receive, failing()):
+                pass
+
+async def _timed(chunks):
+    for delay, chunk in chunks:
+        await asyncio.sleep(delay)
+        yield chunk
+
+class TestCoalesce(aiounittest.AsyncTestCase):
+
+    async def test_first_chunk_is_sent_right_away(self):
+        batches = [batch async for batch in coalesce(_timed([(0, "Aeth"), (0, "el"), (0, "land")]), flush_interval=10)]
+        self.assertEqual(batches, [["Aeth"], ["el", "land"]])
+
+    async def test_flush_by_size(self):
+        chunks = [(0, "a")] + [(0, "bb")] * 5
+        batches = [batch async for batch in coalesce(_timed(chunks), flush_interval=10, max_chars=4)]
+        self.assertEqual(batches, [["a"], ["bb", "bb"], ["bb", "bb"], ["bb"]])
+
+    async def test_flush_by_time(self):
+        chunks = [(0, "a"), (0, "b"), (0, "c"), (0.1, "d")]
+        batches = [batch async for batch in coalesce(_timed(chunks), flush_interval=0.02, max_chars=100)]
+        self.assertEqual(batches, [["a"], ["b", "c"], ["d"]])
+
+    async def test_keep_alive_while_waiting(self):
+        batches = [batch async for batch in coalesce(_timed([(0.12, "answer")]), keep_alive=0.05)]
+        self.assertEqual(batches, [None, None, ["answer"]])
+
+    async def test_closing_stops_the_source(self):
+        produced = []
+        async def tokens():
+            for i in range(100):
+                await asyncio.sleep(0.01)
+                produced.append(i)
+                yield str(i)
+        batches = coalesce(tokens(), flush_interval=0)
+        await batches.__anext__()
+        await batches.aclose()
+        count = len(produced)
+        await asyncio.sleep(0.05)
+        self.assertEqual(len(produced), count)
+
+class TestAgentStreamCancellation(aiounittest.AsyncTestCase):
+
+    def _create_agent(self):
+        agent = create_agent("cancel-test-agent", model=FakeStreamingListLLM(responses=["a long answer nobody reads"], sleep=0.01),
+                             vector_store="numpy", tracing={ "exporters": ["memory"] })
+        agent.memory_assistant.add_message = AsyncMock()
+        return agent
+
+    def _cancellations(self):
+        samples = [value for _, labels, value in STREAM_CANCELLATIONS.samples() if labels["agent"] == "cancel-test-agent"]
+        return samples[0] if samples else 0
+
+    async def test_disconnect_aborts_the_turn(self):
+        agent, client, received = self._create_agent(), FakeClient(), []
+        before = self._cancellations()
+        in_flight = sum(value for _, _, value in LLM_CALLS_IN_FLIGHT.samples())
+        with self.assertRaises(ClientDisconnected):
+            async for chunk in cancel_on_disconnect(client.receive, agent.stream("Where is Aethelland?")):
+                received.append(chunk)
+                if len(received) == 3:
+                    client.disconnect()
+        self.assertLess(len(received), len("a long answer nobody reads"))
+        self.assertTrue(agent.stats["cancelled"])
+        self.assertEqual(self._cancellations(), before + 1)
+        agent.memory_assistant.add_message.assert_not_called()
+        self.assertEqual(sum(value for _, _, value in LLM_CALLS_IN_FLIGHT.samples()), in_flight)
+        self.assertTrue(agent.stats["spans"][0]["attributes"]["cancelled"])
+        # the tee generators of the cancelled chain are freed by the garbage collector,
+        # their closing tasks must run before the test closes the loop
+        gc.collect()
+        await asyncio.sleep(0)
+
+    async def test_completed_stream_updates_the_memory(self):
+        agent = self._create_agent()
+        chunks = [chunk async for chunk in agent.stream("Where is Aethelland?")]
+        self.assertEqual("".join(chunks), "a long answer nobody reads")
+        self.assertFalse(agent.stats["cancelled"])
+        agent.memory_assistant.add_message.assert_awaited_once()
+
+if __name__ == '__main__':
+    unittest.main()
@@ -438,6 +438,16 @@ class TestTextCleanupAgentEdgeCases(unittest.TestCase):
 
         self.assertEqual(len(chunks), 1)
 
+    def test_invalid_chunk_size(self):
+        dummy_file = os.path.join(self.test_dir, "dummy.txt")
+        with open(dummy_file, 'w') as f:
+            f.write("small content")
+
+        agent = TextCleanupAgent(input_file_path=dummy_file, mode='local')
+        with self.assertRaises(ValueError):
+            agent.chunk_text("small text", chunk_size=0)
+        self.assertEqual(agent._text_splitter().chunk_size, agent.chunk_size)
+
     def test_multiple_encoding_fallback_failure(self):
         dummy_file = os.path.join(self.test_dir, "dummy.txt")
         with open(dummy_file, 'w') as f:
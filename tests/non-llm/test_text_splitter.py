@@ -0,0 +1,75 @@
+"""
+Agent-Assembly-Line
+"""
+
+import unittest
+from langchain_core.documents import Document
+from agent_assembly_line.agent import Agent
+from agent_assembly_line.config import Config
+from agent_assembly_line.utils.text_splitter import TextSplitter
+
+SENTENCES = [f"Sentence number {i} tells something about the region." for i in range(40)]
+TEXT = "\n\n".join(" ".join(SENTENCES[i:i + 4]) for i in range(0, 40, 4))
+
+class TestTextSplitter(unittest.TestCase):
+
+    def test_chunks_fit_and_cover_the_text(self):
+        chunks = TextSplitter(chunk_size=200, chunk_overlap=0).split_text(TEXT)
+        self.assertGreater(len(chunks), 5)
+        self.assertTrue(all(len(chunk) <= 200 for chunk in chunks))
+        self.assertEqual(" ".join(chunks).split(), TEXT.split())
+
+    def test_prefers_paragraphs(self):
+        chunks = TextSplitter(chunk_size=300, chunk_overlap=0).split_text(TEXT)
+        paragraphs = TEXT.split("\n\n")
+        self.assertEqual(chunks[0], paragraphs[0])
+
+    def test_sentence_boundaries(self):
+        splitter = TextSplitter(chunk_size=120, chunk_overlap=0, boundaries=["sentence", "word"])
+        chunks = splitter.split_text(" ".join(SENTENCES))
+        self.assertTrue(all(chunk.endswith(".") for chunk in chunks))
+
+    def test_overlap_starts_at_a_word(self):
+        chunks = TextSplitter(chunk_size=100, chunk_overlap=30, boundaries=["word"]).split_text(" ".join(SENTENCES))
+        words = set(" ".join(SENTENCES).split())
+        for previous, chunk in zip(chunks, chunks[1:]):
+            self.assertIn(chunk.split()[0], words)
+            self.assertIn(chunk.split()[0], previous.split())
+
+    def test_hard_cut_without_boundaries(self):
+        chunks = TextSplitter(chunk_size=10, chunk_overlap=2).split_text("x" * 95)
+        self.assertTrue(all(len(chunk) <= 10 for chunk in chunks))
+        # the overlap never starts within a word
+        self.assertEqual("".join(chunks), "x" * 95)
+
+    def test_tokens(self):
+        splitter = TextSplitter(chunk_size=20, chunk_overlap=5, unit="tokens", token_counter=lambda text: len(text.split()))
+        chunks = splitter.split_text(" ".join(SENTENCES))
+        self.assertTrue(all(len(chunk.split()) <= 20 for chunk in chunks))
+        self.assertGreater(len(chunks), 15)
+
+    def test_documents_keep_metadata(self):
+        docs = TextSplitter(chunk_size=200, chunk_overlap=0).split_documents([Document(page_content=TEXT, metadata={"source": "a.txt"})])
+        self.assertTrue(all(doc.metadata == {"source": "a.txt"} for doc in docs))
+
+    def test_from_config(self):
+        splitter = TextSplitter.from_config({"size": 256, "overlap": 32, "unit": "tokens", "boundaries": ["sentence"]})
+        self.assertEqual(splitter.settings, {"size": 256, "overlap": 32, "unit": "tokens", "boundaries": ["sentence"]})
+        self.assertEqual(TextSplitter.from_config({}).settings["size"], 1000)
+        with self.assertRaises(ValueError):
+            TextSplitter.from_config({"unit": "words"})
+        with self.assertRaises(ValueError):
+            TextSplitter(chunk_size=10, chunk_overlap=10)
+
+    def test_agent_config(self):
+        agent = Agent(config=Config(config_dict={
+            "name": "chunking-test-agent",
+            "prompt": { "inline_rag_templates": "{question}" },
+            "llm": { "model-identifier": "ollama:gemma2:latest" },
+            "chunking": { "size": 64, "overlap": 8, "unit": "tokens" },
+        }))
+        self.assertEqual(agent._text_splitter().settings["unit"], "tokens")
+        self.assertEqual(agent.chunk_size, 64)
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,156 @@
+"""
+Agent-Assembly-Line
+"""
+
+import asyncio, gc, logging
+import unittest, aiounittest
+from agent_assembly_line import tracing
+from agent_assembly_line.tracing import Tracer, LogExporter, RingBufferExporter, OpenTelemetryExporter
+from agent_factory import create_agent
+
+def _names(spans):
+    return [span["name"] for span in spans]
+
+class TestTracer(aiounittest.AsyncTestCase):
+
+    def test_nested_spans(self):
+        buffer = RingBufferExporter()
+        tracer = Tracer([buffer])
+        with tracer.trace("run") as trace:
+            with tracing.span("search") as search:
+                with tracing.span("fuse"):
+                    pass
+            with tracer.trace("nested run") as nested:
+                self.assertIs(nested, trace)
+        self.assertTrue(trace.ended)
+        self.assertEqual([span.name for span in trace.spans], ["run", "search", "fuse"])
+        self.assertIs(trace.spans[2].parent, search)
+        self.assertEqual(list(buffer.traces), [trace])
+        self.assertIsNone(tracing.current_span())
+
+    def test_spans_outside_traces_are_not_recorded(self):
+        with tracing.span("search") as span:
+            span.set_attribute("k", 4)
+        self.assertIsNone(span.trace)
+
+    def test_errors_are_recorded(self):
+        tracer = Tracer()
+        with self.assertRaises(KeyError):
+            with tracer.trace("run") as trace:
+                with tracing.span("search"):
+                    raise KeyError("x")
+        self.assertEqual(trace.spans[1].attributes["error"], "KeyError")
+        self.assertTrue(all(span.ended for span in trace.spans))
+
+    async def test_concurrent_tasks_share_the_parent(self):
+        async def search(name):
+            with tracing.span(name):
+                await asyncio.sleep(0.01)
+        with Tracer().trace("arun") as trace:
+            await asyncio.gather(search("a"), search("b"))
+        self.assertEqual({span.name for span in trace.spans[1:]}, {"a", "b"})
+        self.assertTrue(all(span.parent is trace.root for span in trace.spans[1:]))
+
+    def test_ring_buffer_percentile(self):
+        buffer = RingBufferExporter(max_traces=3)
+        tracer = Tracer([buffer])
+        for _ in range(5):
+            with tracer.trace("run"):
+                pass
+        self.assertEqual(len(buffer.traces), 3)
+        self.assertEqual(len(buffer.durations("run")), 3)
+        self.assertEqual(buffer.percentile("run", 100), max(buffer.durations("run")))
+        self.assertIsNone(buffer.percentile("llm", 95))
+
+    def test_log_exporter(self):
+        tracer = Tracer([LogExporter()])
+        with self.assertLogs("agent_assembly_line.tracing", level=logging.INFO) as logs:
+            with tracer.trace("run"):
+                with tracing.span("search"):
+                    pass
+        self.assertIn("search", logs.output[0])
+
+    def test_opentelemetry_exporter(self):
+        from opentelemetry.sdk.trace import TracerProvider
+        from opentelemetry.sdk.trace.export import SimpleSpanProcessor
+        from opentelemetry.sdk.trace.export.in_memory_span_exporter import InMemorySpanExporter
+        spans = InMemorySpanExporter()
+        provider = TracerProvider()
+        provider.add_span_processor(SimpleSpanProcessor(spans))
+        tracer = Tracer([OpenTelemetryExporter(tracer_provider=provider)])
+        with tracer.trace("run"):
+            with tracing.span("search", store="global"):
+                pass
+        finished = {span.name: span for span in spans.get_finished_spans()}
+        self.assertEqual(set(finished), {"run", "search"})
+        self.assertEqual(finished["search"].parent.span_id, finished["run"].context.span_id)
+        self.assertEqual(finished["search"].attributes["store"], "global")
+
+    def test_from_config(self):
+        tracer = Tracer.from_config({"exporters": ["log", "memory"], "buffer-size": 10})
+        self.assertEqual(tracer.exporters[1].traces.maxlen, 10)
+        self.assertEqual(Tracer.from_config({}).exporters, [])
+        with self.assertRaises(ValueError):
+            Tracer.from_config({"exporters": ["zipkin"]})
+
+class TestAgentTracing(aiounittest.AsyncTestCase):
+
+    def _create_agent(self):
+        return create_agent("tracing-test-agent", "{global_store} {session_store} {question}", vector_store="numpy", tracing={ "exporters": ["memory"] })
+
+    def _assert_call_spans(self, spans, root):
+        names = _names(spans)
+        self.assertEqual(names[0], root)
+        for name in ["query_embedding", "search.global_store", "search.session_store", "prompt_render", "llm", "llm_first_token", "parse"]:
+            self.assertIn(name, names)
+        self.assertTrue(all(span["duration_ms"] is not None for span in spans))
+
+    def test_run(self):
+        agent = self._create_agent()
+        agent.run("Where is Aethelland?")
+        self._assert_call_spans(agent.stats["spans"], "run")
+        self.assertEqual(agent.tracer.exporters[0].durations("run"), [agent.stats["spans"][0]["duration_ms"]])
+
+    async def test_arun(self):
+        agent = self._create_agent()
+        await agent.arun("Where is Aethelland?")
+        self._assert_call_spans(agent.stats["spans"], "arun")
+        self.assertIn("memory_update", _names(agent.stats["spans"]))
+
+    async def test_stream(self):
+        agent = self._create_agent()
+        chunks = [chunk async for chunk in agent.stream("Where is Aethelland?")]
+        self.assertEqual("".join(chunks), "fake answer")
+        self._assert_call_spans(agent.stats["spans"], "stream")
+        self.assertIn("memory_update", _names(agent.stats["spans"]))
+        self.assertIsNone(tracing.current_span())
+
+    async def test_stream_span_is_not_set_in_the_consumer(self):
+        agent = self._create_agent()
+        seen = []
+        async for _ in agent.stream("Where is Aethelland?"):
+            seen.append(tracing.current_span())
+        self.assertEqual(seen, [None] * len(seen))
+        self._assert_call_spans(agent.stats["spans"], "stream")
+
+    async def test_closed_stream_ends_its_trace(self):
+        agent = self._create_agent()
+        stream = agent.stream("Where is Aethelland?")
+        await stream.__anext__()
+        await stream.aclose()
+        self.assertEqual(_names(agent.stats["spans"])[0], "stream")
+        self.assertTrue(all(span["duration_ms"] is not None for span in agent.stats["spans"]))
+        # the tee generators of the closed chain are freed by the garbage collector,
+        # their closing tasks must run before the test closes the loop
+        gc.collect()
+        await asyncio.sleep(0)
+
+    def test_run_many(self):
+        agent = self._create_agent()
+        agent.run_many(["Where is Aethelland?", "How big is it?"])
+        names = _names(agent.stats["spans"])
+        self.assertEqual(names[0], "run_many")
+        self.assertEqual(names.count("llm"), 2)
+
+if __name__ == '__main__':
+    unittest.main()